@@ -1,6 +1,5 @@
 import os
 
-import pandas as pd
 from sdp_data_preparation import gapminder, utils
 
 PROJECT_ROOT_PATH = utils.get_project_root_path()
@@ -8,7 +7,8 @@ GAPMINDER_DATA_PATH = os.path.join(PROJECT_ROOT_PATH, "data/gapminder/")
 
 # Get raw population data
 src_filepath = os.path.join(GAPMINDER_DATA_PATH, "raw_population_datasets.xlsx")
-df = pd.read_excel(src_filepath, sheet_name="data-pop-gmv8-in-columns")
+sheets = utils.read_excel_sheets(src_filepath, ["data-pop-gmv8-in-columns"])
+df = sheets["data-pop-gmv8-in-columns"]
 dst_filepath = os.path.join(GAPMINDER_DATA_PATH, "raw_population.csv")
 df.to_csv(dst_filepath, index=False)
 
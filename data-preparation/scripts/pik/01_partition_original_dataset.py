@@ -0,0 +1,16 @@
+import os
+
+from sdp_data_preparation import pik, utils
+
+DATA_PATH = os.path.join(utils.get_project_root_path(), "data/pik/")
+
+# Here we convert the raw dataset into a Parquet dataset compressed with zstd
+# and partitioned by scenario ('HISTCR' or 'HISTTP') and by entity, a fraction
+# of the size of the CSV. The staging only reads the partitions it needs.
+# The column 'source' is dropped because it is always 'PRIMAP-hist_v2.5_final'.
+# To know where the raw dataset comes from, please refer to the README.md in
+# 'sdp_data_preparation.pik'
+src_filepath = os.path.join(DATA_PATH, "raw_greenhouse_gas_emissions.csv")
+dst_path = os.path.join(DATA_PATH, "raw_greenhouse_gas_emissions")
+pik.partition_raw_dataset(src_filepath, dst_path)
+print(f"Dataset written to {dst_path}")
@@ -11,24 +11,17 @@ dst_filepath = os.path.join(PIK_DATA_PATH, "stg_greenhouse_gas_emissions.csv")
 df.to_csv(dst_filepath, index=False)
 print(f"Dataset written to {dst_filepath}")
 
-# Process aggregated greenhouse gas emissions by gas
+# Process greenhouse gas emissions by gas, by sector and aggregated,
+# computed in a single pass over the staging dataset
 # This is a temporary solution until we know how
 # EDGAR, FAO and CAIT data should be processed.
-df = pik.process_final_greenhouse_gas_emissions_by_gas(PROJECT_ROOT_PATH).reset_index(
-    drop=True
-)
-dst_filepath = os.path.join(PIK_DATA_PATH, "final_greenhouse_gas_emissions_by_gas.csv")
-df.to_csv(dst_filepath, index=False)
-print(f"Dataset written to {dst_filepath}")
-
-# Process aggregated greenhouse gas emissions by sector
-# This is a temporary solution until we know how
-# EDGAR, FAO and CAIT data should be processed.
-df = pik.process_final_greenhouse_gas_emissions_by_sector(
-    PROJECT_ROOT_PATH
-).reset_index(drop=True)
-dst_filepath = os.path.join(
-    PIK_DATA_PATH, "final_greenhouse_gas_emissions_by_sector.csv"
-)
-df.to_csv(dst_filepath, index=False)
-print(f"Dataset written to {dst_filepath}")
+final_datasets = pik.process_final_greenhouse_gas_emissions(PROJECT_ROOT_PATH)
+for dataset_name, dst_filename in [
+    ("by_gas", "final_greenhouse_gas_emissions_by_gas.csv"),
+    ("by_sector", "final_greenhouse_gas_emissions_by_sector.csv"),
+    ("aggregated", "final_greenhouse_gas_emissions.csv"),
+]:
+    df = final_datasets[dataset_name].reset_index(drop=True)
+    dst_filepath = os.path.join(PIK_DATA_PATH, dst_filename)
+    df.to_csv(dst_filepath, index=False)
+    print(f"Dataset written to {dst_filepath}")
@@ -1,2 +1,16 @@
+from .aggregation import (
+    aggregate_grouping_sets,
+    aggregate_per_zones,
+    can_aggregate_per_zones,
+    update_per_zones,
+)
+from .coverage import apply_zone_coverage, compute_zone_coverage
+from .hierarchy import ZoneHierarchy, check_zone_hierarchy, get_zone_hierarchy
 from .processors import StatisticsPerCountriesAndZonesProcessor
 from .translators import CountryIsoCodeTranslator, CountryNameTranslator
+from .zone_index import (
+    ZoneIndex,
+    filter_valid_memberships,
+    get_zone_index,
+    get_zone_index_of,
+)
@@ -0,0 +1,340 @@
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .hierarchy import get_zone_hierarchy
+from .zone_index import (
+    ZONE_COLNAMES,
+    ZoneIndex,
+    factorize_columns,
+    get_zone_index_of,
+    sparse,
+)
+
+
+def can_aggregate_per_zones(
+    df: pd.DataFrame, group_by_colnames: List[str], aggregations: Dict[str, str]
+) -> bool:
+    """
+    Tells whether the sparse aggregation supports the statistics: sums of numeric
+    columns per zone (group type and group name), with scipy installed.
+    """
+    return (
+        sparse is not None
+        and all(colname in group_by_colnames for colname in ZONE_COLNAMES)
+        and len(aggregations) > 0
+        and all(aggregation == "sum" for aggregation in aggregations.values())
+        and all(pd.api.types.is_numeric_dtype(df[column]) for column in aggregations)
+    )
+
+
+def aggregate_per_zones(
+    df: pd.DataFrame,
+    countries_and_zones: Union[pd.DataFrame, ZoneIndex],
+    group_by_colnames: List[str],
+    aggregations: Dict[str, str],
+    use_hierarchy: bool = False,
+) -> pd.DataFrame:
+    """
+    Sums the statistics per country of `df` per zone, like a left merge of the
+    countries and zones with `df` followed by a groupby, without building the
+    merged frame: the membership matrix of the ZoneIndex (zone x country) is
+    multiplied by the sparse country x cell matrix of the statistics, a cell being
+    a combination of the dimensions (year, sector...). The zones only get the cells
+    in which at least one of their countries has a row. With the validity of the
+    memberships, each cell is aggregated with the memberships valid in its year.
+    With `use_hierarchy`, the zones are summed from the partial sums of the zones
+    they include (see ZoneHierarchy) instead of from all their countries.
+    """
+    zone_index = (
+        countries_and_zones
+        if isinstance(countries_and_zones, ZoneIndex)
+        else get_zone_index_of(countries_and_zones)
+    )
+    dimension_colnames = [
+        colname for colname in group_by_colnames if colname not in ZONE_COLNAMES
+    ]
+    value_colnames = list(aggregations)
+
+    # As with a groupby, the rows with a missing key get the code -1 and are skipped,
+    # like the countries which are not in the reference
+    country_codes = zone_index.get_country_codes(df["country"])
+    cell_codes, cells = factorize_columns(df, dimension_colnames)
+    is_aggregated = (country_codes != -1) & (cell_codes != -1)
+    cols = cell_codes[is_aggregated]
+    # The rows of the (country, period) of the memberships valid in the year of a cell
+    rows = (
+        country_codes[is_aggregated] * zone_index.n_periods
+        + zone_index.get_cell_periods(cells)[cols]
+    )
+    shape = (len(zone_index.countries) * zone_index.n_periods, len(cells))
+    multiply = _get_membership_product(zone_index, use_hierarchy)
+    columns = {}
+    for colname in value_colnames:
+        # Each row adds its value (missing values are skipped by the sum) and 1j: the
+        # imaginary part of the product counts the rows of each zone and cell, so that
+        # the cells of a zone are kept even when their sum is 0
+        values = np.nan_to_num(df[colname].to_numpy(dtype=float)[is_aggregated]) + 1j
+        sums = multiply(sparse.csr_matrix((values, (rows, cols)), shape=shape))
+        sums.sort_indices()
+        sums = sums.tocoo()
+        columns[colname] = sums.data.real
+    result_zone_codes, result_cell_codes = sums.row, sums.col
+
+    df_per_zone = pd.DataFrame(
+        {
+            **{
+                colname: zone_index.zones[colname].take(result_zone_codes).to_numpy()
+                for colname in ZONE_COLNAMES
+            },
+            **{
+                colname: cells[colname].take(result_cell_codes).to_numpy()
+                for colname in dimension_colnames
+            },
+            **columns,
+        }
+    )
+    is_present = np.zeros(len(zone_index.countries) + 1, dtype=bool)
+    is_present[country_codes] = True
+    # The rows of the reference with a missing country point to the last slot
+    is_present[-1] = False
+    is_country_missing = not is_present[zone_index.country_codes].all()
+    for colname in value_colnames:
+        if pd.api.types.is_integer_dtype(df[colname]) and not is_country_missing:
+            # Without any country missing, the merge keeps the integers
+            df_per_zone[colname] = df_per_zone[colname].astype(df[colname].dtype)
+    for colname in ZONE_COLNAMES:
+        df_per_zone[colname] = df_per_zone[colname].astype(
+            zone_index.countries_and_zones[colname].dtype
+        )
+    for colname in dimension_colnames:
+        df_per_zone[colname] = df_per_zone[colname].astype(
+            _get_merged_dtype(df[colname], is_country_missing)
+        )
+    return (
+        df_per_zone[group_by_colnames + value_colnames]
+        .sort_values(group_by_colnames)
+        .reset_index(drop=True)
+    )
+
+
+def aggregate_grouping_sets(
+    df: pd.DataFrame,
+    countries_and_zones: Union[pd.DataFrame, ZoneIndex],
+    group_by_colnames: List[str],
+    grouping_sets: List[List[str]],
+    aggregations: Dict[str, str],
+    use_hierarchy: bool = False,
+) -> List[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Sums the statistics per country of `df` per zone and per country for several
+    grouping sets at once, e.g. `[["gas"], ["sector"], []]` for the sums by gas, by
+    sector and in total, each set being added to `group_by_colnames`. The rows are
+    read once into a country x cell matrix, a cell being a combination of all the
+    dimensions, which is multiplied by the membership of the zones (valid in the year
+    of the cell), or summed over the hierarchy of the zones with `use_hierarchy`, and
+    rolled up to the cells of each grouping set.
+    Returns, for each grouping set, the statistics per zone, like `aggregate_per_zones`,
+    and per country, like a groupby of `df` by country and the dimensions of the set.
+    """
+    zone_index = (
+        countries_and_zones
+        if isinstance(countries_and_zones, ZoneIndex)
+        else get_zone_index_of(countries_and_zones)
+    )
+    dimension_colnames = [
+        colname for colname in group_by_colnames if colname not in ZONE_COLNAMES
+    ]
+    cell_colnames = list(dimension_colnames)
+    for grouping_set in grouping_sets:
+        cell_colnames += [
+            colname for colname in grouping_set if colname not in cell_colnames
+        ]
+    value_colnames = list(aggregations)
+
+    # The countries of `df` which are not in the reference get their statistics but
+    # are not members of any zone
+    country_codes, countries = factorize_columns(df, ["country"])
+    cell_codes, cells = factorize_columns(df, cell_colnames)
+    reference_codes = zone_index.get_country_codes(countries["country"])
+    is_referenced = reference_codes != -1
+    is_aggregated = (country_codes != -1) & (cell_codes != -1)
+    rows, cols = country_codes[is_aggregated], cell_codes[is_aggregated]
+    # The rows of the (country, period) of the memberships valid in the year of a
+    # cell, as in aggregate_per_zones
+    zone_rows = (
+        reference_codes[rows] * zone_index.n_periods
+        + zone_index.get_cell_periods(cells)[cols]
+    )
+    is_member = reference_codes[rows] != -1
+    multiply = _get_membership_product(zone_index, use_hierarchy)
+    country_sums = {}
+    zone_sums = {}
+    for colname in value_colnames:
+        # The imaginary part counts the rows, as in aggregate_per_zones
+        values = np.nan_to_num(df[colname].to_numpy(dtype=float)[is_aggregated]) + 1j
+        country_sums[colname] = sparse.csr_matrix(
+            (values, (rows, cols)), shape=(len(countries), len(cells))
+        )
+        zone_sums[colname] = multiply(
+            sparse.csr_matrix(
+                (values[is_member], (zone_rows[is_member], cols[is_member])),
+                shape=(len(zone_index.countries) * zone_index.n_periods, len(cells)),
+            )
+        )
+    is_country_missing = not np.isin(
+        zone_index.country_codes, reference_codes[is_referenced]
+    ).all()
+
+    results = []
+    for grouping_set in grouping_sets:
+        set_colnames = dimension_colnames + [
+            colname for colname in grouping_set if colname not in dimension_colnames
+        ]
+        set_cell_codes, set_cells = factorize_columns(cells, set_colnames)
+        rollup = sparse.csr_matrix(
+            (np.ones(len(cells)), (np.arange(len(cells)), set_cell_codes)),
+            shape=(len(cells), len(set_cells)),
+        )
+        set_country_sums = {
+            colname: matrix @ rollup for colname, matrix in country_sums.items()
+        }
+        set_zone_sums = {
+            colname: matrix @ rollup for colname, matrix in zone_sums.items()
+        }
+        df_per_zone = _get_frame_of_sums(set_zone_sums, zone_index.zones, set_cells)
+        df_per_country = _get_frame_of_sums(set_country_sums, countries, set_cells)
+        for colname in value_colnames:
+            if pd.api.types.is_integer_dtype(df[colname]):
+                df_per_country[colname] = df_per_country[colname].astype(
+                    df[colname].dtype
+                )
+                if not is_country_missing:
+                    df_per_zone[colname] = df_per_zone[colname].astype(
+                        df[colname].dtype
+                    )
+        for colname in ZONE_COLNAMES:
+            df_per_zone[colname] = df_per_zone[colname].astype(
+                zone_index.countries_and_zones[colname].dtype
+            )
+        for colname in set_colnames:
+            df_per_zone[colname] = df_per_zone[colname].astype(
+                _get_merged_dtype(df[colname], is_country_missing)
+            )
+        for colname in ["country"] + set_colnames:
+            df_per_country[colname] = df_per_country[colname].astype(df[colname].dtype)
+        zone_colnames = ZONE_COLNAMES + set_colnames
+        country_colnames = ["country"] + set_colnames
+        results.append(
+            (
+                df_per_zone[zone_colnames + value_colnames]
+                .sort_values(zone_colnames)
+                .reset_index(drop=True),
+                df_per_country[country_colnames + value_colnames]
+                .sort_values(country_colnames)
+                .reset_index(drop=True),
+            )
+        )
+    return results
+
+
+def _get_merged_dtype(column: pd.Series, is_country_missing: bool) -> np.dtype:
+    """
+    Returns the dtype of a dimension of the statistics in the left merge of the
+    countries and zones with them: the countries missing in the statistics get a
+    missing value, which turns the integers into floats and the booleans into objects.
+    """
+    if not is_country_missing:
+        return column.dtype
+    return column.iloc[:0].reset_index(drop=True).reindex([0]).dtype
+
+
+def _get_membership_product(zone_index: ZoneIndex, use_hierarchy: bool):
+    """
+    Returns the function multiplying the period membership of the zones by a
+    (country, period) x cell matrix, directly or over the hierarchy of the zones.
+    """
+    if use_hierarchy:
+        return get_zone_hierarchy(zone_index).multiply
+    return lambda statistics: zone_index.period_membership @ statistics
+
+
+def _get_frame_of_sums(
+    sums: Dict[str, "sparse.csr_matrix"], rows: pd.DataFrame, cells: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Returns the frame of the non-empty entries of row x cell matrices of sums with the
+    same structure, by value column, with the columns of their rows and cells.
+    """
+    columns = {}
+    for colname, matrix in sums.items():
+        matrix.sort_indices()
+        matrix = matrix.tocoo()
+        columns[colname] = matrix.data.real
+    return pd.DataFrame(
+        {
+            **{
+                colname: rows[colname].take(matrix.row).to_numpy()
+                for colname in rows.columns
+            },
+            **{
+                colname: cells[colname].take(matrix.col).to_numpy()
+                for colname in cells.columns
+            },
+            **columns,
+        }
+    )
+
+
+def update_per_zones(
+    df_per_zone: pd.DataFrame,
+    df_deltas: pd.DataFrame,
+    countries_and_zones: Union[pd.DataFrame, ZoneIndex],
+    group_by_colnames: List[str],
+    aggregations: Dict[str, str],
+) -> pd.DataFrame:
+    """
+    Adds the differences per country of `df_deltas` to the statistics per zone of a
+    previous aggregation: only the zones of the countries in `df_deltas` are
+    aggregated, and their cells are updated, or added when they are new. The sums may
+    differ from a full aggregation by the rounding of the floats.
+    """
+    value_colnames = list(aggregations)
+    df_zone_deltas = aggregate_per_zones(
+        df_deltas, countries_and_zones, group_by_colnames, aggregations
+    )
+    # The countries missing in the differences do not turn the previous integer
+    # dimensions into floats
+    df_zone_deltas = df_zone_deltas.astype(
+        {colname: df_per_zone[colname].dtype for colname in group_by_colnames}
+    )
+    # Only the cells of the updated zones are matched, the cells of a previous
+    # aggregation being unique
+    candidate_positions = np.flatnonzero(
+        df_per_zone["group_name"]
+        .isin(pd.unique(df_zone_deltas["group_name"]))
+        .to_numpy()
+    )
+    positions = pd.MultiIndex.from_frame(
+        df_per_zone[group_by_colnames].iloc[candidate_positions]
+    ).get_indexer(pd.MultiIndex.from_frame(df_zone_deltas[group_by_colnames]))
+    is_new = positions == -1
+    positions = candidate_positions[positions[~is_new]]
+
+    df_updated = df_per_zone.copy()
+    for colname in value_colnames:
+        values = df_updated[colname].to_numpy(dtype=float, copy=True)
+        values[positions] += df_zone_deltas[colname].to_numpy()[~is_new]
+        df_updated[colname] = values
+    if is_new.any():
+        df_updated = (
+            pd.concat([df_updated, df_zone_deltas[is_new]])
+            .sort_values(group_by_colnames)
+            .reset_index(drop=True)
+        )
+    for colname in value_colnames:
+        if pd.api.types.is_integer_dtype(df_per_zone[colname]):
+            # The differences of integers are integers
+            df_updated[colname] = df_updated[colname].astype(df_per_zone[colname].dtype)
+    return df_updated
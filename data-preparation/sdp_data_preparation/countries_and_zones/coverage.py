@@ -0,0 +1,204 @@
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .zone_index import (
+    ZONE_COLNAMES,
+    ZoneIndex,
+    factorize_columns,
+    get_zone_index_of,
+    sparse,
+)
+
+
+def compute_zone_coverage(
+    df: pd.DataFrame,
+    countries_and_zones: Union[pd.DataFrame, ZoneIndex],
+    group_by_colnames: List[str],
+    weights: Optional[pd.DataFrame] = None,
+    weight_colname: Optional[str] = None,
+    value_colnames: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Computes the coverage of the zones by the statistics per country of `df`, for each
+    cell of the dimensions (year, sector...) in which a zone has statistics: the number
+    of its members with a row in the cell (`present_members`), out of its members
+    (`members`), and their fraction (`coverage`). The rows whose `value_colnames` (by
+    default the columns other than the country and the dimensions) are all missing do
+    not make their country present.
+    With `weights`, a frame of the `weight_colname` column (e.g. the population) per
+    country and some of the dimensions (e.g. the year), `weighted_coverage` is the
+    share of the weight of the members present in the cell. A missing weight counts
+    as 0, and the cells without any weight get a missing weighted coverage.
+    """
+    zone_index = (
+        countries_and_zones
+        if isinstance(countries_and_zones, ZoneIndex)
+        else get_zone_index_of(countries_and_zones)
+    )
+    if zone_index.membership is None:
+        raise ImportError("The coverage of the zones requires scipy.")
+
+    dimension_colnames = [
+        colname for colname in group_by_colnames if colname not in ZONE_COLNAMES
+    ]
+    country_codes = zone_index.get_country_codes(df["country"])
+    cell_codes, cells = factorize_columns(df, dimension_colnames)
+    if value_colnames is None:
+        value_colnames = [
+            colname
+            for colname in df.columns
+            if colname != "country" and colname not in dimension_colnames
+        ]
+    is_covered = (country_codes != -1) & (cell_codes != -1)
+    if len(value_colnames) > 0:
+        is_covered &= df[value_colnames].notna().any(axis=1).to_numpy()
+    cols = cell_codes[is_covered]
+    # The members of a zone in a cell are its members in the year of the cell
+    cell_periods = zone_index.get_cell_periods(cells)
+    rows = country_codes[is_covered] * zone_index.n_periods + cell_periods[cols]
+    presence = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)),
+        shape=(len(zone_index.countries) * zone_index.n_periods, len(cells)),
+    )
+    # Several rows of a country in a cell make a single member present
+    presence.sum_duplicates()
+    presence.data[:] = 1
+
+    if weights is None:
+        present_members = zone_index.period_membership @ presence
+    else:
+        weight_key_colnames = [
+            colname
+            for colname in weights.columns
+            if colname not in ["country", weight_colname]
+        ]
+        if not set(weight_key_colnames).issubset(dimension_colnames):
+            raise ValueError(
+                f"The weights must be given per country and some of the dimensions "
+                f"{dimension_colnames}, not per {weight_key_colnames}."
+            )
+        # The cells and the weights are encoded with the same keys (e.g. the years)
+        key_codes, keys = factorize_columns(
+            pd.concat(
+                [cells[weight_key_colnames], weights[weight_key_colnames]],
+                ignore_index=True,
+            ),
+            weight_key_colnames,
+        )
+        cell_key_codes = key_codes[: len(cells)]
+        weight_key_codes = key_codes[len(cells) :]
+        # The cells with a missing key (code -1) get no weight
+        is_cell_keyed = cell_key_codes != -1
+        cell_key_codes = np.where(is_cell_keyed, cell_key_codes, 0)
+        weight_country_codes = zone_index.get_country_codes(weights["country"])
+        is_weighted = (weight_country_codes != -1) & (weight_key_codes != -1)
+        country_weights = np.zeros((len(zone_index.countries), len(keys)))
+        np.add.at(
+            country_weights,
+            (weight_country_codes[is_weighted], weight_key_codes[is_weighted]),
+            np.nan_to_num(weights[weight_colname].to_numpy(dtype=float)[is_weighted]),
+        )
+        if len(keys) == 0:
+            # Without any key, the cells get a weight of 0
+            country_weights = np.zeros((len(zone_index.countries), 1))
+        # Weight of the members of each zone per key and period
+        zone_weights = np.stack(
+            [
+                zone_index.period_membership[:, period :: zone_index.n_periods]
+                @ country_weights
+                for period in range(zone_index.n_periods)
+            ],
+            axis=-1,
+        )
+        # The real part sums the weights of the present members, and the imaginary
+        # part counts them
+        presence = presence.tocoo()
+        present_members = zone_index.period_membership @ sparse.csr_matrix(
+            (
+                np.where(
+                    is_cell_keyed[presence.col],
+                    country_weights[
+                        presence.row // zone_index.n_periods,
+                        cell_key_codes[presence.col],
+                    ],
+                    0,
+                )
+                + 1j,
+                (presence.row, presence.col),
+            ),
+            shape=presence.shape,
+        )
+
+    present_members.sort_indices()
+    present_members = present_members.tocoo()
+    zone_codes, cell_codes = present_members.row, present_members.col
+    if weights is None:
+        present_counts = present_members.data
+    else:
+        present_counts = present_members.data.imag
+    df_coverage = pd.DataFrame(
+        {
+            **{
+                colname: zone_index.zones[colname].take(zone_codes).to_numpy()
+                for colname in ZONE_COLNAMES
+            },
+            **{
+                colname: cells[colname].take(cell_codes).to_numpy()
+                for colname in dimension_colnames
+            },
+            "present_members": present_counts.round().astype(int),
+            "members": zone_index.period_zone_sizes[
+                zone_codes, cell_periods[cell_codes]
+            ],
+        }
+    )
+    df_coverage["coverage"] = df_coverage["present_members"] / df_coverage["members"]
+    if weights is not None:
+        member_weights = np.where(
+            is_cell_keyed[cell_codes],
+            zone_weights[
+                zone_codes, cell_key_codes[cell_codes], cell_periods[cell_codes]
+            ],
+            0,
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            df_coverage["weighted_coverage"] = (
+                present_members.data.real / member_weights
+            )
+    for colname in ZONE_COLNAMES:
+        df_coverage[colname] = df_coverage[colname].astype(
+            zone_index.countries_and_zones[colname].dtype
+        )
+    for colname in dimension_colnames:
+        df_coverage[colname] = df_coverage[colname].astype(df[colname].dtype)
+    return df_coverage.sort_values(group_by_colnames).reset_index(drop=True)
+
+
+def apply_zone_coverage(
+    df_per_zone: pd.DataFrame,
+    df_coverage: pd.DataFrame,
+    group_by_colnames: List[str],
+    min_coverage: float,
+    suppress: bool = False,
+    coverage_colname: str = "coverage",
+) -> pd.DataFrame:
+    """
+    Flags the statistics per zone whose coverage is under `min_coverage` in the
+    `is_under_covered` column, or removes them with `suppress`.
+    """
+    is_under_covered = (
+        pd.merge(
+            df_per_zone[group_by_colnames],
+            df_coverage[group_by_colnames + [coverage_colname]],
+            how="left",
+            on=group_by_colnames,
+        )[coverage_colname]
+        .fillna(0)
+        .to_numpy()
+        < min_coverage
+    )
+    if suppress:
+        return df_per_zone[~is_under_covered]
+    return df_per_zone.assign(is_under_covered=is_under_covered)
@@ -0,0 +1,211 @@
+from typing import List, Union
+
+import numpy as np
+import pandas as pd
+
+from .zone_index import (
+    ZONE_COLNAMES,
+    ZoneIndex,
+    factorize_columns,
+    get_zone_index_of,
+    sparse,
+)
+
+
+class ZoneHierarchy:
+    """
+    Hierarchy of the zones of a ZoneIndex, derived from their memberships: the
+    children of a zone are disjoint zones whose members are all members of it (e.g.
+    the continents for the World, the EU27 for Europe), picked from the largest, and
+    its remainder is its members in none of its children. Every zone is then the sum
+    of its children and of its remainder, and the zones are aggregated level by level
+    from the partial sums of their children, from the zones without children. The
+    memberships are compared per (country, period), so that the hierarchy holds in
+    every period of memberships valid over time. The memberships must be unique: a
+    country listed twice in a zone raises a ValueError.
+    """
+
+    def __init__(self, zone_index: ZoneIndex) -> None:
+        membership = zone_index.period_membership.copy()
+        membership.sum_duplicates()
+        # A country listed twice in a zone is counted twice by the sums per zone,
+        # which cannot be split between the children of the zone
+        duplicated_zone_codes = np.unique(
+            np.repeat(np.arange(membership.shape[0]), np.diff(membership.indptr))[
+                membership.data > 1
+            ]
+        )
+        if len(duplicated_zone_codes) > 0:
+            raise ValueError(
+                "The hierarchy of the zones requires unique memberships, duplicated in "
+                f"{zone_index.zones['group_name'].take(duplicated_zone_codes).tolist()}"
+            )
+        sizes = np.asarray(membership.sum(axis=1)).ravel()
+        # Number of members shared by each pair of zones
+        overlaps = (membership @ membership.T).toarray()
+        # The zones by size, the children of a zone being before it
+        order = np.lexsort((np.arange(len(sizes)), sizes))
+        ranks = np.empty(len(sizes), dtype=np.int64)
+        ranks[order] = np.arange(len(sizes))
+
+        levels = np.zeros(len(sizes), dtype=np.int64)
+        parent_codes, child_codes = [], []
+        for zone_code in order:
+            # The zones included in the zone, from the largest
+            is_included = overlaps[zone_code] == sizes
+            candidates = np.flatnonzero(
+                is_included & (ranks < ranks[zone_code]) & (sizes > 0)
+            )
+            children = []
+            for candidate in candidates[np.argsort(-sizes[candidates], kind="stable")]:
+                if not overlaps[candidate, children].any():
+                    children.append(candidate)
+            if len(children) > 0:
+                levels[zone_code] = levels[children].max() + 1
+            parent_codes += [zone_code] * len(children)
+            child_codes += children
+
+        self.zone_index = zone_index
+        self.children = sparse.csr_matrix(
+            (np.ones(len(parent_codes)), (parent_codes, child_codes)),
+            shape=(len(sizes), len(sizes)),
+        )
+        self.remainders = membership - (self.children @ membership)
+        self.remainders.eliminate_zeros()
+        self.levels: List[np.ndarray] = [
+            np.flatnonzero(levels == level) for level in range(levels.max() + 1)
+        ]
+
+    def get_edges(self) -> pd.DataFrame:
+        """
+        Returns the zones (parent) with their children (child).
+        """
+        edges = self.children.tocoo()
+        zones = self.zone_index.zones
+        return pd.DataFrame(
+            {
+                **{
+                    f"parent_{colname}": zones[colname].take(edges.row).to_numpy()
+                    for colname in ZONE_COLNAMES
+                },
+                **{
+                    f"child_{colname}": zones[colname].take(edges.col).to_numpy()
+                    for colname in ZONE_COLNAMES
+                },
+            }
+        )
+
+    def multiply(self, statistics: "sparse.csr_matrix") -> "sparse.csr_matrix":
+        """
+        Returns the product of the period membership of the zones with a (country,
+        period) x cell matrix of statistics, computed level by level: the zones
+        without children from their members, then each zone from the sums of its
+        children and of its remainder.
+        """
+        n_zones = self.children.shape[0]
+        sums = sparse.csr_matrix((n_zones, statistics.shape[1]), dtype=statistics.dtype)
+        for zone_codes in self.levels:
+            level_sums = self.children[zone_codes] @ sums + (
+                self.remainders[zone_codes] @ statistics
+            )
+            # The sums of the level are added to the rows of their zones
+            level_rows = sparse.csr_matrix(
+                (np.ones(len(zone_codes)), (zone_codes, np.arange(len(zone_codes)))),
+                shape=(n_zones, len(zone_codes)),
+            )
+            sums = sums + level_rows @ level_sums
+        return sums
+
+
+def get_zone_hierarchy(zone_index: ZoneIndex) -> ZoneHierarchy:
+    """
+    Returns the hierarchy of the zones of a ZoneIndex, derived once.
+    """
+    if zone_index.hierarchy is None:
+        zone_index.hierarchy = ZoneHierarchy(zone_index)
+    return zone_index.hierarchy
+
+
+def check_zone_hierarchy(
+    df: pd.DataFrame,
+    countries_and_zones: Union[pd.DataFrame, ZoneIndex],
+    group_by_colnames: List[str],
+    value_colnames: List[str],
+    rtol: float = 1e-9,
+    atol: float = 1e-9,
+) -> pd.DataFrame:
+    """
+    Checks that the statistics per zone and per country of `df` (e.g. the output of
+    StatisticsPerCountriesAndZonesProcessor, the countries having the group type
+    "country") are consistent with the hierarchy of the zones: each zone must be the
+    sum of its children and of the countries of its remainder.
+    Returns the inconsistent statistics (`value` in the zone, `expected` value) per
+    zone, cell of the dimensions and value column, empty when they are consistent.
+    """
+    zone_index = (
+        countries_and_zones
+        if isinstance(countries_and_zones, ZoneIndex)
+        else get_zone_index_of(countries_and_zones)
+    )
+    hierarchy = get_zone_hierarchy(zone_index)
+    dimension_colnames = [
+        colname for colname in group_by_colnames if colname not in ZONE_COLNAMES
+    ]
+    is_country = (df["group_type"] == "country").to_numpy()
+    zone_codes = zone_index.zone_lookup.get_indexer(
+        pd.MultiIndex.from_frame(df[ZONE_COLNAMES])
+    )
+    country_codes = zone_index.get_country_codes(df["group_name"])
+    cell_codes, cells = factorize_columns(df, dimension_colnames)
+    cell_periods = zone_index.get_cell_periods(cells)
+    is_zone_row = ~is_country & (zone_codes != -1) & (cell_codes != -1)
+    is_country_row = is_country & (country_codes != -1) & (cell_codes != -1)
+
+    list_inconsistencies = []
+    for colname in value_colnames:
+        values = np.nan_to_num(df[colname].to_numpy(dtype=float))
+        zone_sums = sparse.csr_matrix(
+            (
+                values[is_zone_row],
+                (zone_codes[is_zone_row], cell_codes[is_zone_row]),
+            ),
+            shape=(len(zone_index.zones), len(cells)),
+        )
+        country_rows = (
+            country_codes[is_country_row] * zone_index.n_periods
+            + cell_periods[cell_codes[is_country_row]]
+        )
+        country_sums = sparse.csr_matrix(
+            (values[is_country_row], (country_rows, cell_codes[is_country_row])),
+            shape=(len(zone_index.countries) * zone_index.n_periods, len(cells)),
+        )
+        expected = (
+            hierarchy.children @ zone_sums + hierarchy.remainders @ country_sums
+        ).toarray()
+        actual = zone_sums.toarray()
+        # Only the cells of the zones in `df` are checked
+        is_checked = np.zeros(actual.shape, dtype=bool)
+        is_checked[zone_codes[is_zone_row], cell_codes[is_zone_row]] = True
+        inconsistent_zones, inconsistent_cells = np.nonzero(
+            is_checked & ~np.isclose(actual, expected, rtol=rtol, atol=atol)
+        )
+        list_inconsistencies.append(
+            pd.DataFrame(
+                {
+                    **{
+                        colname: zone_index.zones[colname]
+                        .take(inconsistent_zones)
+                        .to_numpy()
+                        for colname in ZONE_COLNAMES
+                    },
+                    **{
+                        colname: cells[colname].take(inconsistent_cells).to_numpy()
+                        for colname in dimension_colnames
+                    },
+                    "statistic": colname,
+                    "value": actual[inconsistent_zones, inconsistent_cells],
+                    "expected": expected[inconsistent_zones, inconsistent_cells],
+                }
+            )
+        )
+    return pd.concat(list_inconsistencies, ignore_index=True)
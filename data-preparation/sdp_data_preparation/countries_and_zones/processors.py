@@ -1,58 +1,112 @@
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 
+import numpy as np
 import pandas as pd
 
+from .aggregation import (
+    aggregate_grouping_sets,
+    aggregate_per_zones,
+    can_aggregate_per_zones,
+    update_per_zones,
+)
+from .coverage import apply_zone_coverage, compute_zone_coverage
+from .hierarchy import check_zone_hierarchy
+from .zone_index import ZoneIndex, filter_valid_memberships, get_zone_index_of
+
 
 class StatisticsPerCountriesAndZonesProcessor:
 
     def __init__(
         self,
         df: pd.DataFrame,
-        countries_and_zones: pd.DataFrame,
+        countries_and_zones: Union[pd.DataFrame, ZoneIndex],
         group_by_colnames: Union[str, List[str]],
         aggregations: Dict[str, str],
+        weights: Optional[pd.DataFrame] = None,
+        weight_colname: Optional[str] = None,
+        min_coverage: Optional[float] = None,
+        suppress_under_covered: bool = False,
+        use_hierarchy: bool = False,
     ) -> None:
+        """
+        With `min_coverage`, the statistics of a zone in a cell (year, sector...) whose
+        coverage is lower (see `get_coverage`) are flagged in the `is_under_covered`
+        column, or removed with `suppress_under_covered`. The coverage is weighted
+        when `weights` are given, e.g. the population per country and year in the
+        `weight_colname` column.
+        With `use_hierarchy`, the sums per zone are computed from the sums of the zones
+        they include (e.g. the World from the continents), see ZoneHierarchy.
+        """
         if isinstance(group_by_colnames, str):
             group_by_colnames = [group_by_colnames]
 
+        if isinstance(countries_and_zones, ZoneIndex):
+            zone_index = countries_and_zones
+        else:
+            zone_index = get_zone_index_of(countries_and_zones)
+
         self.df = df
-        self.countries_and_zones = countries_and_zones
+        self.zone_index = zone_index
+        self.countries_and_zones = zone_index.countries_and_zones
         self.group_by_colnames = group_by_colnames
         self.aggregations = aggregations
+        self.weights = weights
+        self.weight_colname = weight_colname
+        self.min_coverage = min_coverage
+        self.suppress_under_covered = suppress_under_covered
+        self.use_hierarchy = use_hierarchy
+
+    def get_coverage(
+        self, group_by_colnames: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Returns the coverage of each zone per cell of the dimensions (year, sector...),
+        see `compute_zone_coverage`.
+        """
+        return compute_zone_coverage(
+            self.df,
+            self.zone_index,
+            group_by_colnames or self.group_by_colnames,
+            self.weights,
+            self.weight_colname,
+            list(self.aggregations),
+        )
+
+    def check_hierarchy(
+        self, output: pd.DataFrame, group_by_colnames: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Checks that each zone of the output of `run` is the sum of the zones it
+        includes and of its other countries, see `check_zone_hierarchy`.
+        Returns the inconsistent statistics, empty when they are consistent.
+        """
+        return check_zone_hierarchy(
+            output,
+            self.zone_index,
+            group_by_colnames or self.group_by_colnames,
+            list(self.aggregations),
+        )
 
     def check_missing_countries(self) -> None:
         """
         Checks if there are missing countries in the statistics dataset.
         """
-        countries_from_df = self.df["country"].unique()
-        missing_countries_df = self.countries_and_zones[
-            ~self.countries_and_zones["country"].isin(countries_from_df)
-        ]
-        missing_countries_per_zone_dict = (
-            missing_countries_df.groupby("group_name")["country"].apply(list).to_dict()
-        )
+        missing_countries_df = self.zone_index.get_missing_members(self.df["country"])
 
-        # Print warnings
-        for zone_name, list_countries_in_zone in sorted(
-            missing_countries_per_zone_dict.items()
-        ):
-            if len(list_countries_in_zone) > 0:
-                print(
-                    f"WARNING: {len(list_countries_in_zone)} countries are missing in the "
-                    f"statistics dataset for zone : {zone_name}"
-                )
-                print(list_countries_in_zone)
+        # Print a warning, the coverage of each zone is given by get_coverage()
+        if len(missing_countries_df) > 0:
+            print(
+                f"WARNING: {missing_countries_df['country'].nunique()} countries are "
+                f"missing in the statistics dataset for "
+                f"{missing_countries_df['group_name'].nunique()} zones"
+            )
 
     def check_unmatched_countries(self) -> None:
         """
         Check countries that are in the statistics dataset but not in the countries reference frame.
         """
-        countries_from_df = set(self.df["country"].unique())
-        countries_from_reference_frame = set(
-            self.countries_and_zones["country"].unique()
-        )
-        unmatched_countries = countries_from_df.difference(
-            countries_from_reference_frame
+        unmatched_countries = set(
+            self.zone_index.get_unmatched_countries(self.df["country"])
         )
 
         # Print warnings
@@ -70,25 +124,211 @@ class StatisticsPerCountriesAndZonesProcessor:
         self.check_unmatched_countries()
 
         # Compute statistics per zone
-        df_stats_per_zone = (
-            pd.merge(
-                self.countries_and_zones,
+        if self._can_aggregate_per_zones():
+            df_stats_per_zone = aggregate_per_zones(
                 self.df,
-                how="left",
-                left_on="country",
-                right_on="country",
+                self.zone_index,
+                self.group_by_colnames,
+                self.aggregations,
+                use_hierarchy=self.use_hierarchy,
             )
-            .groupby(self.group_by_colnames)
-            .agg(self.aggregations)
-            .reset_index()
+        else:
+            df_stats_per_zone = self._merge_and_aggregate_per_zones()
+        df_stats_per_zone = self._apply_coverage(
+            df_stats_per_zone, self.group_by_colnames
+        )
+
+        # Concatenate statistics per country and per zone
+        return pd.concat(
+            [df_stats_per_zone, self._get_stats_per_countries(self.df)], axis=0
+        )
+
+    def run_grouping_sets(self, grouping_sets: List[List[str]]) -> List[pd.DataFrame]:
+        """
+        Computes the statistics per country and per zone for several grouping sets,
+        each set adding its columns to the group by columns, e.g. `[["gas"],
+        ["sector"], []]` for the statistics by gas, by sector and in total. The sums
+        are computed in a single pass over the statistics.
+        Returns the output of `run` for each grouping set.
+        """
+        self.check_missing_countries()
+        self.check_unmatched_countries()
+
+        set_colnames = [colname for colnames in grouping_sets for colname in colnames]
+        if self.zone_index.membership is not None and can_aggregate_per_zones(
+            self.df, self.group_by_colnames + set_colnames, self.aggregations
+        ):
+            list_stats = aggregate_grouping_sets(
+                self.df,
+                self.zone_index,
+                self.group_by_colnames,
+                grouping_sets,
+                self.aggregations,
+                use_hierarchy=self.use_hierarchy,
+            )
+            return [
+                pd.concat(
+                    [
+                        self._apply_coverage(
+                            df_stats_per_zone, self.group_by_colnames + grouping_set
+                        ),
+                        self._get_stats_per_countries(df_stats),
+                    ],
+                    axis=0,
+                )
+                for (df_stats_per_zone, df_stats), grouping_set in zip(
+                    list_stats, grouping_sets
+                )
+            ]
+
+        list_outputs = []
+        for grouping_set in grouping_sets:
+            group_by_colnames = self.group_by_colnames + grouping_set
+            df_stats = (
+                self.df.groupby(
+                    ["country"]
+                    + [
+                        colname
+                        for colname in group_by_colnames
+                        if colname not in ["group_type", "group_name"]
+                    ],
+                    observed=True,
+                )
+                .agg(self.aggregations)
+                .reset_index()
+            )
+            processor = StatisticsPerCountriesAndZonesProcessor(
+                df_stats, self.zone_index, group_by_colnames, self.aggregations
+            )
+            list_outputs.append(
+                pd.concat(
+                    [
+                        self._apply_coverage(
+                            processor._merge_and_aggregate_per_zones(),
+                            group_by_colnames,
+                        ),
+                        self._get_stats_per_countries(df_stats),
+                    ],
+                    axis=0,
+                )
+            )
+        return list_outputs
+
+    def run_incremental(self, previous_output: pd.DataFrame) -> pd.DataFrame:
+        """
+        Updates the output of a previous run with the revised statistics of `df`: they
+        replace the previous rows of the same country and dimensions (year, sector...),
+        and only the zones of the revised countries are updated, with the differences
+        between the revised and the previous rows. The aggregations other than sums
+        are computed again from all the countries.
+        """
+        if self.min_coverage is not None:
+            raise ValueError("The coverage of the zones is not updated incrementally.")
+        self.check_unmatched_countries()
+
+        key_colnames = ["country"] + [
+            colname
+            for colname in self.group_by_colnames
+            if colname not in ["group_type", "group_name"]
+        ]
+        value_colnames = list(self.aggregations)
+        is_country = (previous_output["group_type"] == "country").to_numpy()
+        # Only the previous rows of the revised countries are matched on their keys
+        candidate_positions = np.flatnonzero(
+            is_country
+            & previous_output["group_name"]
+            .isin(pd.unique(self.df["country"]))
+            .to_numpy()
+        )
+        df_candidates = previous_output.iloc[candidate_positions].rename(
+            {"group_name": "country"}, axis=1
+        )
+        is_revised = pd.MultiIndex.from_frame(df_candidates[key_colnames]).isin(
+            pd.MultiIndex.from_frame(self.df[key_colnames])
+        )
+        is_kept_country = is_country.copy()
+        is_kept_country[candidate_positions[is_revised]] = False
+        df_stats_per_countries = pd.concat(
+            [
+                previous_output[is_kept_country],
+                self._get_stats_per_countries(self.df),
+            ],
+            axis=0,
+        )
+        if not self._can_aggregate_per_zones():
+            return StatisticsPerCountriesAndZonesProcessor(
+                df_stats_per_countries.drop(columns="group_type").rename(
+                    {"group_name": "country"}, axis=1
+                ),
+                self.zone_index,
+                self.group_by_colnames,
+                self.aggregations,
+            ).run()
+
+        # The revised rows are added, and the rows they replace are subtracted
+        df_replaced = df_candidates.loc[is_revised, key_colnames + value_colnames]
+        df_deltas = pd.concat(
+            [
+                self.df[key_colnames + value_colnames],
+                df_replaced.assign(
+                    **{colname: -df_replaced[colname] for colname in value_colnames}
+                ),
+            ]
+        )
+        df_stats_per_zone = update_per_zones(
+            previous_output[~is_country].reset_index(drop=True),
+            df_deltas,
+            self.zone_index,
+            self.group_by_colnames,
+            self.aggregations,
+        )
+        return pd.concat([df_stats_per_zone, df_stats_per_countries], axis=0)
+
+    def _apply_coverage(
+        self, df_stats_per_zone: pd.DataFrame, group_by_colnames: List[str]
+    ) -> pd.DataFrame:
+        if self.min_coverage is None:
+            return df_stats_per_zone
+        coverage_colname = "coverage" if self.weights is None else "weighted_coverage"
+        return apply_zone_coverage(
+            df_stats_per_zone,
+            self.get_coverage(group_by_colnames),
+            group_by_colnames,
+            self.min_coverage,
+            suppress=self.suppress_under_covered,
+            coverage_colname=coverage_colname,
+        )
+
+    def _can_aggregate_per_zones(self) -> bool:
+        return self.zone_index.membership is not None and can_aggregate_per_zones(
+            self.df, self.group_by_colnames, self.aggregations
         )
 
-        # Add statistics for each country
-        df_stats_per_countries = self.df.copy()
+    @staticmethod
+    def _get_stats_per_countries(df: pd.DataFrame) -> pd.DataFrame:
+        df_stats_per_countries = df.copy()
         df_stats_per_countries = df_stats_per_countries.rename(
             {"country": "group_name"}, axis=1
         )
         df_stats_per_countries["group_type"] = "country"
+        return df_stats_per_countries
 
-        # Concatenate statistics per country and per zone
-        return pd.concat([df_stats_per_zone, df_stats_per_countries], axis=0)
+    def _merge_and_aggregate_per_zones(self) -> pd.DataFrame:
+        """
+        Aggregates the statistics per zone through a merge with the countries and zones,
+        when the sparse aggregation does not support them.
+        """
+        df_merged = pd.merge(
+            self.countries_and_zones,
+            self.df,
+            how="left",
+            left_on="country",
+            right_on="country",
+        )
+        return (
+            filter_valid_memberships(df_merged)
+            # The dimensions may be categories: only the groups with rows are kept
+            .groupby(self.group_by_colnames, observed=True)
+            .agg(self.aggregations)
+            .reset_index()
+        )
@@ -1,5 +1,13 @@
+from typing import Optional
+
 import pandas as pd
 from sdp_data_preparation.utils.iso3166 import countries_by_alpha3
+from sdp_data_preparation.utils.name_resolver import (
+    AliasCache,
+    NameResolver,
+    get_country_aliases,
+)
+from sdp_data_preparation.utils.translation_index import TranslationIndex
 
 # TODO: `mapping_country_names` à refactorer plus proprement à l'aide d'un fichier JSON
 mapping_country_names = {
@@ -614,36 +622,72 @@ mapping_country_names = {
     "Zimbabwe": "Zimbabwe",
     "Holy See": "Vatican",
     r"Holy SeeÂ\xa0(Vatican City State)": "Vatican",
+    "Holy See (Vatican City State)": "Vatican",
     "Palestinian Territories": "Palestinian Territories",
 }
 
 
 class CountryNameTranslator:
+    # The translation index of `mapping_country_names`, compiled by the first translator
+    translation_index = None
+    # The default NameResolver, built when a first name is not found
+    default_resolver = None
 
-    def __init__(self):
+    def __init__(self, resolver: Optional[NameResolver] = None):
+        """
+        The names which are not in the mapping are given to the `resolver`, by default
+        a NameResolver reading the names already accepted in the default AliasCache.
+        Use `get_resolver(suggest=True)` to print the closest known names of the
+        names which are not found.
+        """
         self.country_name_translations = mapping_country_names
+        if CountryNameTranslator.translation_index is None:
+            CountryNameTranslator.translation_index = TranslationIndex(
+                mapping_country_names
+            )
+        self.resolver = resolver
+
+    @classmethod
+    def get_resolver(
+        cls, alias_cache: Optional[AliasCache] = None, suggest: bool = False
+    ) -> NameResolver:
+        """
+        Returns a NameResolver of the names of the mapping and of the ISO 3166
+        countries, with the default AliasCache if none is given.
+        """
+        if cls.translation_index is None:
+            cls.translation_index = TranslationIndex(mapping_country_names)
+        return NameResolver(
+            get_country_aliases(cls.translation_index, countries_by_alpha3.values()),
+            alias_cache if alias_cache is not None else AliasCache(),
+            suggest,
+        )
+
+    def _resolve(self, names):
+        if self.resolver is None:
+            if CountryNameTranslator.default_resolver is None:
+                CountryNameTranslator.default_resolver = self.get_resolver()
+            self.resolver = CountryNameTranslator.default_resolver
+        return self.resolver.resolve(names)
 
     def run(
         self, series_country_to_translate: pd.Series, raise_errors: bool
     ) -> pd.Series:
         """
-        Maps the country names from the provided Series to standardized names. If no correspondence
-        is found in the mapping, the country is replaced by a NaN value.
+        Maps the country names from the provided Series to standardized names, also
+        matching the variants of spacing, case and accent encoding of the mapping (see
+        TranslationIndex), and then the names resolved by the resolver. If no
+        correspondence is found, the country is replaced by a NaN value.
         :param series_country_to_translate: (pandas Series) to translate.
         :param raise_errors: (bool) True to raise error if no translation. Else False to ignore.
         :return:
         """
-        series_country_translated = series_country_to_translate.map(
-            self.country_name_translations
-        )
-        countries_no_translating = list(
-            set(
-                series_country_translated[
-                    series_country_translated.isnull()
-                ].values.tolist()
+        series_country_translated, countries_no_translating = (
+            self.translation_index.translate(
+                series_country_to_translate, resolve=self._resolve
             )
         )
-        if series_country_translated.isnull().sum() > 0:
+        if len(countries_no_translating) > 0:
             print(
                 "WARNING : no translating found for %s countries"
                 % len(countries_no_translating)
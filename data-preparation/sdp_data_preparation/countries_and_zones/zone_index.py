@@ -0,0 +1,346 @@
+import hashlib
+import os
+import pickle
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sdp_data_preparation.utils import read_csv
+
+try:
+    from scipy import sparse
+except ImportError:  # the membership matrix is then not built
+    sparse = None
+
+COUNTRIES_AND_ZONES_RELATIVE_PATH = "data/countries/countries_and_zones.csv"
+ZONE_INDEX_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "../../.pipeline_cache/zone_index"
+)
+ZONE_COLNAMES = ["group_type", "group_name"]
+# Optional first and last years (included) of the memberships, unbounded when missing
+VALIDITY_COLNAMES = ["valid_from", "valid_to"]
+YEAR_COLNAME = "year"
+
+# Zone indexes built by the process, by hash of their reference
+_ZONE_INDEXES: Dict[str, "ZoneIndex"] = {}
+# Hashes of the reference files read by the process, by path, with their size and
+# modification time, so that a file is only read again when it changes
+_REFERENCE_HASHES: Dict[str, Tuple[str, str]] = {}
+# Version of the attributes of the ZoneIndex, in the name of the cached files
+ZONE_INDEX_VERSION = 3
+
+
+class ZoneIndex:
+    """
+    Index of the countries and zones reference, built once and shared by the
+    processors: the countries and the zones (group type, group name) are encoded as
+    integers, the memberships as arrays of codes and as a sparse zone x country
+    matrix, so that the statistics are checked and aggregated per zone without
+    merging them with the reference.
+    When the reference gives the validity of the memberships (`valid_from` and
+    `valid_to`), the years where a membership starts or ends split the time into
+    periods in which the memberships do not change, and `period_membership` is the
+    zone x (country, period) matrix of the memberships valid in each period.
+    """
+
+    def __init__(self, countries_and_zones: pd.DataFrame) -> None:
+        # A copy, so that the codes stay valid if the given frame is modified
+        validity_colnames = [
+            colname
+            for colname in VALIDITY_COLNAMES
+            if colname in countries_and_zones.columns
+        ]
+        countries_and_zones = countries_and_zones[
+            ZONE_COLNAMES + ["country"] + validity_colnames
+        ].copy()
+        self.countries_and_zones = countries_and_zones
+        self.country_codes, countries = pd.factorize(countries_and_zones["country"])
+        self.countries = pd.Index(countries)
+        self.zone_codes, self.zones = factorize_columns(
+            countries_and_zones, ZONE_COLNAMES
+        )
+        self.group_types = self.zones["group_type"]
+        # The memberships of the reference, without the rows with a missing key
+        is_member = (self.country_codes != -1) & (self.zone_codes != -1)
+        self.member_zone_codes = self.zone_codes[is_member]
+        self.member_country_codes = self.country_codes[is_member]
+        self.zone_sizes = np.bincount(self.member_zone_codes, minlength=len(self.zones))
+        self.zone_lookup = pd.MultiIndex.from_frame(self.zones)
+
+        self.is_time_varying = len(validity_colnames) > 0
+        self.member_valid_from = self._get_years("valid_from", -np.inf)[is_member]
+        self.member_valid_to = self._get_years("valid_to", np.inf)[is_member]
+        bounds = np.concatenate([self.member_valid_from, self.member_valid_to + 1])
+        # Period p covers the years from period_bounds[p - 1] to period_bounds[p]
+        # (excluded), the last one being the current period
+        self.period_bounds = np.unique(bounds[np.isfinite(bounds)])
+        self.n_periods = len(self.period_bounds) + 1
+        period_starts = np.concatenate([[-np.inf], self.period_bounds])
+        period_ends = np.concatenate([self.period_bounds, [np.inf]])
+        # Interval join of the memberships and the periods
+        member_positions, member_periods = np.nonzero(
+            (self.member_valid_from[:, np.newaxis] <= period_starts)
+            & (self.member_valid_to[:, np.newaxis] + 1 >= period_ends)
+        )
+        self.period_member_zone_codes = self.member_zone_codes[member_positions]
+        self.period_member_rows = (
+            self.member_country_codes[member_positions] * self.n_periods
+            + member_periods
+        )
+        self.period_zone_sizes = np.bincount(
+            self.period_member_zone_codes * self.n_periods + member_periods,
+            minlength=len(self.zones) * self.n_periods,
+        ).reshape(len(self.zones), self.n_periods)
+
+        self.membership = None
+        self.period_membership = None
+        # The ZoneHierarchy of the zones, derived when needed
+        self.hierarchy = None
+        if sparse is not None:
+            self.membership = sparse.csr_matrix(
+                (
+                    np.ones(len(self.member_zone_codes)),
+                    (self.member_zone_codes, self.member_country_codes),
+                ),
+                shape=(len(self.zones), len(self.countries)),
+            )
+            self.period_membership = sparse.csr_matrix(
+                (
+                    np.ones(len(self.period_member_rows)),
+                    (self.period_member_zone_codes, self.period_member_rows),
+                ),
+                shape=(len(self.zones), len(self.countries) * self.n_periods),
+            )
+
+    def _get_years(self, colname: str, default: float) -> np.ndarray:
+        if colname not in self.countries_and_zones.columns:
+            return np.full(len(self.countries_and_zones), default)
+        return (
+            pd.to_numeric(self.countries_and_zones[colname], errors="coerce")
+            .fillna(default)
+            .to_numpy(dtype=float)
+        )
+
+    def get_periods(self, years: Optional[pd.Series]) -> np.ndarray:
+        """
+        Returns the period of the memberships of each year. The missing years, or all
+        of them when `years` is None, get the current period.
+        """
+        if years is None:
+            return np.array([self.n_periods - 1])
+        years = pd.to_numeric(
+            pd.Series(np.asarray(years, dtype=object)), errors="coerce"
+        ).to_numpy(dtype=float)
+        periods = np.searchsorted(self.period_bounds, years, side="right")
+        periods[np.isnan(years)] = self.n_periods - 1
+        return periods
+
+    def get_cell_periods(self, cells: pd.DataFrame) -> np.ndarray:
+        """
+        Returns the period of the memberships of each cell of the dimensions (year,
+        sector...), the current period when the cells have no year.
+        """
+        if YEAR_COLNAME in cells.columns:
+            return self.get_periods(cells[YEAR_COLNAME])
+        return np.full(len(cells), self.n_periods - 1)
+
+    def get_country_codes(self, countries: pd.Series) -> np.ndarray:
+        """
+        Returns the code of each country, -1 when it is not in the reference.
+        """
+        return self.countries.get_indexer(countries)
+
+    def get_zone_code(self, group_type: str, group_name: str) -> int:
+        return self.zone_lookup.get_loc((group_type, group_name))
+
+    def get_member_countries(
+        self, group_type: str, group_name: str, year: Optional[int] = None
+    ) -> List[str]:
+        """
+        Returns the members of a zone, in a given year or whenever they were members.
+        """
+        zone_code = self.get_zone_code(group_type, group_name)
+        is_member = self.member_zone_codes == zone_code
+        if year is not None:
+            is_member &= self.member_valid_from <= year
+            is_member &= self.member_valid_to >= year
+        return list(self.countries.take(self.member_country_codes[is_member]))
+
+    def join_memberships(
+        self, countries: pd.Series, years: pd.Series
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Interval join of rows given by their country and year with the memberships
+        valid in their year. Returns the positions of the matching rows, and the code
+        of the zone of each match.
+        """
+        country_codes = self.get_country_codes(countries)
+        rows = country_codes * self.n_periods + self.get_periods(years)
+        rows[country_codes == -1] = -1
+        # The memberships sorted by row of the period membership matrix
+        order = np.argsort(self.period_member_rows, kind="stable")
+        sorted_rows = self.period_member_rows[order]
+        starts = np.searchsorted(sorted_rows, rows, side="left")
+        ends = np.searchsorted(sorted_rows, rows, side="right")
+        counts = np.where(rows == -1, 0, ends - starts)
+        positions = np.repeat(np.arange(len(rows)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        matches = order[np.repeat(starts, counts) + offsets]
+        return positions, self.period_member_zone_codes[matches]
+
+    def get_missing_members(self, countries: pd.Series) -> pd.DataFrame:
+        """
+        Returns the rows of the reference whose country is not in the given ones.
+        """
+        is_present = np.zeros(len(self.countries) + 1, dtype=bool)
+        is_present[self.get_country_codes(pd.unique(countries))] = True
+        # The rows with a missing country (code -1) point to the last slot
+        is_present[-1] = False
+        return self.countries_and_zones[~is_present[self.country_codes]]
+
+    def get_unmatched_countries(self, countries: pd.Series) -> List[str]:
+        """
+        Returns the given countries which are not in the reference.
+        """
+        unique_countries = pd.unique(countries)
+        return list(unique_countries[self.get_country_codes(unique_countries) == -1])
+
+    def save(self, filepath: str) -> None:
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        tmp_filepath = f"{filepath}.{os.getpid()}.tmp"
+        with open(tmp_filepath, "wb") as file:
+            pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filepath, filepath)
+
+    @staticmethod
+    def load(filepath: str) -> "ZoneIndex":
+        with open(filepath, "rb") as file:
+            return pickle.load(file)
+
+
+def get_zone_index(
+    project_root_path: str, cache_path: Optional[str] = ZONE_INDEX_CACHE_PATH
+) -> ZoneIndex:
+    """
+    Returns the ZoneIndex of the countries and zones reference of the project, read
+    once per process: the next calls only check the size and the modification time of
+    the reference. It is stored under `<cache_path>/<SHA-256 of the reference>.v<
+    ZONE_INDEX_VERSION>.pkl` to be loaded warm by the next runs, and built again when
+    the reference or the ZoneIndex changes. The files of the previous versions of the
+    ZoneIndex are then removed.
+    `cache_path=None` disables the cache on disk.
+    """
+    filepath = os.path.join(project_root_path, COUNTRIES_AND_ZONES_RELATIVE_PATH)
+    file_stat = os.stat(filepath)
+    file_key = f"{file_stat.st_size}:{file_stat.st_mtime_ns}"
+    if filepath in _REFERENCE_HASHES and _REFERENCE_HASHES[filepath][0] == file_key:
+        file_hash = _REFERENCE_HASHES[filepath][1]
+        if file_hash in _ZONE_INDEXES:
+            return _ZONE_INDEXES[file_hash]
+    with open(filepath, "rb") as file:
+        file_hash = hashlib.sha256(file.read()).hexdigest()
+    _REFERENCE_HASHES[filepath] = (file_key, file_hash)
+    if file_hash in _ZONE_INDEXES:
+        return _ZONE_INDEXES[file_hash]
+
+    cached_filepath = (
+        os.path.join(cache_path, f"{file_hash}.v{ZONE_INDEX_VERSION}.pkl")
+        if cache_path is not None
+        else None
+    )
+    if cached_filepath is not None and os.path.exists(cached_filepath):
+        zone_index = ZoneIndex.load(cached_filepath)
+    else:
+        # The validity of the memberships is optional in the reference
+        schema = (
+            "countries_and_zones_with_validity"
+            if set(VALIDITY_COLNAMES).issubset(pd.read_csv(filepath, nrows=0).columns)
+            else "countries_and_zones"
+        )
+        zone_index = ZoneIndex(read_csv(filepath, schema))
+        if cached_filepath is not None:
+            zone_index.save(cached_filepath)
+            _remove_previous_versions(cache_path)
+    _ZONE_INDEXES[file_hash] = zone_index
+    return zone_index
+
+
+def _remove_previous_versions(cache_path: str) -> None:
+    """
+    Removes the ZoneIndex files of the versions other than ZONE_INDEX_VERSION, which
+    are never read again.
+    """
+    for filename in os.listdir(cache_path):
+        if filename.endswith(".pkl") and not filename.endswith(
+            f".v{ZONE_INDEX_VERSION}.pkl"
+        ):
+            try:
+                os.remove(os.path.join(cache_path, filename))
+            except FileNotFoundError:  # Already removed by another process
+                pass
+
+
+def get_zone_index_of(countries_and_zones: pd.DataFrame) -> ZoneIndex:
+    """
+    Returns the ZoneIndex of a countries and zones reference given as a frame, built
+    once per process for the same content.
+    """
+    colnames = ZONE_COLNAMES + ["country"]
+    colnames += [
+        colname for colname in VALIDITY_COLNAMES if colname in countries_and_zones
+    ]
+    row_hashes = pd.util.hash_pandas_object(countries_and_zones[colnames], index=False)
+    content_hash = hashlib.sha256(row_hashes.to_numpy().tobytes()).hexdigest()
+    if content_hash not in _ZONE_INDEXES:
+        _ZONE_INDEXES[content_hash] = ZoneIndex(countries_and_zones)
+    return _ZONE_INDEXES[content_hash]
+
+
+def factorize_columns(
+    df: pd.DataFrame, colnames: List[str]
+) -> Tuple[np.ndarray, pd.DataFrame]:
+    """
+    Returns the code of each row for the combination of the given columns (-1 when
+    one of them is missing), and the frame of the distinct combinations by code.
+    """
+    is_missing = np.zeros(len(df), dtype=bool)
+    codes = np.zeros(len(df), dtype=np.int64)
+    for colname in colnames:
+        column_codes, column_uniques = pd.factorize(df[colname])
+        is_missing |= column_codes == -1
+        # The codes are made dense again after each column, so that they stay small
+        codes, _ = pd.factorize(codes * len(column_uniques) + column_codes)
+
+    positions = np.flatnonzero(~is_missing)
+    combination_codes = np.full(len(df), -1, dtype=np.int64)
+    combination_codes[positions], combinations = pd.factorize(codes[positions])
+    # Row of the first occurrence of each combination
+    first_positions = np.empty(len(combinations), dtype=np.int64)
+    first_positions[combination_codes[positions][::-1]] = positions[::-1]
+    return combination_codes, df[colnames].iloc[first_positions].reset_index(drop=True)
+
+
+def filter_valid_memberships(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keeps the rows of a merge of the statistics with a reference giving the validity of
+    the memberships whose year is in the validity of their membership.
+    """
+    if YEAR_COLNAME not in df.columns or not any(
+        colname in df.columns for colname in VALIDITY_COLNAMES
+    ):
+        return df
+    years = pd.to_numeric(
+        pd.Series(np.asarray(df[YEAR_COLNAME], dtype=object), index=df.index),
+        errors="coerce",
+    )
+    is_valid = pd.Series(True, index=df.index)
+    if "valid_from" in df.columns:
+        valid_from = pd.to_numeric(df["valid_from"], errors="coerce")
+        is_valid &= valid_from.isna() | years.isna() | (years >= valid_from)
+    if "valid_to" in df.columns:
+        valid_to = pd.to_numeric(df["valid_to"], errors="coerce")
+        # The missing years get the current memberships
+        is_valid &= valid_to.isna() | (years <= valid_to)
+    return df[is_valid.to_numpy()]
@@ -3,8 +3,9 @@ import os
 import pandas as pd
 from sdp_data_preparation.countries_and_zones import (
     StatisticsPerCountriesAndZonesProcessor,
+    get_zone_index,
 )
-from sdp_data_preparation.utils import StatisticsDataframeFormatter
+from sdp_data_preparation.utils import StatisticsDataframeFormatter, read_csv
 
 
 def stage_proven_reserves(project_root_path: str) -> pd.DataFrame:
@@ -47,15 +48,14 @@ def _get_proven_reserves(project_root_path: str, fossil_fuel: str) -> pd.DataFra
     proven_reserves_filepath = os.path.join(
         project_root_path, f"data/opec/stg_proven_reserves_{fossil_fuel}.csv"
     )
-    countries_and_zones_filepath = os.path.join(
-        project_root_path, "data/countries/countries_and_zones.csv"
+    proven_reserves_by_country = read_csv(
+        proven_reserves_filepath, "stg_proven_reserves"
     )
-    proven_reserves_by_country = pd.read_csv(proven_reserves_filepath)
-    countries_and_zones = pd.read_csv(countries_and_zones_filepath)
+    zone_index = get_zone_index(project_root_path)
 
     processor = StatisticsPerCountriesAndZonesProcessor(
         df=proven_reserves_by_country,
-        countries_and_zones=countries_and_zones,
+        countries_and_zones=zone_index,
         group_by_colnames=[
             "group_type",
             "group_name",
@@ -3,23 +3,21 @@ import os
 import pandas as pd
 from sdp_data_preparation.countries_and_zones import (
     StatisticsPerCountriesAndZonesProcessor,
+    get_zone_index,
 )
-from sdp_data_preparation.utils import StatisticsDataframeFormatter
+from sdp_data_preparation.utils import StatisticsDataframeFormatter, read_csv
 
 
 def process_final_population(project_root_path: str) -> pd.DataFrame:
     population_filepath = os.path.join(
         project_root_path, f"data/gapminder/stg_population.csv"
     )
-    countries_and_zones_filepath = os.path.join(
-        project_root_path, "data/countries/countries_and_zones.csv"
-    )
-    population_by_country = pd.read_csv(population_filepath)
-    countries_and_zones = pd.read_csv(countries_and_zones_filepath)
+    population_by_country = read_csv(population_filepath, "stg_population")
+    zone_index = get_zone_index(project_root_path)
 
     processor = StatisticsPerCountriesAndZonesProcessor(
         df=population_by_country,
-        countries_and_zones=countries_and_zones,
+        countries_and_zones=zone_index,
         group_by_colnames=["group_type", "group_name", "year"],
         aggregations={"population": "sum"},
     )
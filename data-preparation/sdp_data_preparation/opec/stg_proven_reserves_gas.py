@@ -2,11 +2,12 @@ import os
 
 import pandas as pd
 from sdp_data_preparation.countries_and_zones import CountryNameTranslator
+from sdp_data_preparation.utils.excel import read_excel
 
 
 def stage_proven_reserves_gas(opec_data_path: str) -> pd.DataFrame:
     filepath = os.path.join(opec_data_path, "raw_proven_reserves_gas.xlsx")
-    proven_reserves_gas = pd.read_excel(filepath)
+    proven_reserves_gas = read_excel(filepath)
     df = _set_columns(proven_reserves_gas)
     df = _drop_unnecessary_lines(df)
     df = _translate_country(df)
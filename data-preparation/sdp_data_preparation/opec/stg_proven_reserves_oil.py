@@ -2,6 +2,7 @@ import os
 
 import pandas as pd
 from sdp_data_preparation.countries_and_zones import CountryNameTranslator
+from sdp_data_preparation.utils.excel import read_excel
 
 # TODO: vérifier droits de licence OPEC
 # TODO: remplacer les totaux par ceux déjà donnés dans le fichier ?
@@ -9,7 +10,7 @@ from sdp_data_preparation.countries_and_zones import CountryNameTranslator
 
 def stage_proven_reserves_oil(opec_data_path: str) -> pd.DataFrame:
     filepath = os.path.join(opec_data_path, "raw_proven_reserves_oil.xlsx")
-    proven_reserves_oil = pd.read_excel(filepath)
+    proven_reserves_oil = read_excel(filepath)
     df = _set_columns(proven_reserves_oil)
     df = _drop_unnecessary_lines(df)
     df = _convert_from_mb_to_gb(df)
@@ -1,7 +1,9 @@
+from .final_greenhouse_gas_emissions import process_final_greenhouse_gas_emissions
 from .final_greenhouse_gas_emissions_by_gas import (
     process_final_greenhouse_gas_emissions_by_gas,
 )
 from .final_greenhouse_gas_emissions_by_sector import (
     process_final_greenhouse_gas_emissions_by_sector,
 )
+from .raw_dataset import partition_raw_dataset, read_raw_dataset
 from .stg_greenhouse_gas_emissions import stage_greenhouse_gas_emissions
@@ -0,0 +1,70 @@
+import os
+from typing import Dict, List, Optional
+
+import pandas as pd
+from sdp_data_preparation.countries_and_zones import (
+    StatisticsPerCountriesAndZonesProcessor,
+    get_zone_index,
+)
+from sdp_data_preparation.utils import StatisticsDataframeFormatter, read_csv
+
+from .common import rename_stg_columns_for_prod
+
+# Columns added to the year and the unit by each final dataset
+GROUPING_SETS = {
+    "by_gas": ["gas"],
+    "by_sector": ["sector"],
+    "aggregated": [],
+}
+
+
+def process_final_greenhouse_gas_emissions(
+    project_root_path: str, datasets: Optional[List[str]] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Computes the final datasets of the emissions per country and zone (by gas, by
+    sector and aggregated, or only the given ones) from a single pass over the
+    staging dataset.
+    """
+    if datasets is None:
+        datasets = list(GROUPING_SETS)
+
+    ghg_emissions_filepath = os.path.join(
+        project_root_path, f"data/pik/stg_greenhouse_gas_emissions.csv"
+    )
+    ghg_emissions_by_country = read_csv(
+        ghg_emissions_filepath, "stg_greenhouse_gas_emissions"
+    )
+    ghg_emissions_by_country = rename_stg_columns_for_prod(ghg_emissions_by_country)
+    zone_index = get_zone_index(project_root_path)
+
+    processor = StatisticsPerCountriesAndZonesProcessor(
+        df=ghg_emissions_by_country,
+        countries_and_zones=zone_index,
+        group_by_colnames=["group_type", "group_name", "year", "ghg_unit"],
+        aggregations={"ghg": "sum"},
+    )
+    list_ghg_emissions_by_country_and_zone = processor.run_grouping_sets(
+        [GROUPING_SETS[dataset] for dataset in datasets]
+    )
+    return {
+        dataset: _format_final_dataset(dataset, ghg_emissions_by_country_and_zone)
+        for dataset, ghg_emissions_by_country_and_zone in zip(
+            datasets, list_ghg_emissions_by_country_and_zone
+        )
+    }
+
+
+def _format_final_dataset(
+    dataset: str, ghg_emissions_by_country_and_zone: pd.DataFrame
+) -> pd.DataFrame:
+    formatter = StatisticsDataframeFormatter(
+        df=ghg_emissions_by_country_and_zone,
+        col_statistics="ghg",
+    )
+    df = formatter.run()
+
+    df["source"] = "PIK"
+    if dataset == "by_gas":
+        df["including_lucf"] = None
+    return df[(df["ghg"] != 0) & (df["group_name"] != "Antarctica")]
@@ -0,0 +1,69 @@
+import os
+import shutil
+from typing import List, Optional
+from urllib.parse import unquote
+
+import pandas as pd
+
+PARTITION_COLUMNS = ["scenario", "entity"]
+
+# The codes are read as text, whatever the values of the column
+RAW_CODE_COLUMNS_DTYPES = {
+    "scenario (PRIMAP-hist)": str,
+    "area (ISO3)": str,
+    "category (IPCC2006_PRIMAP)": str,
+    "entity": str,
+    "unit": str,
+}
+
+
+def partition_raw_dataset(src_filepath: str, dst_path: str) -> None:
+    """
+    Converts the original PRIMAP-hist CSV into a Parquet dataset compressed with
+    zstd and partitioned by scenario and entity: `<dst_path>/scenario=HISTTP/entity=CO2/`.
+    Readers only open the partitions they need. The column 'source' is dropped,
+    it is always 'PRIMAP-hist_v2.5_final'.
+    """
+    df = pd.read_csv(src_filepath, dtype=RAW_CODE_COLUMNS_DTYPES)
+    df = df.drop(columns=["source"]).rename(
+        columns={"scenario (PRIMAP-hist)": "scenario"}
+    )
+    if os.path.exists(dst_path):
+        shutil.rmtree(dst_path)
+    df.to_parquet(
+        dst_path, partition_cols=PARTITION_COLUMNS, compression="zstd", index=False
+    )
+
+
+def list_entities(path: str, scenario: str) -> List[str]:
+    """
+    Returns the entities (gases and baskets of gases) of a scenario, from the
+    names of the partitions only.
+    """
+    scenario_path = os.path.join(path, f"scenario={scenario}")
+    return sorted(
+        unquote(name.split("=", 1)[1])
+        for name in os.listdir(scenario_path)
+        if name.startswith("entity=")
+    )
+
+
+def read_raw_dataset(
+    path: str,
+    scenario: str,
+    entities: Optional[List[str]] = None,
+    categories: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Reads the rows of a scenario from the partitioned dataset. Only the partitions
+    of the given entities are read, and the rows of the other categories are
+    filtered out while reading.
+    """
+    filters = [("scenario", "==", scenario)]
+    if entities is not None:
+        filters.append(("entity", "in", entities))
+    if categories is not None:
+        filters.append(("category (IPCC2006_PRIMAP)", "in", categories))
+    df = pd.read_parquet(path, filters=filters)
+    # The partition columns are read as categories
+    return df.astype({"scenario": str, "entity": str})
@@ -10,8 +10,14 @@ from sdp_data_preparation.countries_and_zones import (
 )
 from sdp_data_preparation.utils import StatisticsDataframeFormatter
 
+from .raw_dataset import list_entities, read_raw_dataset
+
 GLOBAL_WARMING_POTENTIAL_CODE_REGEX = r"\((S?AR[456]?)GWP100\)"
 
+# Third-party scenario: the country-reported data is prioritized only when
+# third-party data is not available
+THIRD_PARTY_SCENARIO = "HISTTP"
+
 
 class AssessmentReport(StrEnum):
     SECOND = "SAR"
@@ -28,14 +34,19 @@ class Sector(StrEnum):
     WASTE = "Waste"
 
 
+# Codes of the IPCC 2006 categories used
+SECTOR_CODES = {
+    "1": Sector.ENERGY,
+    "2": Sector.INDUSTRY_AND_CONSTRUCTION,
+    "M.AG": Sector.AGRICULTURE,
+    "4": Sector.WASTE,
+    "5": Sector.OTHERS,
+}
+
+
 def stage_greenhouse_gas_emissions(data_filepath: str) -> pd.DataFrame:
-    filepath = os.path.join(
-        data_filepath, "raw_greenhouse_gas_emissions_third_party.csv"
-    )
-    df = pd.read_csv(filepath)
-    df = _rename_columns(df)
-    df = _filter_gases(df)
-    df = _filter_sectors(df)
+    path = os.path.join(data_filepath, "raw_greenhouse_gas_emissions")
+    df = _read_raw_emissions(path)
     df = _filter_countries(df)
     df = _add_global_warming_potential(df)
     df = _unpivot_years(df)
@@ -47,6 +58,25 @@ def stage_greenhouse_gas_emissions(data_filepath: str) -> pd.DataFrame:
     return _aggregate_and_format(df)
 
 
+def _read_raw_emissions(path: str) -> pd.DataFrame:
+    """
+    Reads the third-party scenario of the partitioned raw dataset. Only the
+    partitions of the gases used are opened and only the rows of the sectors
+    used are kept, before any translation or unpivot.
+    """
+    gases = [
+        gas for gas in list_entities(path, THIRD_PARTY_SCENARIO) if _is_gas_used(gas)
+    ]
+    df = read_raw_dataset(
+        path,
+        THIRD_PARTY_SCENARIO,
+        entities=gases,
+        categories=list(SECTOR_CODES),
+    )
+    df = df.drop(columns=["scenario", "provenance"])
+    return _filter_sectors(_filter_gases(_rename_columns(df)))
+
+
 def _rename_columns(df: pd.DataFrame) -> pd.DataFrame:
     df = utils.clean_column_names(df)
     return df.rename(
@@ -71,6 +101,13 @@ def _filter_gases(df: pd.DataFrame) -> pd.DataFrame:
     ]
 
 
+def _is_gas_used(original_gas_value: str) -> bool:
+    assessment_report_code = _get_assessment_report_code(original_gas_value)
+    gas = _remove_global_warming_potential_code(original_gas_value)
+    is_aggregation = _identify_gas_aggregation(gas)
+    return not is_aggregation and assessment_report_code in [None, "AR6"]
+
+
 def _get_assessment_report_code(original_gas_value: str) -> str:
     match = re.search(GLOBAL_WARMING_POTENTIAL_CODE_REGEX, original_gas_value)
     return match.group(1) if match else None
@@ -86,15 +123,7 @@ def _identify_gas_aggregation(cleaned_gas_value: str) -> bool:
 
 
 def _filter_sectors(df: pd.DataFrame) -> pd.DataFrame:
-    df["sector"] = df["sector"].replace(
-        {
-            "1": Sector.ENERGY,
-            "2": Sector.INDUSTRY_AND_CONSTRUCTION,
-            "M.AG": Sector.AGRICULTURE,
-            "4": Sector.WASTE,
-            "5": Sector.OTHERS,
-        }
-    )
+    df["sector"] = df["sector"].replace(SECTOR_CODES)
     return df[df["sector"].isin([sector.value for sector in Sector])]
 
 
@@ -138,7 +167,6 @@ def _add_global_warming_potential(df: pd.DataFrame) -> pd.DataFrame:
 def _unpivot_years(df: pd.DataFrame) -> pd.DataFrame:
     df = df.drop(
         columns=[
-            "provenance",
             "country_code",
             "used_global_warming_potential",
             "is_gas_aggregation",
@@ -1,2 +1,6 @@
+from .excel import ExcelCache, read_excel, read_excel_sheets
 from .formatters import StatisticsDataframeFormatter
+from .name_resolver import AliasCache, NameResolver, get_country_aliases
+from .schemas import SCHEMAS, DatasetSchema, read_csv
+from .translation_index import TranslationIndex, normalize_name
 from .utils import *
@@ -0,0 +1,234 @@
+import hashlib
+import os
+import pickle
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+EXCEL_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "../../.pipeline_cache/excel"
+)
+# The sheets least recently read are evicted above 5 GB
+EXCEL_CACHE_MAX_SIZE = 5 * 1024**3
+CACHED_SHEET_EXTENSIONS = [".parquet", ".pkl"]
+
+# Excel caches used by `read_excel_sheets`, by directory, so that the hashes of the
+# workbooks are computed once per process
+_EXCEL_CACHES: Dict[str, "ExcelCache"] = {}
+
+
+def read_workbook_sheets(
+    filepath: str, sheet_names: List[Any], **kwargs
+) -> Dict[Any, pd.DataFrame]:
+    """
+    Reads several sheets of an Excel workbook, returned by sheet name, opening it
+    once: `pd.read_excel` called once per sheet unzips the workbook and parses its
+    shared strings and styles again each time. Only the requested sheets are parsed.
+    """
+    with pd.ExcelFile(filepath) as workbook:
+        return {
+            sheet_name: pd.read_excel(workbook, sheet_name=sheet_name, **kwargs)
+            for sheet_name in sheet_names
+        }
+
+
+class ExcelCache:
+    """
+    Sheets of the Excel workbooks converted into Parquet the first time they are
+    read, so that the next reads (in the next runs, or in the other processes) do not
+    parse the workbooks again. A sheet is stored under
+    `<directory>/<SHA-256 of the workbook>/<hash of the sheet and reader arguments>`,
+    so that a modified workbook is parsed again, and the sheets least recently read
+    are evicted above `max_size` bytes. Sheets that Parquet cannot store as they are
+    (columns mixing numbers and text, non-string column names, pyarrow not installed)
+    are pickled instead, to be read back unchanged.
+    """
+
+    def __init__(
+        self, directory: str = EXCEL_CACHE_PATH, max_size: int = EXCEL_CACHE_MAX_SIZE
+    ) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        # Hashes of the workbooks by path, with the size and modification time hashed
+        self.file_hashes: Dict[str, Tuple[str, str]] = {}
+
+    @staticmethod
+    def get_sheet_key(sheet_name: Any, read_kwargs: Dict[str, Any]) -> str:
+        sheet_key = repr((sheet_name, sorted(read_kwargs.items())))
+        return hashlib.sha256(sheet_key.encode()).hexdigest()[:16]
+
+    def _hash_file(self, filepath: str) -> str:
+        """
+        Returns the SHA-256 of a workbook, computed again only when its size or its
+        modification time change.
+        """
+        file_stat = os.stat(filepath)
+        file_key = f"{file_stat.st_size}:{file_stat.st_mtime_ns}"
+        if filepath in self.file_hashes and self.file_hashes[filepath][0] == file_key:
+            return self.file_hashes[filepath][1]
+        file_hash = hashlib.sha256()
+        with open(filepath, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                file_hash.update(chunk)
+        self.file_hashes[filepath] = (file_key, file_hash.hexdigest())
+        return file_hash.hexdigest()
+
+    def _get_entry_basepath(
+        self, filepath: str, sheet_name: Any, read_kwargs: Dict[str, Any]
+    ) -> str:
+        return os.path.join(
+            self.directory,
+            self._hash_file(filepath),
+            self.get_sheet_key(sheet_name, read_kwargs),
+        )
+
+    def get_entry_filepath(
+        self, filepath: str, sheet_name: Any, read_kwargs: Dict[str, Any]
+    ) -> Optional[str]:
+        """
+        Returns the file storing the sheet of the workbook, None if it is not cached.
+        """
+        entry_basepath = self._get_entry_basepath(filepath, sheet_name, read_kwargs)
+        for extension in CACHED_SHEET_EXTENSIONS:
+            if os.path.exists(entry_basepath + extension):
+                return entry_basepath + extension
+        return None
+
+    def read(self, filepath: str, sheet_name: Any = 0, **kwargs) -> Any:
+        """
+        Reads a workbook like `pd.read_excel`, from the cache if its sheets were
+        already read: a sheet, or the sheets by name when a list of sheets is given.
+        `sheet_name=None` reads all the sheets without the cache.
+        """
+        if sheet_name is None or not os.path.exists(filepath):
+            return pd.read_excel(filepath, sheet_name=sheet_name, **kwargs)
+        if isinstance(sheet_name, list):
+            return self.read_sheets(filepath, sheet_name, **kwargs)
+        return self.read_sheets(filepath, [sheet_name], **kwargs)[sheet_name]
+
+    def read_sheets(
+        self, filepath: str, sheet_names: List[Any], **kwargs
+    ) -> Dict[Any, pd.DataFrame]:
+        """
+        Reads several sheets of a workbook, returned by sheet name. The workbook is
+        opened once, and only when some sheets are not in the cache.
+        """
+        sheets = {}
+        for sheet_name in sheet_names:
+            entry_filepath = self.get_entry_filepath(filepath, sheet_name, kwargs)
+            if entry_filepath is not None:
+                os.utime(entry_filepath)  # The sheet is the most recently read
+                sheets[sheet_name] = _read_cached_sheet(entry_filepath)
+        missing_sheet_names = [name for name in sheet_names if name not in sheets]
+        if len(missing_sheet_names) > 0:
+            parsed_sheets = read_workbook_sheets(
+                filepath, missing_sheet_names, **kwargs
+            )
+            for sheet_name, df in parsed_sheets.items():
+                self.save(filepath, sheet_name, kwargs, df)
+            sheets.update(parsed_sheets)
+        return {sheet_name: sheets[sheet_name] for sheet_name in sheet_names}
+
+    def save(
+        self,
+        filepath: str,
+        sheet_name: Any,
+        read_kwargs: Dict[str, Any],
+        df: pd.DataFrame,
+    ) -> None:
+        """
+        Stores a sheet read, then evicts the sheets least recently read if the cache
+        is too large.
+        """
+        entry_filepath = _write_cached_sheet(
+            df, self._get_entry_basepath(filepath, sheet_name, read_kwargs)
+        )
+        self.evict(entry_kept=entry_filepath)
+
+    def get_entries(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            os.path.join(dirpath, filename)
+            for dirpath, _, filenames in os.walk(self.directory)
+            for filename in filenames
+            if os.path.splitext(filename)[1] in CACHED_SHEET_EXTENSIONS
+        ]
+
+    def evict(self, entry_kept: Optional[str] = None) -> None:
+        """
+        Removes the sheets least recently read until the size of the cache is below
+        its maximum size. The sheet `entry_kept` is never removed, even if it is
+        larger than the cache alone.
+        """
+        sizes = {entry: os.path.getsize(entry) for entry in self.get_entries()}
+        total_size = sum(sizes.values())
+        for entry in sorted(sizes, key=os.path.getmtime):
+            if total_size <= self.max_size:
+                break
+            if entry == entry_kept:
+                continue
+            sheet_path = os.path.relpath(entry, self.directory)
+            print(f"-- excel cache : evicting sheet {sheet_path}")
+            total_size -= sizes[entry]
+            try:
+                os.remove(entry)
+            except FileNotFoundError:  # Already evicted by another process
+                pass
+
+
+def read_excel(
+    filepath: str,
+    sheet_name: Any = 0,
+    cache_path: Optional[str] = EXCEL_CACHE_PATH,
+    **kwargs,
+) -> pd.DataFrame:
+    """
+    Reads a sheet of an Excel workbook like `pd.read_excel`, but converts it into
+    Parquet the first time it is read: the next reads do not parse the workbook again
+    (see ExcelCache). `cache_path=None` disables the cache.
+    """
+    return read_excel_sheets(filepath, [sheet_name], cache_path, **kwargs)[sheet_name]
+
+
+def read_excel_sheets(
+    filepath: str,
+    sheet_names: List[Any],
+    cache_path: Optional[str] = EXCEL_CACHE_PATH,
+    **kwargs,
+) -> Dict[Any, pd.DataFrame]:
+    """
+    Reads several sheets of an Excel workbook, returned by sheet name. The workbook
+    is opened once, and only the sheets which are not in the cache are parsed.
+    """
+    if cache_path is None:
+        return read_workbook_sheets(filepath, sheet_names, **kwargs)
+    if cache_path not in _EXCEL_CACHES:
+        _EXCEL_CACHES[cache_path] = ExcelCache(cache_path)
+    return _EXCEL_CACHES[cache_path].read_sheets(filepath, sheet_names, **kwargs)
+
+
+def _read_cached_sheet(entry_filepath: str) -> pd.DataFrame:
+    if entry_filepath.endswith(".parquet"):
+        return pd.read_parquet(entry_filepath)
+    with open(entry_filepath, "rb") as file:
+        return pickle.load(file)
+
+
+def _write_cached_sheet(df: pd.DataFrame, entry_basepath: str) -> str:
+    """
+    Writes a sheet in the cache, in Parquet or else pickled, and returns its file.
+    """
+    os.makedirs(os.path.dirname(entry_basepath), exist_ok=True)
+    # Written aside then moved, so that the other processes never read a sheet
+    # partially written
+    tmp_filepath = f"{entry_basepath}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp_filepath)
+        extension = ".parquet"
+    except (ImportError, ValueError, TypeError, NotImplementedError):
+        with open(tmp_filepath, "wb") as file:
+            pickle.dump(df, file, protocol=pickle.HIGHEST_PROTOCOL)
+        extension = ".pkl"
+    os.replace(tmp_filepath, entry_basepath + extension)
+    return entry_basepath + extension
@@ -0,0 +1,219 @@
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .translation_index import TranslationIndex, normalize_name
+
+try:
+    from scipy import sparse
+except ImportError:  # the names are then only resolved by the alias cache
+    sparse = None
+
+# Versioned with the countries reference, so that the accepted resolutions are reviewed
+ALIAS_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    "../../../data/countries/country_aliases.json",
+)
+NGRAM_SIZE = 3
+# Score below which a known name is too far from an unknown name to be suggested
+MIN_SUGGESTION_SCORE = 0.5
+
+
+def get_ngrams(name: str, size: int = NGRAM_SIZE) -> List[str]:
+    """
+    Returns the distinct character n-grams of the normalized form of a name, padded
+    with a space so that its first and last characters weigh as much as the others.
+    """
+    padded_name = f" {normalize_name(name)} "
+    return sorted(
+        {padded_name[i : i + size] for i in range(max(len(padded_name) - size + 1, 1))}
+    )
+
+
+def get_country_aliases(
+    translation_index: TranslationIndex, countries: Iterable
+) -> Dict[str, str]:
+    """
+    Returns the names of the countries to match the unknown names against, with their
+    translation: the ISO 3166 names and apolitical names, translated as the ISO name
+    (the ISO name itself when it is not translated), and the keys and the translations
+    of a translation index translated as one of these countries. The other translations
+    (sentinels such as "Delete", and aggregates such as "EU28" or the SRES regions) are
+    not candidates.
+    """
+    aliases = {}
+    for country in countries:
+        translation = translation_index.get(country.name)
+        if not isinstance(translation, str):
+            translation = translation_index.get(country.apolitical_name)
+        if not isinstance(translation, str):
+            translation = country.name
+        aliases[country.name] = translation
+        aliases[country.apolitical_name] = translation
+    country_translations = set(aliases.values())
+    for name, translation in translation_index.mapping.items():
+        if isinstance(name, str) and translation in country_translations:
+            aliases[name] = translation
+            aliases[translation] = translation
+    return aliases
+
+
+class AliasCache:
+    """
+    Resolutions of unknown names accepted once, stored in a JSON file by normalized
+    name, so that the next runs translate these names without any change to the
+    translation dictionaries. The default file is versioned in `data/countries`.
+    """
+
+    def __init__(self, filepath: Optional[str] = ALIAS_CACHE_PATH) -> None:
+        """
+        `filepath=None` keeps the resolutions in memory only.
+        """
+        self.filepath = filepath
+        self.aliases: Dict[str, str] = {}
+        if filepath is not None and os.path.exists(filepath):
+            with open(filepath, encoding="utf-8") as file:
+                self.aliases = json.load(file)
+
+    def get(self, name: str) -> Optional[str]:
+        return self.aliases.get(normalize_name(name))
+
+    def accept(self, name: str, translation: str) -> None:
+        """
+        Stores the translation of a name and saves the cache.
+        """
+        self.aliases[normalize_name(name)] = translation
+        if self.filepath is None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.filepath)), exist_ok=True)
+        temporary_filepath = f"{self.filepath}.tmp"
+        with open(temporary_filepath, "w", encoding="utf-8") as file:
+            json.dump(self.aliases, file, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(temporary_filepath, self.filepath)
+
+
+class NameResolver:
+    """
+    Fallback of the translation of unknown names: the names already accepted are read
+    from the AliasCache, and the others are matched against an index of the character
+    n-grams of the known names (see `get_country_aliases`), built once. The candidates
+    are ranked by the cosine similarity of their n-grams with the unknown name, and
+    only suggested: a close name may be another country (e.g. "Kosovo" and "South
+    Korea"), so a resolution is used once accepted with `AliasCache.accept`.
+    With `suggest=True`, the candidates reaching `min_score` are printed for the
+    unknown names; the aggregates (e.g. "OECD Europe", "Total World") have none.
+    """
+
+    def __init__(
+        self,
+        aliases: Dict[str, str],
+        alias_cache: Optional[AliasCache] = None,
+        suggest: bool = False,
+        min_score: float = MIN_SUGGESTION_SCORE,
+    ) -> None:
+        self.alias_cache = alias_cache if alias_cache is not None else AliasCache(None)
+        self.suggest = suggest
+        self.min_score = min_score
+        self.translations = sorted(set(aliases.values()))
+        translation_codes = {
+            translation: code for code, translation in enumerate(self.translations)
+        }
+        alias_translation_codes = {}
+        for alias, translation in aliases.items():
+            alias_translation_codes[normalize_name(alias)] = translation_codes[
+                translation
+            ]
+        self.alias_translation_codes = np.array(
+            list(alias_translation_codes.values()), dtype=np.int64
+        )
+        self.vocabulary: Dict[str, int] = {}
+        self.alias_ngrams = (
+            self._get_ngram_matrix(list(alias_translation_codes))
+            if sparse is not None
+            else None
+        )
+
+    def _get_ngram_matrix(
+        self, names: List[str], extend_vocabulary: bool = True
+    ) -> "sparse.csr_matrix":
+        """
+        Returns the name x n-gram matrix of the names, each row having a unit norm.
+        The n-grams out of the vocabulary are added to it, or skipped.
+        """
+        rows, cols = [], []
+        for row, name in enumerate(names):
+            for ngram in get_ngrams(name):
+                col = self.vocabulary.get(ngram)
+                if col is None and extend_vocabulary:
+                    col = self.vocabulary.setdefault(ngram, len(self.vocabulary))
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+        # The norm is computed over all the n-grams of a name, in the vocabulary or not
+        norms = np.array([np.sqrt(len(get_ngrams(name))) for name in names])
+        values = 1 / norms[rows] if len(rows) > 0 else np.array([])
+        return sparse.csr_matrix(
+            (values, (rows, cols)), shape=(len(names), len(self.vocabulary))
+        )
+
+    def get_candidates(
+        self, names: List[str], limit: int = 5
+    ) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Returns, for each name, its best candidate translations with their score
+        (between 0 and 1) reaching `min_score`, from the best one.
+        """
+        if sparse is None or len(names) == 0:
+            return {name: [] for name in names}
+        scores = (
+            self._get_ngram_matrix(names, extend_vocabulary=False) @ self.alias_ngrams.T
+        ).tocsr()
+        candidates = {}
+        for row, name in enumerate(names):
+            alias_scores = scores.data[scores.indptr[row] : scores.indptr[row + 1]]
+            alias_codes = scores.indices[scores.indptr[row] : scores.indptr[row + 1]]
+            # The score of a translation is the best score of its aliases
+            translation_scores = np.zeros(len(self.translations))
+            np.maximum.at(
+                translation_scores,
+                self.alias_translation_codes[alias_codes],
+                alias_scores,
+            )
+            best_codes = np.argsort(-translation_scores, kind="stable")[:limit]
+            candidates[name] = [
+                (self.translations[code], float(translation_scores[code]))
+                for code in best_codes
+                if translation_scores[code] > 0
+                and translation_scores[code] >= self.min_score
+            ]
+        return candidates
+
+    def resolve(self, names: List[str]) -> Dict[str, str]:
+        """
+        Returns the translations of the unknown names which are in the alias cache.
+        With `suggest`, the candidates of the other names are printed.
+        """
+        resolutions = {}
+        unresolved_names = []
+        for name in names:
+            if not isinstance(name, str):
+                continue
+            translation = self.alias_cache.get(name)
+            if translation is not None:
+                resolutions[name] = translation
+            else:
+                unresolved_names.append(name)
+        if not self.suggest:
+            return resolutions
+        for name, candidates in self.get_candidates(unresolved_names).items():
+            if len(candidates) > 0:
+                print(
+                    f"SUGGESTION : {name!r} may be "
+                    + ", ".join(
+                        f"{translation!r} ({score:.2f})"
+                        for translation, score in candidates
+                    )
+                )
+        return resolutions
@@ -0,0 +1,79 @@
+from typing import Dict, List, Optional, Union
+
+import pandas as pd
+
+
+class DatasetSchema:
+    """
+    Columns of a dataset with their types, so that it is read already typed:
+    the dimensions (country, sector, gas, unit...) as categories, the values
+    as floats and the other columns with their own dtype (e.g. the year).
+    The columns which are not declared are not read.
+    """
+
+    def __init__(
+        self,
+        dimensions: List[str],
+        values: List[str],
+        dtypes: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.dimensions = dimensions
+        self.values = values
+        self.dtypes = dtypes or {}
+
+    @property
+    def usecols(self) -> List[str]:
+        return self.dimensions + list(self.dtypes) + self.values
+
+    @property
+    def pandas_dtypes(self) -> Dict[str, str]:
+        return {
+            **{column: "category" for column in self.dimensions},
+            **self.dtypes,
+            **{column: "float64" for column in self.values},
+        }
+
+
+SCHEMAS: Dict[str, DatasetSchema] = {
+    "countries_and_zones": DatasetSchema(
+        dimensions=["group_type", "group_name", "country"],
+        values=[],
+    ),
+    "countries_and_zones_with_validity": DatasetSchema(
+        dimensions=["group_type", "group_name", "country"],
+        values=[],
+        # The first and last years of the memberships, missing when unbounded
+        dtypes={"valid_from": "float64", "valid_to": "float64"},
+    ),
+    "stg_population": DatasetSchema(
+        dimensions=["country"],
+        values=["population"],
+        dtypes={"year": "int64"},
+    ),
+    "stg_proven_reserves": DatasetSchema(
+        dimensions=["country", "energy_source", "proven_reserves_unit"],
+        values=["proven_reserves"],
+        # The years of the OPEC datasets are written as floats (e.g. 1960.0)
+        dtypes={"year": "float64"},
+    ),
+    "stg_greenhouse_gas_emissions": DatasetSchema(
+        dimensions=["country", "sector", "gas", "unit"],
+        values=["greenhouse_gas_emission"],
+        dtypes={"year": "int64"},
+    ),
+}
+
+
+def read_csv(filepath: str, schema: Union[str, DatasetSchema]) -> pd.DataFrame:
+    """
+    Reads a CSV file with the pyarrow engine, typed with the schema of the
+    dataset (its name in SCHEMAS, or the schema itself).
+    """
+    if isinstance(schema, str):
+        schema = SCHEMAS[schema]
+    return pd.read_csv(
+        filepath,
+        engine="pyarrow",
+        usecols=schema.usecols,
+        dtype=schema.pandas_dtypes,
+    )
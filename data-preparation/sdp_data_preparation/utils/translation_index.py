@@ -0,0 +1,136 @@
+import re
+import unicodedata
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+import pandas as pd
+
+WHITESPACES_REGEX = re.compile(r"\s+")
+# Translation of the labels to drop (regions, totals...), only given to the exact keys
+DELETE_TRANSLATION = "Delete"
+
+
+def normalize_name(name: str) -> str:
+    """
+    Returns the normalized form of a name: Unicode NFKC, casefolded, with its
+    whitespaces (including the non-breaking spaces) collapsed and stripped. The names
+    read as Latin-1 from UTF-8 files (e.g. "Ã©" for "é", "Â\\xa0" for a non-breaking
+    space) are decoded first.
+    """
+    try:
+        name = name.encode("latin-1").decode("utf-8")
+    except UnicodeError:
+        pass
+    name = unicodedata.normalize("NFKC", name).casefold()
+    return WHITESPACES_REGEX.sub(" ", name).strip()
+
+
+class TranslationIndex:
+    """
+    Index of the translations of a mapping, compiled once: a name is translated by
+    its exact key, or else by its normalized form (see `normalize_name`), so that the
+    mapping does not need to list the spacing, case and accent encoding variants of
+    its keys. The normalized forms of keys with different translations are ambiguous
+    and left out, and so are the keys translated as one of `exact_translations` (by
+    default the "Delete" sentinel): a label which differs from them, e.g. "Africa "
+    with a trailing space, is left untranslated as with an exact mapping.
+    A Series is translated through its unique values, its rows taking the
+    translations of their codes, so that the cost depends on the number of distinct
+    names rather than on the number of rows.
+    """
+
+    def __init__(
+        self,
+        mapping: Dict[str, str],
+        exact_translations: Iterable[str] = (DELETE_TRANSLATION,),
+    ) -> None:
+        self.mapping = mapping
+        self.normalized_mapping: Dict[str, str] = {}
+        exact_translations = set(exact_translations)
+        ambiguous_keys = set()
+        for key, translation in mapping.items():
+            if not isinstance(key, str) or translation in exact_translations:
+                continue
+            normalized_key = normalize_name(key)
+            previous_translation = self.normalized_mapping.setdefault(
+                normalized_key, translation
+            )
+            if previous_translation != translation:
+                ambiguous_keys.add(normalized_key)
+        for normalized_key in ambiguous_keys:
+            del self.normalized_mapping[normalized_key]
+
+    def get(self, name: Hashable) -> Any:
+        """
+        Returns the translation of a name, or NaN when it is not found.
+        """
+        try:
+            if name in self.mapping:
+                return self.mapping[name]
+        except TypeError:  # unhashable values are not translated
+            return np.nan
+        if isinstance(name, str):
+            return self.normalized_mapping.get(normalize_name(name), np.nan)
+        return np.nan
+
+    def translate(
+        self,
+        names: Union[pd.Series, pd.Index],
+        resolve: Optional[Callable[[List[Any]], Dict[Any, str]]] = None,
+    ) -> Tuple[Union[pd.Series, pd.Index], List[Any]]:
+        """
+        Translates a Series (or an Index) of names, like `names.map(mapping)`. The
+        distinct names which are not found are given to `resolve`, if any, which
+        returns the translations it finds (see NameResolver).
+        Returns the translations, NaN when they are not found, and the distinct names
+        which are not found.
+        """
+        if isinstance(names.dtype, pd.CategoricalDtype):
+            # The categories are translated once, as by map
+            translations = {
+                category: self.get(category) for category in names.cat.categories
+            }
+            not_found_categories = [
+                category
+                for category, translation in translations.items()
+                if pd.isnull(translation)
+            ]
+            if resolve is not None and len(not_found_categories) > 0:
+                translations.update(resolve(not_found_categories))
+            translated = names.map(translations)
+            not_found = [
+                category
+                for category, translation in translations.items()
+                if pd.isnull(translation)
+            ]
+            if names.isnull().any():
+                not_found.append(np.nan)
+            return translated, not_found
+
+        codes, uniques = pd.factorize(names, use_na_sentinel=False)
+        unique_translations = np.array(
+            [self.get(name) for name in uniques], dtype=object
+        )
+        is_not_found = pd.isnull(unique_translations)
+        if resolve is not None and is_not_found.any():
+            not_found_names = np.asarray(uniques, dtype=object)[is_not_found]
+            resolutions = resolve(list(not_found_names))
+            unique_translations[is_not_found] = [
+                resolutions.get(name, np.nan) for name in not_found_names
+            ]
+            is_not_found = pd.isnull(unique_translations)
+        not_found = list(np.asarray(uniques, dtype=object)[is_not_found])
+        translated = unique_translations.take(codes)
+        if isinstance(names, pd.Index):
+            return pd.Index(translated, name=names.name), not_found
+        return pd.Series(translated, index=names.index, name=names.name), not_found
@@ -0,0 +1,79 @@
+import os
+from pipeline.registry import DatasetRegistry
+from sdp_data_preparation.utils.excel import EXCEL_CACHE_PATH, ExcelCache
+from utils import get_project_root_path
+
+PROJECT_ROOT_DIR = get_project_root_path()
+
+# the paths are resolved once per process
+REGISTRY = DatasetRegistry({
+    "raw_data": f"{PROJECT_ROOT_DIR}/data/raw_data",  # contains the RAW data sources (have to be downloaded from Internet and placed in this folder)
+    "new_prod_data": f"{PROJECT_ROOT_DIR}/data/new_prod_data",  # contains the datasets produced by the transformation
+    "current_data": f"{PROJECT_ROOT_DIR}/data/current_data",
+    "current_prod_data": f"{PROJECT_ROOT_DIR}/data/current_prod_data",  # contains TRANSFORMED old data generated by Dataiku.
+    "thibaud": f"{PROJECT_ROOT_DIR}/data/thibaud",
+    "world_bank": f"{PROJECT_ROOT_DIR}/data/world_bank",  # population per country and zone computed by scripts/world_bank
+}, excel_cache=ExcelCache(EXCEL_CACHE_PATH))  # sheets of the workbooks converted into Parquet
+
+# raw data sources
+REGISTRY.register("country_groups", "raw_data", "country/country_groups.csv", shared=True)
+REGISTRY.register("population", "world_bank", "final_population.csv")
+REGISTRY.register("eora_cba", "raw_data", "co2_cba/national.cba.report.1990.2022.txt", sep="\t")
+REGISTRY.register("gcb", "raw_data", "co2_cba/National_Fossil_Carbon_Emissions_2023v1.0.xlsx")
+REGISTRY.register("co2_intensity_electricity_by_energy", "thibaud", "eia_api/co2_intensity_electricity_by_energy.xlsx")
+REGISTRY.register("pik", "raw_data", "ghg/Guetschow_et_al_2023b-PRIMAP-hist_v2.5_final_15-Oct-2023.csv")
+REGISTRY.register("edgar_f_gases", "current_prod_data", "ghg/edgar_f_gases.xlsx")
+REGISTRY.register("edgar_n2o", "current_prod_data", "ghg/edgar_n2o_raw.xlsx")
+REGISTRY.register("edgar_ch4", "current_prod_data", "ghg/edgar_ch4_raw.xlsx")
+REGISTRY.register("edgar_co2_short_cycle", "current_prod_data", "ghg/edgar_co2_shortcycle_raw.xlsx")
+REGISTRY.register("edgar_co2_short_without_cycle", "current_prod_data", "ghg/edgar_co2_withoutshortcycle_raw.xlsx")
+REGISTRY.register("fao", "thibaud", "ghg/fao_raw.xlsx")
+REGISTRY.register("cait", "thibaud", "ghg/cait_raw.xlsx")
+REGISTRY.register("unfccc_annex_1", "thibaud", "ghg/unfccc_annex1.xlsx")
+REGISTRY.register("unfccc_annex_2", "thibaud", "ghg/unfccc_annex2.xlsx")
+
+# EIA datasets, read by the EIA processors when the EIA API is not available. Their name is the one of the file.
+for eia_file_name in ["eia_api_final_cons_gas_by_sector.xlsx", "eia_api_final_cons_oil_products.xlsx",
+                      "eia_api_final_cons_oil_products_by_sector.xlsx", "eia_api_final_energy_consumption.xlsx",
+                      "eia_api_final_cons_by_sector.xlsx", "eia_api_final_energy_by_sector_by_energy_family.xlsx",
+                      "iea_api_electricity_generation_by_energy_family.xlsx"]:
+    REGISTRY.register(os.path.splitext(eia_file_name)[0], "thibaud", f"eia_api/{eia_file_name}")
+
+# datasets produced by the transformation
+for dataset_name in ["COUNTRY_country_groups_prod", "CO2_CONSUMPTION_BASED_ACCOUNTING_footprint_vs_territorial_prod",
+                     "CO2_CBA_PER_CAPITA_eora_cba_zones_per_capita_prod", "FINAL_CONS_GAS_BY_SECTOR_prod",
+                     "FINAL_CONS_OIL_BY_PRODUCT_prod", "FINAL_CONS_OIL_BY_SECTOR_prod", "FINAL_ENERGY_CONSUMPTION_prod",
+                     "FINAL_ENERGY_CONSUMPTION_PER_SECTOR_prod", "FINAL_ENERGY_PER_SECTOR_PER_ENERGY_FAMILY_prod",
+                     "ELECTRICITY_GENERATION_prod", "ELECTRICITY_NUCLEAR_SHARE_prod", "ELECTRICITY_CO2_INTENSITY_prod",
+                     "GHG_PIK_WITH_EDGAR_SECTORS_prod", "GHG_FULL_BY_GAS_prod", "GHG_FULL_BY_SECTOR_prod",
+                     "GHG_FULL_AGGREGATED_prod", "GHG_PIK_EDGAR_STACKED_prod", "GHG_PIK_EDGAR_SECTOR_prod",
+                     "GHG_PIK_EDGAR_EXTRAPOLATED_GLUED_prod", "GHG_PIK_UNFCCC_prod", "GHG_EDUNF_BY_GAS_prod",
+                     "GHG_EDUNF_BY_SECTOR_prod", "DEMOGRAPHIC_GDP_prod"]:
+    REGISTRY.register(dataset_name, "new_prod_data", f"{dataset_name}.csv")
+
+# legacy datasets generated by Dataiku : (resulting dataset, root of the legacy dataset, legacy dataset). The legacy
+# dataset is formatted in current_prod_data under the name of the resulting dataset, to be compared with the new one.
+LIST_LEGACY_DATASETS = [
+    ("FINAL_CONS_GAS_BY_SECTOR_prod", "current_data", "final_cons_gas_by_sector_prod.csv"),
+    ("FINAL_CONS_OIL_BY_PRODUCT_prod", "current_data", "final_cons_oil_products_by_product.csv"),
+    ("FINAL_CONS_OIL_BY_SECTOR_prod", "current_data", "final_cons_oil_products_by_sector_prod.csv"),
+    ("FINAL_ENERGY_CONSUMPTION_prod", "current_data", "final_cons_by_energy_family_prepared.csv"),
+    ("FINAL_ENERGY_CONSUMPTION_PER_SECTOR_prod", "current_data", "final_cons_by_sector_prod.csv"),
+    ("FINAL_ENERGY_PER_SECTOR_PER_ENERGY_FAMILY_prod", "current_data", "final_cons_by_sector_by_energy_family_prod.csv"),
+    ("ELECTRICITY_GENERATION_prod", "current_data", "electricity_by_energy_family_prepared_prod.csv"),
+    ("ELECTRICITY_NUCLEAR_SHARE_prod", "current_data", "nuclear_share_of_electricity_generation_prod.csv"),
+    ("ELECTRICITY_CO2_INTENSITY_prod", "current_data", "country_co2_intensity.csv"),
+    ("GHG_PIK_WITH_EDGAR_SECTORS_prod", "current_prod_data", "ghg/pik_with_edgar_sectors.xlsx"),
+    ("GHG_FULL_BY_GAS_prod", "current_prod_data", "ghg/ghg_full_by_gas_prod.xlsx"),
+    ("GHG_FULL_BY_SECTOR_prod", "current_prod_data", "ghg/ghg_full_by_sector_prod.xlsx"),
+    ("GHG_FULL_AGGREGATED_prod", "current_prod_data", "ghg/ghg_full_aggregated.xlsx"),
+    ("GHG_PIK_EDGAR_STACKED_prod", "thibaud", "ghg/pik_edgar_stacked.csv"),
+    ("GHG_PIK_EDGAR_SECTOR_prod", "thibaud", "ghg/pik_edgar_1.xlsx"),
+    ("GHG_PIK_EDGAR_EXTRAPOLATED_GLUED_prod", "thibaud", "ghg/edgar_pik_extrapolated_glued_prod.xlsx"),
+    ("GHG_PIK_UNFCCC_prod", "thibaud", "ghg/pik_unfccc.xlsx"),
+    ("GHG_EDUNF_BY_GAS_prod", "thibaud", "ghg/ghg_edunf_by_gas_prod.xlsx"),
+    ("GHG_EDUNF_BY_SECTOR_prod", "thibaud", "ghg/ghg_edunf_by_sector_prod.xlsx"),
+]
+for dataset_name, legacy_root, legacy_filepath in LIST_LEGACY_DATASETS:
+    REGISTRY.register(f"legacy_raw/{dataset_name}", legacy_root, legacy_filepath)
+    REGISTRY.register(f"legacy/{dataset_name}", "current_prod_data", f"{dataset_name}.csv")
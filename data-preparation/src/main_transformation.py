@@ -1,4 +1,6 @@
+import argparse
 import sys
+from functools import partial
 from transformation.demographic.population import StatisticsPerCapitaJoiner
 from transformation.co2_consumption_based_accounting import EoraCo2TradePerZoneAndCountryProcessor
 from transformation.footprint_vs_territorial import FootprintVsTerrotorialProcessor
@@ -9,204 +11,225 @@ from transformation.eia import EiaConsumptionGasBySectorProcessor, EiaConsumptio
     EiaElectricityGenerationByEnergyProcessor, EiaConsumptionOilsPerSectorProcessor, \
     EiaFinalEnergyConsumptionPerSectorProcessor
 from utils.format import StatisticsDataframeFormatter
+from utils.sql import ENGINE_PANDAS, LIST_ENGINES, check_engine
 from transformation.ghg.pik import PikCleaner
 from transformation.ghg.edgar import EdgarCleaner
 from transformation.ghg.ghg import GhgPikEdgarCombinator, PikUnfcccAnnexesCombinator, EdgarUnfcccAnnexesCombinator, GhgMultiSourcesCombinator
 from transformation.ghg.unfcc import UnfcccAnnexesCleaner, UnfccProcessor
 from transformation.ghg.fao import FaoDataProcessor
 from transformation.ghg.cait import CaitProcessor
+from pipeline import Stage, PipelineRunner, FingerprintStore, MemoryTracker, SpillStore, SharedMemoryStore, RunJournal, \
+    write_reports
+from transformation.demographic.countries import StatisticsPerCountriesAndZonesJoiner
+import transformation.eia as eia
+import transformation.footprint_vs_territorial as footprint_vs_territorial
+import utils.translation as translation
+import sdp_data_preparation.utils.name_resolver as name_resolver
+import sdp_data_preparation.utils.translation_index as translation_index
+from sdp_data_preparation.utils.name_resolver import ALIAS_CACHE_PATH
 import pandas as pd
 import os
 import requests
 from pandas import json_normalize
-from utils import get_project_root_path
-
-PROJECT_ROOT_DIR = get_project_root_path()
-RAW_DATA_DIR = os.path.join(PROJECT_ROOT_DIR, "/data/raw_data") # contains the RAW data sources (have to be downloaded from Internet and placed in this folder)
-RESULTS_DIR = os.path.join(PROJECT_ROOT_DIR, "/data/new_prod_data")
-CURRENT_DATA_DIR = os.path.join(PROJECT_ROOT_DIR, "/data/current_data")
-CURRENT_PROD_DATA = os.path.join(PROJECT_ROOT_DIR, "/data/current_prod_data") # contains TRANSFORMED old data generated by Dataiku.
+from data_registry import REGISTRY  # locations of the raw and resulting datasets, see data_registry.py
+
+RESULTS_DIR = REGISTRY.get_directory("new_prod_data")
+CURRENT_PROD_DATA = REGISTRY.get_directory("current_prod_data")  # contains TRANSFORMED old data generated by Dataiku.
+PIPELINE_CACHE_DIR = os.path.join(os.path.dirname(__file__), "../.pipeline_cache")  # fingerprints and outputs of the last successful runs
+PIPELINE_CACHE_MAX_SIZE = 5 * 1024 ** 3  # the least recently used outputs are evicted above 5 GB
+PIPELINE_REPORTS_DIR = os.path.join(os.path.dirname(__file__), "../.pipeline_reports")  # summary and timeline of each run
+PIPELINE_SPILL_DIR = os.path.join(PIPELINE_CACHE_DIR, "spill")  # datasets spilled on disk in low-memory mode
+PIPELINE_JOURNAL_FILEPATH = os.path.join(PIPELINE_CACHE_DIR, "run_journal.json")  # progress of the last run, to resume it
+PIK_CHUNK_SIZE = 20000  # rows of the raw PIK dataset read at once in low-memory mode
+PIK_LARGE_CHUNK_SIZE = 200000  # rows of the raw PIK dataset read at once otherwise
+
+# EIA datasets : (processor, resulting dataset). The raw dataset of each processor is registered under its file name.
+LIST_EIA_DATASETS = [
+    (EiaConsumptionGasBySectorProcessor, "FINAL_CONS_GAS_BY_SECTOR_prod"),
+    (EiaConsumptionOilPerProductProcessor, "FINAL_CONS_OIL_BY_PRODUCT_prod"),
+    (EiaConsumptionOilsPerSectorProcessor, "FINAL_CONS_OIL_BY_SECTOR_prod"),
+    (EiaFinalEnergyConsumptionProcessor, "FINAL_ENERGY_CONSUMPTION_prod"),
+    (EiaFinalEnergyConsumptionPerSectorProcessor, "FINAL_ENERGY_CONSUMPTION_PER_SECTOR_prod"),
+    (EiaFinalEnergyPerSectorPerEnergyProcessor, "FINAL_ENERGY_PER_SECTOR_PER_ENERGY_FAMILY_prod"),
+]
+
+# GHG datasets compared with their legacy dataset generated by Dataiku
+LIST_GHG_LEGACY_DATASETS = [
+    "GHG_PIK_WITH_EDGAR_SECTORS_prod",  # TODO - supprimer cet export ? Pas utilisé dans la BDD de PROD.
+    "GHG_FULL_BY_GAS_prod",
+    "GHG_FULL_BY_SECTOR_prod",
+    "GHG_FULL_AGGREGATED_prod",
+]
+
+# optional GHG datasets, not used in PROD (ref 21/04) : (resulting dataset, rounding of the legacy dataset)
+LIST_GHG_OPTIONAL_LEGACY_DATASETS = [
+    ("GHG_PIK_EDGAR_SECTOR_prod", 5),
+    ("GHG_PIK_EDGAR_EXTRAPOLATED_GLUED_prod", 5),
+    ("GHG_PIK_UNFCCC_prod", 4),
+    ("GHG_EDUNF_BY_GAS_prod", 4),
+    ("GHG_EDUNF_BY_SECTOR_prod", 4),
+]
+
+
+def get_eia_handle(processor_class):
+    """
+    Returns the handle of the raw dataset read by an EIA processor.
+    """
+    return REGISTRY[os.path.splitext(processor_class().file_name)[0]]
 
 
 class TransformationPipeline:
 
+    def __init__(self, max_workers=None, incremental=True, memory_blowup_factor=None, memory_budget=None,
+                 sql_engine=ENGINE_PANDAS):
+        """
+        :param max_workers: (int) number of processes running the stages in parallel. None to use all the CPUs.
+        :param incremental: (bool) True to skip the stages whose raw files, source code and parameters did not change
+            since their last successful run. False to run all the stages.
+        :param memory_blowup_factor: (float) to track the memory used by the stages and flag those whose intermediate
+            size exceeds this multiple of their input. None not to track the memory (tracking slows the stages down).
+        :param memory_budget: (int) to run in low-memory mode, maximum size in MB of the datasets held between the
+            stages. The datasets are released as soon as they are consumed, the largest ones are spilled on disk above
+            the budget, the stages supporting it read their raw data by chunks and the stages run sequentially unless
+            max_workers is given. None to keep all the datasets in memory.
+        :param sql_engine: (str) "duckdb" to run the processors ported from the Dataiku SQL recipes with DuckDB
+            instead of pandas. The outputs are the same.
+        """
+        self.max_workers = max_workers if max_workers is not None or memory_budget is None else 1
+        self.incremental = incremental
+        self.memory_blowup_factor = memory_blowup_factor
+        self.memory_budget = memory_budget
+        self.sql_engine = check_engine(sql_engine)
+
     def process_country_data(self):
         # Update demographic data
-        df_country = pd.read_csv(f"{RAW_DATA_DIR}/country/country_groups.csv")
+        df_country = REGISTRY["country_groups"].read()
         df_country = df_country.sort_values(by=["group_type", "group_name", "country"])
-        df_country.to_csv(f"{RESULTS_DIR}/COUNTRY_country_groups_prod.csv", index=False)
+        REGISTRY["COUNTRY_country_groups_prod"].write(df_country)
         return df_country
 
+    def process_population_data(self):
+        # population per country and zone computed by scripts/world_bank
+        df_population = REGISTRY["population"].read()
+        df_population["year"] = df_population["year"].astype(str)
+        return df_population
+
     def process_footprint_vs_territorial_data(self, df_country, df_population):
         # update footprint vs territorial
-        df_eora_cba = pd.read_csv(f"{RAW_DATA_DIR}/co2_cba/national.cba.report.1990.2022.txt", sep="\t")
-        df_gcb_territorial = pd.read_excel(f"{RAW_DATA_DIR}/co2_cba/National_Fossil_Carbon_Emissions_2023v1.0.xlsx",
-                                           sheet_name="Territorial Emissions")
-        df_gcb_cba = pd.read_excel(f"{RAW_DATA_DIR}/co2_cba/National_Fossil_Carbon_Emissions_2023v1.0.xlsx",
-                                   sheet_name="Consumption Emissions")
+        df_eora_cba = REGISTRY["eora_cba"].read()
+        df_gcb_territorial, df_gcb_cba = REGISTRY["gcb"].read_sheets("Territorial Emissions", "Consumption Emissions")
         df_footprint_vs_territorial = FootprintVsTerrotorialProcessor().run(df_gcb_territorial, df_gcb_cba, df_eora_cba,
                                                                             df_country)
-        df_footprint_vs_territorial.to_csv(
-            f"{RESULTS_DIR}/CO2_CONSUMPTION_BASED_ACCOUNTING_footprint_vs_territorial_prod.csv", index=False)
+        REGISTRY["CO2_CONSUMPTION_BASED_ACCOUNTING_footprint_vs_territorial_prod"].write(df_footprint_vs_territorial)
 
         df_footprint_vs_territorial_per_capita = StatisticsPerCapitaJoiner().run_footprint_vs_territorial_per_capita(
             df_footprint_vs_territorial, df_population)
-        df_footprint_vs_territorial_per_capita.to_csv(
-            f"{RESULTS_DIR}/CO2_CBA_PER_CAPITA_eora_cba_zones_per_capita_prod.csv", index=False)
-
-    def process_iea_data(self, df_country):
-        # gas products
-        df_gas_cons_by_sector = EiaConsumptionGasBySectorProcessor().prepare_data(df_country)
-        df_gas_cons_by_sector.to_csv(f"{RESULTS_DIR}/FINAL_CONS_GAS_BY_SECTOR_prod.csv", index=False)
-        df_original = pd.read_csv(f"{CURRENT_DATA_DIR}/final_cons_gas_by_sector_prod.csv", sep=',')
-        df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original, "final_energy",
-                                                                          round_statistics=4)
-        df_original.to_csv(f"{CURRENT_PROD_DATA}/FINAL_CONS_GAS_BY_SECTOR_prod.csv", index=False)
-
-        # oil products
-        df_oil_cons_per_product = EiaConsumptionOilPerProductProcessor().prepare_data(df_country)
-        df_oil_cons_per_product.to_csv(f"{RESULTS_DIR}/FINAL_CONS_OIL_BY_PRODUCT_prod.csv", index=False)
-        df_original = pd.read_csv(f"{CURRENT_DATA_DIR}/final_cons_oil_products_by_product.csv", sep=',')
-        df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original, "final_energy",
-                                                                          round_statistics=4)
-        df_original.to_csv(f"{CURRENT_PROD_DATA}/FINAL_CONS_OIL_BY_PRODUCT_prod.csv", index=False)
-
-        df_oil_cons_per_sector = EiaConsumptionOilsPerSectorProcessor().prepare_data(df_country)
-        df_oil_cons_per_sector.to_csv(f"{RESULTS_DIR}/FINAL_CONS_OIL_BY_SECTOR_prod.csv", index=False)
-        df_original = pd.read_csv(f"{CURRENT_DATA_DIR}/final_cons_oil_products_by_sector_prod.csv", sep=',')
-        df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original, "final_energy",
-                                                                          round_statistics=4)
-        df_original.to_csv(f"{CURRENT_PROD_DATA}/FINAL_CONS_OIL_BY_SECTOR_prod.csv", index=False)
-
-        # final energy
-        df_final_energy_consumption = EiaFinalEnergyConsumptionProcessor().prepare_data(df_country)
-        df_final_energy_consumption.to_csv(f"{RESULTS_DIR}/FINAL_ENERGY_CONSUMPTION_prod.csv", index=False)
-        df_original = pd.read_csv(f"{CURRENT_DATA_DIR}/final_cons_by_energy_family_prepared.csv", sep=',')
-        df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original, "final_energy",
-                                                                          round_statistics=4)
-        df_original.to_csv(f"{CURRENT_PROD_DATA}/FINAL_ENERGY_CONSUMPTION_prod.csv", index=False)
-
-        df_final_energy_consumption_per_sector = EiaFinalEnergyConsumptionPerSectorProcessor().prepare_data(df_country)
-        df_final_energy_consumption_per_sector.to_csv(f"{RESULTS_DIR}/FINAL_ENERGY_CONSUMPTION_PER_SECTOR_prod.csv",
-                                                      index=False)
-        df_original = pd.read_csv(f"{CURRENT_DATA_DIR}/final_cons_by_sector_prod.csv", sep=',')
-        df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original, "final_energy",
-                                                                          round_statistics=4)
-        df_original.to_csv(f"{CURRENT_PROD_DATA}/FINAL_ENERGY_CONSUMPTION_PER_SECTOR_prod.csv", index=False)
-
-        df_energy_per_sector_per_energy_family = EiaFinalEnergyPerSectorPerEnergyProcessor().prepare_data(df_country)
-        df_energy_per_sector_per_energy_family.to_csv(
-            f"{RESULTS_DIR}/FINAL_ENERGY_PER_SECTOR_PER_ENERGY_FAMILY_prod.csv", index=False)
-        df_original = pd.read_csv(f"{CURRENT_DATA_DIR}/final_cons_by_sector_by_energy_family_prod.csv", sep=',')
-        df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original, "final_energy",
-                                                                          round_statistics=4)
-        df_original.to_csv(f"{CURRENT_PROD_DATA}/FINAL_ENERGY_PER_SECTOR_PER_ENERGY_FAMILY_prod.csv", index=False)
+        REGISTRY["CO2_CBA_PER_CAPITA_eora_cba_zones_per_capita_prod"].write(df_footprint_vs_territorial_per_capita)
+
+    def process_eia_data(self, processor_class, dataset_name, df_country):
+        df_eia = processor_class().prepare_data(df_country)
+        REGISTRY[dataset_name].write(df_eia)
 
+    def process_electricity_data(self, df_country):
         # electricity generation
         electricity_generator = EiaElectricityGenerationByEnergyProcessor().prepare_data(df_country)
         df_electricity_generation = electricity_generator.df_electricity_by_energy_family
-        df_electricity_generation.to_csv(f"{RESULTS_DIR}/ELECTRICITY_GENERATION_prod.csv", index=False)
-        df_original = pd.read_csv(f"{CURRENT_DATA_DIR}/electricity_by_energy_family_prepared_prod.csv", sep=',')
-        df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original, "final_energy",
-                                                                          round_statistics=4)
-        df_original.to_csv(f"{CURRENT_PROD_DATA}/ELECTRICITY_CO2_INTENSITY_prod.csv", index=False)
+        REGISTRY["ELECTRICITY_GENERATION_prod"].write(df_electricity_generation)
 
         df_electricity_nuclear_share = electricity_generator.compute_nuclear_share_in_electricity()
-        df_electricity_nuclear_share.to_csv(f"{RESULTS_DIR}/ELECTRICITY_NUCLEAR_SHARE_prod.csv", index=False)
-        df_original = pd.read_csv(f"{CURRENT_DATA_DIR}/nuclear_share_of_electricity_generation_prod.csv", sep=',')
-        df_original["nuclear"] = df_original["nuclear"].round(4)
-        df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original,
-                                                                          "nuclear_share_of_electricity_generation",
-                                                                          round_statistics=4)
-        df_original.to_csv(f"{CURRENT_PROD_DATA}/ELECTRICITY_NUCLEAR_SHARE_prod.csv", index=False)
-
-        df_intensity_co2_per_energy = pd.read_excel(os.path.join(os.path.join(os.path.dirname(__file__),
-                                                                              "../../data/thibaud/eia_api/co2_intensity_electricity_by_energy.xlsx")))
+        REGISTRY["ELECTRICITY_NUCLEAR_SHARE_prod"].write(df_electricity_nuclear_share)
+
+        df_intensity_co2_per_energy = REGISTRY["co2_intensity_electricity_by_energy"].read()
         df_electricity_co2_intensity = electricity_generator.compute_electricity_co2_intensity(
             df_intensity_co2_per_energy)
-        df_electricity_co2_intensity.to_csv(f"{RESULTS_DIR}/ELECTRICITY_CO2_INTENSITY_prod.csv", index=False, sep=',')
-        df_original = pd.read_csv(f"{CURRENT_DATA_DIR}/country_co2_intensity.csv")
-        df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original, "co2_intensity",
-                                                                          round_statistics=3)
-        df_original.to_csv(f"{CURRENT_PROD_DATA}/ELECTRICITY_CO2_INTENSITY_prod.csv", index=False)
+        REGISTRY["ELECTRICITY_CO2_INTENSITY_prod"].write(df_electricity_co2_intensity)
 
-    def process_ghg_data(self, df_country):
+    def export_legacy_dataset(self, dataset_name, col_statistics, round_statistics, dict_fillna=None):
+        """
+        Formats a dataset generated by Dataiku (legacy code) so that it can be compared with the new one.
+        :param dataset_name: (str) name of the new dataset. The legacy dataset is registered as legacy_raw/<name> and
+            formatted in CURRENT_PROD_DATA as legacy/<name>.
+        :param col_statistics: (str) column containing the statistics.
+        :param round_statistics: (int) number of decimals of the statistics.
+        :param dict_fillna: (dict) values replacing the missing values, per column.
+        """
+        df_original = REGISTRY["legacy_raw/" + dataset_name].read()
+        if dict_fillna is not None:
+            df_original = df_original.fillna(dict_fillna)
+        if "nuclear" in df_original.columns:
+            df_original["nuclear"] = df_original["nuclear"].round(4)
+        df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original, col_statistics,
+                                                                          round_statistics=round_statistics)
+        REGISTRY["legacy/" + dataset_name].write(df_original)
+
+    def clean_pik_data(self):
         # update PIK data
         # TODO: if `list_df_multi_sources` below not used -> remove the lines - BEGINNING
-        df_pik = pd.read_csv(f"{RAW_DATA_DIR}/ghg/Guetschow_et_al_2023b-PRIMAP-hist_v2.5_final_15-Oct-2023.csv")
-        df_pik_cleaned = PikCleaner().run(df_pik)
-        df_pik_cleaned.to_csv(f"{RESULTS_DIR}/GHG_PIK_WITH_EDGAR_SECTORS_prod.csv", index=False)
+        # the raw dataset is streamed by chunks, only the rows and columns used are kept
+        chunk_size = PIK_CHUNK_SIZE if self.memory_budget is not None else PIK_LARGE_CHUNK_SIZE
+        df_pik_cleaned = PikCleaner().run_chunks(REGISTRY["pik"].read(chunksize=chunk_size,
+                                                                      **PikCleaner.DICT_READ_KWARGS))
+        REGISTRY["GHG_PIK_WITH_EDGAR_SECTORS_prod"].write(df_pik_cleaned)
         # TODO: if `list_df_multi_sources` below not used -> remove the lines - END
-        df_original = pd.read_excel(f"{CURRENT_PROD_DATA}/ghg/pik_with_edgar_sectors.xlsx")
-        df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original, "ghg", round_statistics=5)
-        df_original.to_csv(f"{CURRENT_PROD_DATA}/GHG_PIK_WITH_EDGAR_SECTORS_prod.csv",
-                           index=False)  # TODO - supprimer cet export ? Pas utilisé dans la BDD de PROD.
+        return df_pik_cleaned
 
+    def clean_edgar_data(self):
         # update EDGAR data
-        df_edgar_gases = pd.read_excel(f"{CURRENT_PROD_DATA}/ghg/edgar_f_gases.xlsx")
-        df_edgar_n2o = pd.read_excel(f"{CURRENT_PROD_DATA}/ghg/edgar_n2o_raw.xlsx")
-        df_edgar_ch4 = pd.read_excel(f"{CURRENT_PROD_DATA}/ghg/edgar_ch4_raw.xlsx")
-        df_edgar_co2_short_cycle = pd.read_excel(f"{CURRENT_PROD_DATA}/ghg/edgar_co2_shortcycle_raw.xlsx")
-        df_edgar_co2_short_without_cycle = pd.read_excel(f"{CURRENT_PROD_DATA}/ghg/edgar_co2_withoutshortcycle_raw.xlsx")
-        df_edgar_clean = EdgarCleaner().run(df_edgar_gases, df_edgar_n2o, df_edgar_ch4, df_edgar_co2_short_cycle, df_edgar_co2_short_without_cycle)
+        df_edgar_gases = REGISTRY["edgar_f_gases"].read()
+        df_edgar_n2o = REGISTRY["edgar_n2o"].read()
+        df_edgar_ch4 = REGISTRY["edgar_ch4"].read()
+        df_edgar_co2_short_cycle = REGISTRY["edgar_co2_short_cycle"].read()
+        df_edgar_co2_short_without_cycle = REGISTRY["edgar_co2_short_without_cycle"].read()
+        return EdgarCleaner().run(df_edgar_gases, df_edgar_n2o, df_edgar_ch4, df_edgar_co2_short_cycle, df_edgar_co2_short_without_cycle)
+
+    def process_fao_data(self, df_country):
+        # update FAO data
+        df_fao = REGISTRY["fao"].read()
+        return FaoDataProcessor().run(df_fao, df_country)
 
+    def process_cait_data(self, df_country):
+        # update CAIT data
+        df_cait = REGISTRY["cait"].read()
+        return CaitProcessor().run(df_cait, df_country)
+
+    def combine_pik_edgar_stacked_data(self, df_pik_cleaned, df_edgar_clean):
         # combine PIK and EDGAR data STACKED  # TODO - potentiellement à supprimer car pas utilisé en PROD (ref 21/04)
-        # df_pik_edgar_stacked = GhgPikEdgarCombinator().compute_pik_edgar_stacked(df_pik_cleaned, df_edgar_clean)
-        # df_pik_edgar_stacked.to_csv(f"{RESULTS_DIR}/GHG_PIK_EDGAR_STACKED_prod.csv", index=False)
-        # df_original = pd.read_csv(os.path.join(os.path.dirname(__file__), "../../data/thibaud/ghg/" + "pik_edgar_stacked.csv"))
-        # df_original["source"] = df_original["source"].fillna("edgar")
-        # df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original, "ghg", round_statistics=5)
-        # df_original.to_csv(f"{CURRENT_PROD_DATA}/GHG_PIK_EDGAR_STACKED_prod.csv", index=False)
+        df_pik_edgar_stacked = GhgPikEdgarCombinator(self.sql_engine).compute_pik_edgar_stacked(df_pik_cleaned, df_edgar_clean)
+        REGISTRY["GHG_PIK_EDGAR_STACKED_prod"].write(df_pik_edgar_stacked)
 
+    def combine_pik_edgar_sector_data(self, df_pik_cleaned, df_edgar_clean):
         # combine PIK and EDGAR data FILTER SECTOR   # TODO - potentiellement à supprimer car pas utilisé en PROD (ref 21/04)
-        # df_pik_edgar_sector = GhgPikEdgarCombinator().compute_pik_edgar_filter_sector(df_pik_cleaned, df_edgar_clean)
-        # df_pik_edgar_sector.to_csv(f"{RESULTS_DIR}/GHG_PIK_EDGAR_SECTOR_prod.csv", index=False)
-        # df_original = pd.read_excel(os.path.join(os.path.dirname(__file__), "../../data/thibaud/ghg/" + "pik_edgar_1.xlsx"))
-        # df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original, "ghg", round_statistics=5)
-        # df_original.to_csv(f"{CURRENT_PROD_DATA}/GHG_PIK_EDGAR_SECTOR_prod.csv", index=False)
+        df_pik_edgar_sector = GhgPikEdgarCombinator(self.sql_engine).compute_pik_edgar_filter_sector(df_pik_cleaned, df_edgar_clean)
+        REGISTRY["GHG_PIK_EDGAR_SECTOR_prod"].write(df_pik_edgar_sector)
 
+    def combine_pik_edgar_extrapolated_data(self, df_pik_cleaned, df_edgar_clean):
         # combine PIK and EDGAR EXTRAPOLATED GLUED    # TODO - potentiellement à supprimer car pas utilisé en PROD (ref 21/04)
-        # df_pik_edgar_extrapolated = GhgPikEdgarCombinator().compute_pik_edgar_extrapolated_glued(df_pik_cleaned, df_edgar_clean)
-        # df_pik_edgar_extrapolated.to_csv(f"{RESULTS_DIR}/GHG_PIK_EDGAR_EXTRAPOLATED_GLUED_prod.csv", index=False)
-        # df_original = pd.read_excel(os.path.join(os.path.dirname(__file__), "../../data/thibaud/ghg/" + "edgar_pik_extrapolated_glued_prod.xlsx"))
-        # df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original, "ghg", round_statistics=5)
-        # df_original.to_csv(f"{CURRENT_PROD_DATA}/GHG_PIK_EDGAR_EXTRAPOLATED_GLUED_prod.csv", index=False)
+        df_pik_edgar_extrapolated = GhgPikEdgarCombinator(self.sql_engine).compute_pik_edgar_extrapolated_glued(df_pik_cleaned, df_edgar_clean)
+        REGISTRY["GHG_PIK_EDGAR_EXTRAPOLATED_GLUED_prod"].write(df_pik_edgar_extrapolated)
 
+    def clean_unfccc_annexes_data(self):
         # update UNFCCC annexes data  # TODO - potentiellement à supprimer car pas utilisé en PROD (ref 21/04)
-        # df_unfccc_annex_1 = pd.read_excel(os.path.join(os.path.dirname(__file__), "../../data/thibaud/ghg/" + "unfccc_annex1.xlsx"))
-        # df_unfccc_annex_2 = pd.read_excel(os.path.join(os.path.dirname(__file__), "../../data/thibaud/ghg/" + "unfccc_annex2.xlsx"))
-        # df_unfccc_annex_clean = UnfcccAnnexesCleaner().run(df_unfccc_annex_1, df_unfccc_annex_2)
+        df_unfccc_annex_1 = REGISTRY["unfccc_annex_1"].read()
+        df_unfccc_annex_2 = REGISTRY["unfccc_annex_2"].read()
+        return UnfcccAnnexesCleaner().run(df_unfccc_annex_1, df_unfccc_annex_2)
 
+    def combine_pik_unfccc_data(self, df_pik_cleaned, df_unfccc_annex_clean):
         # combine PIK and UNFCCC annexes data  # TODO - potentiellement à supprimer car pas utilisé en PROD (ref 21/04)
-        # df_pik_unfccc_annexes = PikUnfcccAnnexesCombinator().run(df_pik_cleaned, df_unfccc_annex_clean)
-        # df_pik_unfccc_annexes.to_csv(f"{RESULTS_DIR}/GHG_PIK_UNFCCC_prod.csv", index=False)
-        # df_original = pd.read_excel(os.path.join(os.path.dirname(__file__), "../../data/thibaud/ghg/" + "pik_unfccc.xlsx"))
-        # df_original = StatisticsDataframeFormatter.select_and_sort_values(df_original, "ghg", round_statistics=4)
-        # df_original.to_csv(f"{CURRENT_PROD_DATA}/GHG_PIK_UNFCCC_prod.csv", index=False)
+        df_pik_unfccc_annexes = PikUnfcccAnnexesCombinator().run(df_pik_cleaned, df_unfccc_annex_clean)
+        REGISTRY["GHG_PIK_UNFCCC_prod"].write(df_pik_unfccc_annexes)
 
+    def combine_edgar_unfccc_data(self, df_edgar_clean, df_unfccc_annex_clean, df_country):
         # combine EDGR and UNFCCC data # TODO - potentiellement à supprimer car pas utilisé en PROD (ref 21/04)
-        # df_ghg_edunf_by_gas, df_ghg_edunf_by_sector = EdgarUnfcccAnnexesCombinator().run(df_edgar_clean, df_unfccc_annex_clean, df_country)
-        # df_ghg_edunf_by_gas.to_csv(f"{RESULTS_DIR}/GHG_EDUNF_BY_GAS_prod.csv", index=False)
-        # df_ghg_edunf_by_sector.to_csv(f"{RESULTS_DIR}/GHG_EDUNF_BY_SECTOR_prod.csv", index=False)
-        # df_original_gas = pd.read_excel(os.path.join(os.path.dirname(__file__), "../../data/thibaud/ghg/" + "ghg_edunf_by_gas_prod.xlsx"))
-        # df_original_gas = StatisticsDataframeFormatter.select_and_sort_values(df_original_gas, "ghg", round_statistics=4)
-        # df_original_gas.to_csv(f"{CURRENT_PROD_DATA}/GHG_EDUNF_BY_GAS_prod.csv", index=False)
-        # df_original_sector = pd.read_excel(os.path.join(os.path.dirname(__file__), "../../data/thibaud/ghg/" + "ghg_edunf_by_sector_prod.xlsx"))
-        # df_original_sector = StatisticsDataframeFormatter.select_and_sort_values(df_original_sector, "ghg", round_statistics=4)
-        # df_original_sector.to_csv(f"{CURRENT_PROD_DATA}/GHG_EDUNF_BY_SECTOR_prod.csv", index=False)
+        df_ghg_edunf_by_gas, df_ghg_edunf_by_sector = EdgarUnfcccAnnexesCombinator().run(df_edgar_clean, df_unfccc_annex_clean, df_country)
+        REGISTRY["GHG_EDUNF_BY_GAS_prod"].write(df_ghg_edunf_by_gas)
+        REGISTRY["GHG_EDUNF_BY_SECTOR_prod"].write(df_ghg_edunf_by_sector)
 
+    def combine_ghg_data(self, df_pik_cleaned, df_edgar_clean, df_fao_clean, df_cait_sector_stacked,
+                         df_cait_gas_stacked, df_country):
         # update UNFCC data  # TODO - potentiellement à supprimer car pas utilisé en PROD (ref 21/04)
         # df_unfcc = pd.read_excel(os.path.join(os.path.dirname(__file__), "../../data/thibaud/ghg/" + "unfcc.xlsx"))
         # df_unfcc_clean = UnfccProcessor().run(df_unfcc)  # TODO - à fixer - We can't use UNFCCC because for non annex 1 countries (ex:China) we only have data every 5 years
 
-        # update FAO data
-        df_fao = pd.read_excel(os.path.join(os.path.dirname(__file__), "../../data/thibaud/ghg/" + "fao_raw.xlsx"))
-        df_fao_clean = FaoDataProcessor().run(df_fao, df_country)
-
-        # update CAIT data
-        df_cait = pd.read_excel(os.path.join(os.path.dirname(__file__), "../../data/thibaud/ghg/" + "cait_raw.xlsx"))
-        df_cait_sector_stacked, df_cait_gas_stacked = CaitProcessor().run(df_cait, df_country)
-
         # combine all sources together  # TODO - potentiellement à supprimer car pas utilisé en PROD (ref 21/04)
         list_df_multi_sources = GhgMultiSourcesCombinator().run(df_pik_clean=df_pik_cleaned,
                                                                 df_edgar_clean=df_edgar_clean,
@@ -216,41 +239,163 @@ class TransformationPipeline:
                                                                 df_country=df_country
                                                                 )
         df_ghg_full_by_gas, df_ghg_full_by_sector, df_ghg_full_aggregated = list_df_multi_sources
-        df_ghg_full_by_gas.to_csv(f"{RESULTS_DIR}/GHG_FULL_BY_GAS_prod.csv", index=False)
-        df_ghg_full_by_sector.to_csv(f"{RESULTS_DIR}/GHG_FULL_BY_SECTOR_prod.csv", index=False)
-        df_ghg_full_aggregated.to_csv(f"{RESULTS_DIR}/GHG_FULL_AGGREGATED_prod.csv", index=False)
+        REGISTRY["GHG_FULL_BY_GAS_prod"].write(df_ghg_full_by_gas)
+        REGISTRY["GHG_FULL_BY_SECTOR_prod"].write(df_ghg_full_by_sector)
+        REGISTRY["GHG_FULL_AGGREGATED_prod"].write(df_ghg_full_aggregated)
 
-        df_original_gas = pd.read_excel(f"{CURRENT_PROD_DATA}/ghg/ghg_full_by_gas_prod.xlsx")
-        df_original_gas = StatisticsDataframeFormatter.select_and_sort_values(df_original_gas, "ghg", round_statistics=5)
-        df_original_gas.to_csv(f"{CURRENT_PROD_DATA}/ghg/GHG_FULL_BY_GAS_prod.csv", index=False)
+    def get_legacy_stage(self, dataset_name, col_statistics, round_statistics, dict_fillna=None, optional=False):
+        return Stage("legacy_" + dataset_name.lower(),
+                     partial(self.export_legacy_dataset, dataset_name, col_statistics, round_statistics, dict_fillna),
+                     files=[REGISTRY["legacy_raw/" + dataset_name]], sources=[StatisticsDataframeFormatter],
+                     optional=optional)
 
-        df_original_sector = pd.read_excel(f"{CURRENT_PROD_DATA}/ghg/ghg_full_by_sector_prod.xlsx")
-        df_original_sector = StatisticsDataframeFormatter.select_and_sort_values(df_original_sector, "ghg",
-                                                                                 round_statistics=5)
-        df_original_sector.to_csv(f"{CURRENT_PROD_DATA}/GHG_FULL_BY_SECTOR_prod.csv", index=False)
-
-        df_original_agg = pd.read_excel(f"{CURRENT_PROD_DATA}/ghg/ghg_full_aggregated.xlsx")
-        df_original_agg = StatisticsDataframeFormatter.select_and_sort_values(df_original_agg, "ghg",
-                                                                              round_statistics=5)
-        df_original_agg.to_csv(f"{CURRENT_PROD_DATA}/GHG_FULL_AGGREGATED_prod.csv", index=False)
-
-    def run(self):
+    def get_stages(self):
         """
-
-        :return:
+        Declares the stages of the pipeline with the datasets they consume and produce.
+        :return: (list) of Stage.
         """
-        # demographic data
-        df_country = self.process_country_data()
-        # df_population, df_gapminder = self.process_population_data(df_country)
-
-        # consumption-based accounting
-        # self.process_footprint_vs_territorial_data(df_country)
-
-        # EAI data
-        # self.process_iea_data(df_country)
+        # demographic data and consumption-based accounting. As the EIA data, they are not refreshed by default and
+        # only run when requested as targets
+        list_stages = [
+            Stage("country", self.process_country_data, outputs=["df_country"], files=[REGISTRY["country_groups"]],
+                  exports=["COUNTRY_country_groups_prod"]),
+            Stage("population", self.process_population_data, outputs=["df_population"], files=[REGISTRY["population"]],
+                  optional=True),
+            Stage("footprint_vs_territorial", self.process_footprint_vs_territorial_data,
+                  inputs=["df_country", "df_population"], files=[REGISTRY["eora_cba"], REGISTRY["gcb"]],
+                  sources=[footprint_vs_territorial, StatisticsPerCapitaJoiner,
+                           StatisticsPerCountriesAndZonesJoiner, translation],
+                  exports=["CO2_CONSUMPTION_BASED_ACCOUNTING_footprint_vs_territorial_prod",
+                           "CO2_CBA_PER_CAPITA_eora_cba_zones_per_capita_prod"], optional=True),
+        ]
+
+        # EIA data
+        list_eia_sources = [eia, StatisticsPerCountriesAndZonesJoiner,
+                            StatisticsDataframeFormatter, translation]
+        for processor_class, dataset_name in LIST_EIA_DATASETS:
+            list_stages += [
+                Stage(dataset_name.lower(), partial(self.process_eia_data, processor_class, dataset_name),
+                      inputs=["df_country"], files=[get_eia_handle(processor_class)],
+                      sources=list_eia_sources, exports=[dataset_name], optional=True),
+                self.get_legacy_stage(dataset_name, "final_energy", 4, optional=True),
+            ]
+        list_stages += [
+            Stage("electricity", self.process_electricity_data, inputs=["df_country"],
+                  files=[get_eia_handle(EiaElectricityGenerationByEnergyProcessor),
+                         REGISTRY["co2_intensity_electricity_by_energy"]],
+                  sources=list_eia_sources,
+                  exports=["ELECTRICITY_GENERATION_prod", "ELECTRICITY_NUCLEAR_SHARE_prod",
+                           "ELECTRICITY_CO2_INTENSITY_prod"], optional=True),
+            self.get_legacy_stage("ELECTRICITY_GENERATION_prod", "final_energy", 4, optional=True),
+            self.get_legacy_stage("ELECTRICITY_NUCLEAR_SHARE_prod", "nuclear_share_of_electricity_generation", 4,
+                                  optional=True),
+            self.get_legacy_stage("ELECTRICITY_CO2_INTENSITY_prod", "co2_intensity", 3, optional=True),
+        ]
+
+        # GHG emissions data
+        list_stages += [
+            Stage("pik", self.clean_pik_data, outputs=["df_pik_cleaned"], files=[REGISTRY["pik"]],
+                  sources=[PikCleaner, translation, StatisticsDataframeFormatter],
+                  exports=["GHG_PIK_WITH_EDGAR_SECTORS_prod"]),
+            Stage("edgar", self.clean_edgar_data, outputs=["df_edgar_clean"], files=[REGISTRY[name] for name in ["edgar_f_gases", "edgar_n2o", "edgar_ch4", "edgar_co2_short_cycle",
+                                                                 "edgar_co2_short_without_cycle"]],
+                  sources=[EdgarCleaner, translation, StatisticsDataframeFormatter]),
+            Stage("fao", self.process_fao_data, inputs=["df_country"], outputs=["df_fao_clean"], files=[REGISTRY["fao"]],
+                  sources=[FaoDataProcessor, StatisticsPerCountriesAndZonesJoiner, translation,
+                           StatisticsDataframeFormatter]),
+            Stage("cait", self.process_cait_data, inputs=["df_country"],
+                  outputs=["df_cait_sector_stacked", "df_cait_gas_stacked"], files=[REGISTRY["cait"]],
+                  sources=[CaitProcessor, translation]),
+            Stage("ghg_multi_sources", self.combine_ghg_data,
+                  inputs=["df_pik_cleaned", "df_edgar_clean", "df_fao_clean", "df_cait_sector_stacked",
+                          "df_cait_gas_stacked", "df_country"],
+                  sources=[GhgMultiSourcesCombinator, StatisticsDataframeFormatter],
+                  exports=["GHG_FULL_BY_GAS_prod", "GHG_FULL_BY_SECTOR_prod", "GHG_FULL_AGGREGATED_prod"]),
+        ]
+        for dataset_name in LIST_GHG_LEGACY_DATASETS:
+            list_stages.append(self.get_legacy_stage(dataset_name, "ghg", 5))
+
+        # optional GHG datasets, only run when requested as targets
+        list_ghg_optional_sources = [GhgPikEdgarCombinator, StatisticsDataframeFormatter]
+        list_stages += [
+            Stage("pik_edgar_stacked", self.combine_pik_edgar_stacked_data, inputs=["df_pik_cleaned", "df_edgar_clean"],
+                  sources=list_ghg_optional_sources, exports=["GHG_PIK_EDGAR_STACKED_prod"], optional=True),
+            Stage("pik_edgar_sector", self.combine_pik_edgar_sector_data, inputs=["df_pik_cleaned", "df_edgar_clean"],
+                  sources=list_ghg_optional_sources, exports=["GHG_PIK_EDGAR_SECTOR_prod"], optional=True),
+            Stage("pik_edgar_extrapolated_glued", self.combine_pik_edgar_extrapolated_data,
+                  inputs=["df_pik_cleaned", "df_edgar_clean"], sources=list_ghg_optional_sources,
+                  exports=["GHG_PIK_EDGAR_EXTRAPOLATED_GLUED_prod"], optional=True),
+            Stage("unfccc_annexes", self.clean_unfccc_annexes_data, outputs=["df_unfccc_annex_clean"],
+                  files=[REGISTRY["unfccc_annex_1"], REGISTRY["unfccc_annex_2"]], sources=[UnfcccAnnexesCleaner],
+                  optional=True),
+            Stage("pik_unfccc", self.combine_pik_unfccc_data, inputs=["df_pik_cleaned", "df_unfccc_annex_clean"],
+                  sources=[PikUnfcccAnnexesCombinator, StatisticsDataframeFormatter], exports=["GHG_PIK_UNFCCC_prod"],
+                  optional=True),
+            Stage("edgar_unfccc", self.combine_edgar_unfccc_data,
+                  inputs=["df_edgar_clean", "df_unfccc_annex_clean", "df_country"],
+                  sources=[EdgarUnfcccAnnexesCombinator, StatisticsDataframeFormatter],
+                  exports=["GHG_EDUNF_BY_GAS_prod", "GHG_EDUNF_BY_SECTOR_prod"], optional=True),
+            self.get_legacy_stage("GHG_PIK_EDGAR_STACKED_prod", "ghg", 5, dict_fillna={"source": "edgar"}, optional=True),
+        ]
+        for dataset_name, round_statistics in LIST_GHG_OPTIONAL_LEGACY_DATASETS:
+            list_stages.append(self.get_legacy_stage(dataset_name, "ghg", round_statistics, optional=True))
+
+        # the translations also depend on the index and the resolver of the names, and on the countries accepted in
+        # the alias cache
+        for stage in list_stages:
+            if translation in stage.sources:
+                stage.sources += [translation_index, name_resolver]
+                stage.files.append(ALIAS_CACHE_PATH)
+        return list_stages
+
+    def list_targets(self):
+        """
+        Prints the stages of the pipeline with the datasets they export, which can be requested as targets.
+        """
+        for stage in self.get_stages():
+            print("%s%s : %s" % (stage.name, " (optional)" if stage.optional else "",
+                                 ", ".join(stage.exports + stage.outputs) or "-"))
 
-        # update GHG emissions data
-        self.process_ghg_data(df_country)
+    def run(self, targets=None, dry_run=False, force=False, resume=False):
+        """
+        Runs the stages of the pipeline. Independent stages run in parallel.
+        :param targets: (list) datasets to build (e.g. GHG_FULL_BY_GAS_prod) or stage names. Only the stages needed
+            to build them are run. None to build all the datasets which are not optional.
+        :param dry_run: (bool) True to only print the execution plan.
+        :param force: (bool) True to run the stages even if they are up to date.
+        :param resume: (bool) True to resume the last run if it failed, with its targets : the stages it completed
+            are not run again. The targets and force given are then ignored.
+        :return: (dict) the datasets produced by the stages.
+        """
+        journal = RunJournal(PIPELINE_JOURNAL_FILEPATH) if self.incremental else None
+        if resume:
+            if journal is None or not journal.can_resume():
+                print("\n----- The last run did not fail, nothing to resume")
+                return {}
+            targets, force = journal.get_args().get("targets"), journal.get_args().get("force", False)
+            print("\n----- Resuming the last run (%s)" % journal.dict_journal.get("error", "interrupted"))
+
+        fingerprint_store = FingerprintStore(PIPELINE_CACHE_DIR, max_cache_size=PIPELINE_CACHE_MAX_SIZE,
+                                             registry=REGISTRY) \
+            if self.incremental else None
+        memory_tracker = MemoryTracker(self.memory_blowup_factor) if self.memory_blowup_factor is not None else None
+        spill_store = SpillStore(self.memory_budget * 1024 ** 2, PIPELINE_SPILL_DIR) \
+            if self.memory_budget is not None else None
+        # the datasets sent to the worker processes are shared in memory instead of being pickled for every stage
+        shared_store = SharedMemoryStore() if self.max_workers != 1 and SharedMemoryStore.is_available() else None
+        runner = PipelineRunner(self.get_stages(), max_workers=self.max_workers, fingerprint_store=fingerprint_store,
+                                targets=targets, instrumented_packages=["transformation"], memory_tracker=memory_tracker,
+                                spill_store=spill_store, journal=journal, shared_store=shared_store)
+        try:
+            dict_datasets = runner.run(dry_run, force, resume)
+        finally:
+            # the reports of a failed run are written too
+            if not dry_run:
+                filepath_summary, filepath_trace = write_reports(
+                    runner.list_events, PIPELINE_REPORTS_DIR,
+                    dict_memory_reports=runner.dict_memory_reports if memory_tracker is not None else None)
+                print("\n----- Run summary written in %s, timeline (chrome://tracing or Perfetto) in %s"
+                      % (filepath_summary, filepath_trace))
 
         # update GDP data (World Bank)
         """
@@ -278,7 +423,43 @@ class TransformationPipeline:
         df_ghg_per_capita = StatisticsPerCapitaJoiner().run_ghg_per_capita(df_ghg_by_sector, df_population)
         df_historical_co2_per_capita = StatisticsPerCapitaJoiner().run_historical_emissions_per_capita(df_historical_co2, df_population)
         """
+        return dict_datasets
+
+
+def parse_arguments(list_args=None):
+    parser = argparse.ArgumentParser(description="Runs the transformation pipeline, or only the stages needed to build "
+                                                 "the requested datasets.")
+    parser.add_argument("targets", nargs="*",
+                        help="datasets to build (e.g. GHG_FULL_BY_GAS_prod) or stage names. All the datasets which "
+                             "are not optional by default.")
+    parser.add_argument("--dry-run", action="store_true", help="print the execution plan without running it.")
+    parser.add_argument("--force", action="store_true", help="run the stages even if they are up to date.")
+    parser.add_argument("--resume", action="store_true",
+                        help="resume the last run if it failed, from its first incomplete stage, with its targets.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes running the stages in parallel. All the CPUs by default.")
+    parser.add_argument("--track-memory", action="store_true",
+                        help="measure the memory used by each stage (dataframes, peak RSS, top allocators). Slower.")
+    parser.add_argument("--memory-blowup", type=float, default=4.0,
+                        help="with --track-memory, flag the stages whose intermediate size exceeds this multiple of "
+                             "their input. 4 by default.")
+    parser.add_argument("--memory-budget", type=int, default=None,
+                        help="low-memory mode : maximum size in MB of the datasets held between the stages. The "
+                             "datasets are released once consumed, spilled on disk above the budget, and the stages "
+                             "run sequentially unless --workers is given.")
+    parser.add_argument("--sql-engine", choices=LIST_ENGINES, default=ENGINE_PANDAS,
+                        help="engine of the processors ported from the Dataiku SQL recipes. duckdb runs their joins "
+                             "and aggregations multi-threaded and out-of-core (requires the duckdb package).")
+    parser.add_argument("--list", action="store_true", help="list the stages and the datasets they build.")
+    return parser.parse_args(list_args)
 
 
 if __name__ == "__main__":
-    TransformationPipeline().run()
+    args = parse_arguments()
+    pipeline = TransformationPipeline(max_workers=args.workers,
+                                      memory_blowup_factor=args.memory_blowup if args.track_memory else None,
+                                      memory_budget=args.memory_budget, sql_engine=args.sql_engine)
+    if args.list:
+        pipeline.list_targets()
+    else:
+        pipeline.run(targets=args.targets or None, dry_run=args.dry_run, force=args.force, resume=args.resume)
@@ -0,0 +1,11 @@
+from .stage import Stage
+from .runner import PipelineRunner
+from .fingerprint import FingerprintStore
+from .cache import ArtifactCache
+from sdp_data_preparation.utils.excel import ExcelCache  # shared with sdp_data_preparation
+from .instrumentation import Tracer, TRACER, write_reports
+from .memory import MemoryTracker
+from .spill import SpillStore
+from .shared import SharedMemoryStore
+from .journal import RunJournal
+from .registry import DatasetRegistry, DatasetHandle
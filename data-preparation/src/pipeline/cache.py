@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+DEFAULT_MAX_SIZE = 5 * 1024 ** 3  # 5 GB
+
+
+def hash_file(filepath: str, dict_file_hashes: Dict[str, Dict[str, str]]) -> str:
+    """
+    Returns the SHA-256 of the content of a file. The hash is not computed again as long as the size and the
+    modification time of the file do not change.
+    :param filepath: (str) path of the file.
+    :param dict_file_hashes: (dict) hashes already computed per file, updated in place.
+    """
+    if not os.path.exists(filepath):
+        return "missing"
+    file_stat = os.stat(filepath)
+    file_key = "%s:%s" % (file_stat.st_size, file_stat.st_mtime_ns)
+    dict_file_hash = dict_file_hashes.get(filepath)
+    if dict_file_hash is not None and dict_file_hash["key"] == file_key:
+        return dict_file_hash["sha256"]
+
+    sha256 = hashlib.sha256()
+    with open(filepath, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    dict_file_hashes[filepath] = {"key": file_key, "sha256": sha256.hexdigest()}
+    return sha256.hexdigest()
+
+
+class ArtifactCache:
+    """
+    Persists the datasets produced by the stages, keyed by the fingerprint of the stage. The dataframes are stored in
+    Parquet so that they are reloaded much faster than by running the stage again, the other objects are pickled.
+    The size of the cache is bounded : the entries least recently used are evicted first.
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        :param directory: (str) directory where the artifacts are stored.
+        :param max_size: (int) maximum size of the cache, in bytes.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.filepath_index = os.path.join(directory, "index.json")
+        self.dict_entries = {}
+        if os.path.exists(self.filepath_index):
+            with open(self.filepath_index) as file:
+                self.dict_entries = json.load(file)
+
+    def get_entry_dirpath(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def contains(self, key: str, list_names: List[str]) -> bool:
+        """
+        Returns True if all the given datasets are stored for the key.
+        """
+        dict_entry = self.dict_entries.get(key)
+        if dict_entry is None:
+            return False
+        return all(name in dict_entry["files"]
+                   and os.path.exists(os.path.join(self.get_entry_dirpath(key), dict_entry["files"][name]))
+                   for name in list_names)
+
+    @staticmethod
+    def write_artifact(dirpath: str, name: str, artifact: Any) -> str:
+        """
+        Writes a dataset in Parquet if possible, pickled otherwise (other objects, columns of mixed types, pyarrow
+        not installed).
+        :return: (str) the name of the file written.
+        """
+        if isinstance(artifact, pd.DataFrame):
+            filename = name + ".parquet"
+            try:
+                artifact.to_parquet(os.path.join(dirpath, filename))
+                return filename
+            except (ImportError, ValueError, TypeError, NotImplementedError):
+                if os.path.exists(os.path.join(dirpath, filename)):
+                    os.remove(os.path.join(dirpath, filename))
+        filename = name + ".pkl"
+        with open(os.path.join(dirpath, filename), "wb") as file:
+            pickle.dump(artifact, file, protocol=pickle.HIGHEST_PROTOCOL)
+        return filename
+
+    @staticmethod
+    def read_artifact(filepath: str) -> Any:
+        if filepath.endswith(".parquet"):
+            return pd.read_parquet(filepath)
+        with open(filepath, "rb") as file:
+            return pickle.load(file)
+
+    def load(self, key: str, list_names: List[str]) -> Dict[str, Any]:
+        """
+        Loads the given datasets stored for the key and marks the entry as recently used.
+        """
+        dict_entry = self.dict_entries[key]
+        dict_artifacts = {name: self.read_artifact(os.path.join(self.get_entry_dirpath(key), dict_entry["files"][name]))
+                          for name in list_names}
+        dict_entry["last_access"] = time.time()
+        self.write_index()
+        return dict_artifacts
+
+    def save(self, key: str, dict_artifacts: Dict[str, Any]):
+        """
+        Stores the datasets for the key, then evicts the least recently used entries if the cache is too large.
+        """
+        dirpath = self.get_entry_dirpath(key)
+        if os.path.exists(dirpath):
+            shutil.rmtree(dirpath)
+        os.makedirs(dirpath)
+        dict_files = {name: self.write_artifact(dirpath, name, artifact) for name, artifact in dict_artifacts.items()}
+        size = sum(os.path.getsize(os.path.join(dirpath, filename)) for filename in dict_files.values())
+        self.dict_entries[key] = {"files": dict_files, "size": size, "last_access": time.time()}
+        self.evict(key_kept=key)
+        self.write_index()
+
+    def evict(self, key_kept: Optional[str] = None):
+        """
+        Removes the least recently used entries until the size of the cache is below its maximum size. The entry
+        key_kept is never removed, even if it is larger than the cache alone.
+        """
+        total_size = sum(dict_entry["size"] for dict_entry in self.dict_entries.values())
+        list_keys_lru = sorted(self.dict_entries, key=lambda key: self.dict_entries[key]["last_access"])
+        for key in list_keys_lru:
+            if total_size <= self.max_size:
+                break
+            if key == key_kept:
+                continue
+            print("-- artifact cache : evicting entry %s" % key)
+            total_size -= self.dict_entries.pop(key)["size"]
+            shutil.rmtree(self.get_entry_dirpath(key), ignore_errors=True)
+
+    def write_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        filepath_tmp = self.filepath_index + ".tmp"
+        with open(filepath_tmp, "w") as file:
+            json.dump(self.dict_entries, file, indent=2, sort_keys=True)
+        os.replace(filepath_tmp, self.filepath_index)
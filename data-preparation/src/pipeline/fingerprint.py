@@ -0,0 +1,121 @@
+import hashlib
+import inspect
+import json
+import os
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from pipeline.cache import DEFAULT_MAX_SIZE, ArtifactCache, hash_file
+from pipeline.registry import DatasetRegistry
+from pipeline.stage import Stage
+
+
+class FingerprintStore:
+    """
+    Stores the fingerprint of each stage computed on its last successful run, with the datasets it produced.
+    The fingerprint of a stage hashes its raw input files, the source code of the stage and of its processors, its
+    parameters and the fingerprints of the upstream stages. A stage whose fingerprint did not change since its last
+    successful run does not need to be run again: its outputs are reloaded from the artifact cache instead.
+    """
+
+    def __init__(self, directory: str, max_cache_size: int = DEFAULT_MAX_SIZE,
+                 registry: Optional[DatasetRegistry] = None):
+        """
+        :param directory: (str) directory where the fingerprints and the outputs of the stages are stored.
+        :param max_cache_size: (int) maximum size of the artifact cache storing the outputs of the stages, in bytes.
+        :param registry: (DatasetRegistry) locations of the datasets exported by the stages, so that a stage whose
+            exported files were deleted is run again. None to not check the exported files.
+        """
+        self.directory = directory
+        self.registry = registry
+        self.filepath_fingerprints = os.path.join(directory, "fingerprints.json")
+        self.artifact_cache = ArtifactCache(os.path.join(directory, "artifacts"), max_size=max_cache_size)
+        self.dict_fingerprints = {}
+        self.dict_file_hashes = {}
+        self.dict_durations = {}
+        if os.path.exists(self.filepath_fingerprints):
+            with open(self.filepath_fingerprints) as file:
+                dict_content = json.load(file)
+            self.dict_fingerprints = dict_content.get("stages", {})
+            self.dict_file_hashes = dict_content.get("files", {})
+            self.dict_durations = dict_content.get("durations", {})
+
+    def hash_file(self, filepath: str) -> str:
+        return hash_file(filepath, self.dict_file_hashes)
+
+    @staticmethod
+    def get_source_code(obj: Any) -> str:
+        """
+        Returns the source code of a function, a method, a class or a module, and the parameters bound with
+        functools.partial.
+        """
+        if isinstance(obj, partial):
+            return FingerprintStore.get_source_code(obj.func) + repr(obj.args) + repr(sorted(obj.keywords.items()))
+        try:
+            return inspect.getsource(obj)
+        except (OSError, TypeError):
+            return repr(obj)
+
+    def compute_fingerprint(self, stage: Stage, list_upstream_fingerprints: List[str]) -> str:
+        """
+        Computes the fingerprint of a stage.
+        :param stage: (Stage) the stage.
+        :param list_upstream_fingerprints: (list) fingerprints of the stages producing the inputs of the stage.
+        :return: (str) the fingerprint.
+        """
+        sha256 = hashlib.sha256()
+        sha256.update(stage.name.encode())
+        sha256.update(self.get_source_code(stage.func).encode())
+        for source in stage.sources:
+            sha256.update(self.get_source_code(source).encode())
+        for filepath in sorted(stage.files):
+            sha256.update(("%s=%s" % (filepath, self.hash_file(filepath))).encode())
+        sha256.update(json.dumps(stage.params, sort_keys=True, default=repr).encode())
+        for upstream_fingerprint in list_upstream_fingerprints:
+            sha256.update(upstream_fingerprint.encode())
+        return sha256.hexdigest()
+
+    def is_up_to_date(self, stage: Stage, fingerprint: str) -> bool:
+        """
+        Returns True if the stage was successfully run with the same fingerprint, its outputs were not evicted
+        from the artifact cache and the files of the datasets it exports still exist.
+        """
+        if self.dict_fingerprints.get(stage.name) != fingerprint:
+            return False
+        if self.registry is not None and any(name in self.registry and not self.registry[name].exists()
+                                             for name in stage.exports):
+            return False
+        return len(stage.outputs) == 0 or self.artifact_cache.contains(fingerprint, stage.outputs)
+
+    def load_outputs(self, stage: Stage) -> Dict[str, Any]:
+        """
+        Loads the outputs stored on the last successful run of the stage.
+        """
+        if len(stage.outputs) == 0:
+            return {}
+        return self.artifact_cache.load(self.dict_fingerprints[stage.name], stage.outputs)
+
+    def get_duration(self, stage_name: str) -> Optional[float]:
+        """
+        Returns the duration in seconds of the last successful run of the stage, None if it never ran.
+        """
+        return self.dict_durations.get(stage_name)
+
+    def save(self, stage: Stage, fingerprint: str, dict_outputs: Dict[str, Any], duration: Optional[float] = None):
+        """
+        Records a successful run of the stage with its outputs and its duration.
+        """
+        if len(stage.outputs) > 0:
+            self.artifact_cache.save(fingerprint, dict_outputs)
+        self.dict_fingerprints[stage.name] = fingerprint
+        if duration is not None:
+            self.dict_durations[stage.name] = round(duration, 3)
+        self.write()
+
+    def write(self):
+        os.makedirs(self.directory, exist_ok=True)
+        filepath_tmp = self.filepath_fingerprints + ".tmp"
+        with open(filepath_tmp, "w") as file:
+            json.dump({"stages": self.dict_fingerprints, "files": self.dict_file_hashes, "durations": self.dict_durations},
+                      file, indent=2, sort_keys=True)
+        os.replace(filepath_tmp, self.filepath_fingerprints)
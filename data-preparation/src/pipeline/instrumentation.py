@@ -0,0 +1,208 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+PROCESSOR_METHODS = ["run", "prepare_data"]
+PANDAS_READERS = [("read_csv", "filepath_or_buffer"), ("read_excel", "io"), ("read_parquet", "path")]
+PANDAS_WRITERS = [("to_csv", "path_or_buf"), ("to_excel", "excel_writer"), ("to_parquet", "path")]
+
+
+def count_rows(obj: Any) -> int:
+    """
+    Returns the number of rows of a dataframe, or of all the dataframes in a tuple, a list or a dict.
+    """
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, (tuple, list)):
+        return sum(count_rows(item) for item in obj)
+    if isinstance(obj, dict):
+        return sum(count_rows(item) for item in obj.values())
+    return 0
+
+
+def get_file_size(filepath: Any) -> int:
+    if isinstance(filepath, (str, os.PathLike)) and os.path.isfile(filepath):
+        return os.path.getsize(filepath)
+    return 0
+
+
+class Tracer:
+    """
+    Records timed events in the Chrome trace format : the stages, the processor calls (run, prepare_data) and the
+    pandas reads and writes, with the rows in and out and the bytes read and written. Once installed, the processor
+    classes and pandas are patched so that every call is recorded.
+    """
+
+    def __init__(self):
+        self.list_events = []
+        self.list_patches = []
+        self.current_stage = None
+
+    @contextmanager
+    def span(self, name: str, category: str, **dict_args):
+        """
+        Records the duration of the code run in the context. The yielded dict can be completed with arguments
+        known at the end, such as the number of rows out.
+        """
+        start = time.time_ns()
+        if self.current_stage is not None:
+            dict_args["stage"] = self.current_stage
+        try:
+            yield dict_args
+        finally:
+            self.list_events.append({"name": name, "cat": category, "ph": "X", "pid": os.getpid(),
+                                     "tid": threading.get_ident(), "ts": start / 1000,
+                                     "dur": (time.time_ns() - start) / 1000, "args": dict_args})
+
+    def collect_events(self) -> List[Dict[str, Any]]:
+        """
+        Returns the events recorded so far and forgets them.
+        """
+        list_events, self.list_events = self.list_events, []
+        return list_events
+
+    def wrap_reader(self, func: Callable, path_argument: str) -> Callable:
+        @wraps(func)
+        def reader(*args, **kwargs):
+            filepath = args[0] if len(args) > 0 else kwargs.get(path_argument)
+            if isinstance(filepath, pd.ExcelFile):  # sheet of a workbook already opened
+                filepath = filepath.io
+            with self.span("%s %s" % (func.__name__, os.path.basename(str(filepath))), "io",
+                           bytes_read=get_file_size(filepath)) as dict_args:
+                result = func(*args, **kwargs)
+                dict_args["rows_out"] = count_rows(result)
+            return result
+        return reader
+
+    def wrap_writer(self, func: Callable, path_argument: str) -> Callable:
+        @wraps(func)
+        def writer(df, *args, **kwargs):
+            filepath = args[0] if len(args) > 0 else kwargs.get(path_argument)
+            with self.span("%s %s" % (func.__name__, os.path.basename(str(filepath))), "io",
+                           rows_in=count_rows(df)) as dict_args:
+                result = func(df, *args, **kwargs)
+            dict_args["bytes_written"] = get_file_size(filepath)
+            return result
+        return writer
+
+    def wrap_processor_method(self, class_name: str, func: Callable) -> Callable:
+        @wraps(func)
+        def method(*args, **kwargs):
+            with self.span("%s.%s" % (class_name, func.__name__), "processor",
+                           rows_in=count_rows(list(args) + list(kwargs.values()))) as dict_args:
+                result = func(*args, **kwargs)
+                dict_args["rows_out"] = count_rows(result)
+            return result
+        return method
+
+    def patch(self, owner: Any, attribute: str, value: Any):
+        # the original is None when the attribute is inherited, e.g. DataFrame.to_csv defined in NDFrame
+        self.list_patches.append((owner, attribute, vars(owner).get(attribute)))
+        setattr(owner, attribute, value)
+
+    def install(self, list_packages: List[str]):
+        """
+        Patches pandas and the processor classes of the given packages so that their calls are recorded.
+        Installing the tracer twice has no effect.
+        :param list_packages: (list) names of the packages containing the processors, e.g. ["transformation"].
+        """
+        if len(self.list_patches) > 0:
+            return
+        for function_name, path_argument in PANDAS_READERS:
+            self.patch(pd, function_name, self.wrap_reader(getattr(pd, function_name), path_argument))
+        for method_name, path_argument in PANDAS_WRITERS:
+            self.patch(pd.DataFrame, method_name, self.wrap_writer(getattr(pd.DataFrame, method_name), path_argument))
+
+        # only the modules already imported are patched : some modules of the packages are not importable
+        list_module_names = [module_name for module_name in list(sys.modules) for package_name in list_packages
+                             if module_name == package_name or module_name.startswith(package_name + ".")]
+        for module_name in list_module_names:
+            module = sys.modules[module_name]
+            for obj in list(vars(module).values()):
+                if not isinstance(obj, type) or obj.__module__ != module_name:
+                    continue
+                for method_name in PROCESSOR_METHODS:
+                    method = obj.__dict__.get(method_name)
+                    if isinstance(method, staticmethod):
+                        self.patch(obj, method_name,
+                                   staticmethod(self.wrap_processor_method(obj.__name__, method.__func__)))
+                    elif callable(method):
+                        self.patch(obj, method_name, self.wrap_processor_method(obj.__name__, method))
+
+    def uninstall(self):
+        """
+        Restores pandas and the processor classes.
+        """
+        for owner, attribute, value in reversed(self.list_patches):
+            if value is None:
+                delattr(owner, attribute)
+            else:
+                setattr(owner, attribute, value)
+        self.list_patches = []
+
+
+# tracer of the current process, shared by the patched functions
+TRACER = Tracer()
+
+
+def summarize_events(list_events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Summarizes the events of a run : the wall time, rows and bytes of every stage, and the same statistics
+    aggregated per call (processor method, file read or written).
+    """
+    dict_stages = {}
+    dict_calls = {}
+    for event in list_events:
+        dict_args = event["args"]
+        if event["cat"] == "stage":
+            dict_stages[event["name"]] = {"duration_s": round(event["dur"] / 1e6, 3),
+                                          "rows_in": dict_args.get("rows_in", 0),
+                                          "rows_out": dict_args.get("rows_out", 0),
+                                          "bytes_read": 0, "bytes_written": 0}
+            continue
+        dict_call = dict_calls.setdefault(event["name"], {"category": event["cat"], "count": 0, "duration_s": 0,
+                                                          "rows_in": 0, "rows_out": 0, "bytes_read": 0,
+                                                          "bytes_written": 0})
+        dict_call["count"] += 1
+        dict_call["duration_s"] = round(dict_call["duration_s"] + event["dur"] / 1e6, 3)
+        for key in ["rows_in", "rows_out", "bytes_read", "bytes_written"]:
+            dict_call[key] += dict_args.get(key, 0)
+
+    for event in list_events:
+        if event["cat"] == "io" and event["args"].get("stage") in dict_stages:
+            dict_stage = dict_stages[event["args"]["stage"]]
+            dict_stage["bytes_read"] += event["args"].get("bytes_read", 0)
+            dict_stage["bytes_written"] += event["args"].get("bytes_written", 0)
+
+    list_slowest_stages = sorted(dict_stages, key=lambda name: dict_stages[name]["duration_s"], reverse=True)
+    return {"stages": dict_stages, "calls": dict_calls, "slowest_stages": list_slowest_stages[:5]}
+
+
+def write_reports(list_events: List[Dict[str, Any]], directory: str, prefix: Optional[str] = None,
+                  dict_memory_reports: Optional[Dict[str, dict]] = None) -> List[str]:
+    """
+    Writes the JSON summary of a run and its timeline, which can be opened in chrome://tracing or Perfetto.
+    :param dict_memory_reports: (dict) memory reports per stage, added to the summary when the memory was tracked.
+    :return: (list) paths of the summary and of the timeline.
+    """
+    os.makedirs(directory, exist_ok=True)
+    prefix = prefix if prefix is not None else time.strftime("run_%Y%m%d_%H%M%S")
+    filepath_summary = os.path.join(directory, prefix + "_summary.json")
+    filepath_trace = os.path.join(directory, prefix + "_trace.json")
+    with open(filepath_summary, "w") as file:
+        dict_summary = summarize_events(list_events)
+        if dict_memory_reports is not None:
+            dict_summary["memory"] = dict_memory_reports
+            dict_summary["memory_flagged_stages"] = [name for name, dict_memory in dict_memory_reports.items()
+                                                     if dict_memory["flagged"]]
+        json.dump(dict_summary, file, indent=2)
+    with open(filepath_trace, "w") as file:
+        json.dump({"traceEvents": list_events, "displayTimeUnit": "ms"}, file)
+    return [filepath_summary, filepath_trace]
@@ -0,0 +1,85 @@
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+
+class RunJournal:
+    """
+    Records the progress of the last run of the pipeline : its arguments, and the status and the fingerprint of each
+    stage once it is done. When a run fails or is killed, the next run can resume it : the stages it completed are
+    not run again, their outputs are reloaded from the fingerprint store.
+    """
+
+    def __init__(self, filepath: str):
+        """
+        :param filepath: (str) JSON file of the journal.
+        """
+        self.filepath = filepath
+        self.dict_journal = {}
+        if os.path.exists(filepath):
+            with open(filepath) as file:
+                self.dict_journal = json.load(file)
+
+    def can_resume(self) -> bool:
+        """
+        Returns True if the last run did not finish successfully.
+        """
+        return self.dict_journal.get("status") in ["running", "failed"]
+
+    def get_args(self) -> Dict[str, Any]:
+        """
+        Returns the arguments of the last run (targets, force).
+        """
+        return self.dict_journal.get("args", {})
+
+    def get_completed_stages(self) -> Dict[str, str]:
+        """
+        Returns the fingerprint of each stage completed by the last run.
+        """
+        return {name: dict_stage["fingerprint"] for name, dict_stage in self.dict_journal.get("stages", {}).items()
+                if dict_stage["status"] == "done"}
+
+    def start(self, list_stage_names: List[str], dict_args: Dict[str, Any]):
+        """
+        Starts a new run of the given stages.
+        """
+        self.dict_journal = {"run_id": uuid.uuid4().hex, "status": "running", "started_at": time.time(),
+                             "args": dict_args, "stages": {name: {"status": "pending"} for name in list_stage_names}}
+        self.write()
+
+    def resume(self, list_stage_names: List[str]):
+        """
+        Resumes the last run : the stages it completed stay done, the others are pending again.
+        """
+        dict_stages = self.dict_journal.get("stages", {})
+        self.dict_journal["stages"] = {name: dict_stages[name] if dict_stages.get(name, {}).get("status") == "done"
+                                       else {"status": "pending"} for name in list_stage_names}
+        self.dict_journal["status"] = "running"
+        self.dict_journal["resumed_at"] = time.time()
+        self.dict_journal.pop("error", None)
+        self.write()
+
+    def record_stage_done(self, stage_name: str, fingerprint: Optional[str], duration: Optional[float]):
+        self.dict_journal["stages"][stage_name] = {"status": "done", "fingerprint": fingerprint,
+                                                   "duration": duration, "finished_at": time.time()}
+        self.write()
+
+    def record_stage_failed(self, stage_name: str, error: BaseException):
+        self.dict_journal["stages"][stage_name] = {"status": "failed", "error": repr(error)}
+        self.dict_journal["status"] = "failed"
+        self.dict_journal["error"] = "stage %s failed : %r" % (stage_name, error)
+        self.write()
+
+    def finish(self, status: str):
+        self.dict_journal["status"] = status
+        self.dict_journal["finished_at"] = time.time()
+        self.write()
+
+    def write(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.filepath)), exist_ok=True)
+        filepath_tmp = self.filepath + ".tmp"
+        with open(filepath_tmp, "w") as file:
+            json.dump(self.dict_journal, file, indent=2)
+        os.replace(filepath_tmp, self.filepath)
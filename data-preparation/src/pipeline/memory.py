@@ -0,0 +1,119 @@
+import os
+import sys
+import tracemalloc
+from typing import Any, Dict, List
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MB = 1024 ** 2
+
+
+def get_memory_usage(obj: Any) -> int:
+    """
+    Returns the memory used by a dataframe in bytes, including the content of its object columns.
+    """
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True))
+    return 0
+
+
+def reset_peak_rss() -> bool:
+    """
+    Resets the peak resident set size of the process. Only possible on Linux, returns False elsewhere.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def get_peak_rss() -> int:
+    """
+    Returns the peak resident set size of the process in bytes, since the last reset on Linux.
+    """
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class MemoryTracker:
+    """
+    Measures the memory used by a stage : the size of the dataframes entering and leaving it, the peak RSS of the
+    process while it runs, and the source lines holding the most memory traced by tracemalloc when it ends. A stage is flagged when its peak of traced
+    memory exceeds blowup_factor times the size of its inputs (dataframes and raw files).
+    Tracing the allocations slows the stages down, so the tracker is opt-in.
+    """
+
+    def __init__(self, blowup_factor: float = 4.0, nb_top_allocators: int = 10):
+        """
+        :param blowup_factor: (float) stages whose intermediate size exceeds this multiple of their input are flagged.
+        :param nb_top_allocators: (int) number of top allocating source lines reported per stage.
+        """
+        self.blowup_factor = blowup_factor
+        self.nb_top_allocators = nb_top_allocators
+        self.dict_input_sizes = {}
+        self.input_bytes = 0
+
+    def start(self, input_names: List[str], list_inputs: list, list_files: List[str]):
+        """
+        Starts tracking a stage, before it runs.
+        """
+        self.dict_input_sizes = {name: get_memory_usage(df) for name, df in zip(input_names, list_inputs)}
+        self.input_bytes = sum(self.dict_input_sizes.values()) + sum(os.path.getsize(filepath)
+                                                                    for filepath in list_files
+                                                                    if os.path.isfile(filepath))
+        reset_peak_rss()
+        tracemalloc.start()
+
+    @staticmethod
+    def cancel():
+        """
+        Stops tracking a stage which failed, so that the allocations of the next stages are not traced.
+        """
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def stop(self, stage_name: str, dict_outputs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Stops tracking a stage, once it ran.
+        :return: (dict) the memory report of the stage.
+        """
+        _, peak_traced = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        list_top_allocators = [{"line": "%s:%s" % (statistic.traceback[0].filename, statistic.traceback[0].lineno),
+                                "size_mb": round(statistic.size / MB, 1), "count": statistic.count}
+                               for statistic in snapshot.statistics("lineno")[:self.nb_top_allocators]]
+        blowup = peak_traced / self.input_bytes if self.input_bytes > 0 else None
+        dict_report = {
+            "inputs_mb": {name: round(size / MB, 1) for name, size in self.dict_input_sizes.items()},
+            "outputs_mb": {name: round(get_memory_usage(df) / MB, 1) for name, df in dict_outputs.items()},
+            "input_mb": round(self.input_bytes / MB, 1),
+            "peak_traced_mb": round(peak_traced / MB, 1),
+            "peak_rss_mb": round(get_peak_rss() / MB, 1),
+            "blowup": round(blowup, 1) if blowup is not None else None,
+            "flagged": blowup is not None and blowup > self.blowup_factor,
+            "top_allocators": list_top_allocators,
+        }
+        if dict_report["flagged"]:
+            print("WARNING : stage %s peaked at %s MB, %s times its input of %s MB" % (
+                stage_name, dict_report["peak_traced_mb"], dict_report["blowup"], dict_report["input_mb"]))
+        return dict_report
@@ -0,0 +1,178 @@
+import os
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from sdp_data_preparation.utils.excel import ExcelCache, read_workbook_sheets
+
+DICT_FORMATS_PER_EXTENSION = {".csv": "csv", ".txt": "csv", ".xlsx": "excel", ".xls": "excel", ".parquet": "parquet"}
+
+
+class DatasetHandle:
+    """
+    Lazy handle to a dataset of the registry : its physical location, format and schema are resolved when it is
+    registered, but the file is only read when read() is called. The dataframe read from a shared dataset is kept, so
+    that the stages run in the same process do not read the file again : each of them gets its own copy.
+    """
+
+    def __init__(self, name: str, filepath: str, file_format: Optional[str] = None,
+                 schema: Optional[Dict[str, str]] = None, read_kwargs: Optional[Dict[str, Any]] = None,
+                 shared: bool = False, excel_cache: Optional[ExcelCache] = None):
+        """
+        :param name: (str) logical name of the dataset.
+        :param filepath: (str) absolute path of the file.
+        :param file_format: (str) "csv", "excel" or "parquet". None to deduce it from the extension of the file.
+        :param schema: (dict) dtype per column, applied when the dataset is read.
+        :param read_kwargs: (dict) arguments of the pandas reader, e.g. {"sep": "\t"} or {"sheet_name": "Data"}.
+        :param shared: (bool) True to keep the dataframe read, for the datasets read by several stages.
+        :param excel_cache: (ExcelCache) cache of the sheets already read, for the Excel datasets. None to always parse
+            the workbook.
+        """
+        self.name = name
+        self.filepath = filepath
+        self.file_format = file_format if file_format is not None \
+            else DICT_FORMATS_PER_EXTENSION.get(os.path.splitext(filepath)[1].lower(), "csv")
+        self.schema = dict(schema) if schema is not None else {}
+        self.read_kwargs = dict(read_kwargs) if read_kwargs is not None else {}
+        self.shared = shared
+        self.excel_cache = excel_cache
+        self.dict_cache = {}
+
+    def __repr__(self):
+        return "DatasetHandle(%s, %s)" % (self.name, self.filepath)
+
+    def __getstate__(self):
+        # the dataframes read are not sent to the worker processes
+        dict_state = dict(self.__dict__)
+        dict_state["dict_cache"] = {}
+        return dict_state
+
+    def exists(self) -> bool:
+        return os.path.exists(self.filepath)
+
+    def read_file(self, dict_kwargs: Dict[str, Any]) -> pd.DataFrame:
+        if self.file_format == "excel" and self.excel_cache is not None:
+            df = self.excel_cache.read(self.filepath, **dict_kwargs)
+        elif self.file_format == "excel":
+            df = pd.read_excel(self.filepath, **dict_kwargs)
+        elif self.file_format == "parquet":
+            df = pd.read_parquet(self.filepath, **dict_kwargs)
+        else:
+            df = pd.read_csv(self.filepath, **dict_kwargs)
+        return self.apply_schema(df)
+
+    def apply_schema(self, df: pd.DataFrame) -> pd.DataFrame:
+        if len(self.schema) > 0 and isinstance(df, pd.DataFrame):
+            df = df.astype({column: dtype for column, dtype in self.schema.items() if column in df.columns})
+        return df
+
+    def read(self, **kwargs) -> pd.DataFrame:
+        """
+        Reads the dataset. For a shared dataset, returns a copy of the dataframe already read in this process.
+        :param kwargs: arguments of the pandas reader, overriding the ones of the registry (e.g. another sheet).
+        """
+        dict_kwargs = {**self.read_kwargs, **kwargs}
+        if not self.shared or "chunksize" in dict_kwargs:
+            return self.read_file(dict_kwargs)
+        key = repr(sorted(dict_kwargs.items()))
+        if key not in self.dict_cache:
+            self.dict_cache[key] = self.read_file(dict_kwargs)
+        return self.dict_cache[key].copy()
+
+    def read_sheets(self, *sheet_names, **kwargs) -> List[pd.DataFrame]:
+        """
+        Reads several sheets of an Excel dataset, opening the workbook once.
+        :param sheet_names: names or indexes of the sheets.
+        :param kwargs: arguments of pd.read_excel, applied to every sheet.
+        :return: (list) the sheets, in the order requested.
+        """
+        if self.file_format != "excel":
+            raise ValueError("ERROR : dataset %s is not an Excel workbook" % self.name)
+        dict_kwargs = {**self.read_kwargs, **kwargs}
+        dict_kwargs.pop("sheet_name", None)
+        if self.excel_cache is not None:
+            dict_sheets = self.excel_cache.read_sheets(self.filepath, list(sheet_names), **dict_kwargs)
+        else:
+            dict_sheets = read_workbook_sheets(self.filepath, list(sheet_names), **dict_kwargs)
+        return [self.apply_schema(dict_sheets[sheet_name]) for sheet_name in sheet_names]
+
+    def write(self, df: pd.DataFrame):
+        """
+        Writes the dataset, without the index of the dataframe.
+        """
+        os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+        if self.file_format == "excel":
+            df.to_excel(self.filepath, index=False)
+        elif self.file_format == "parquet":
+            df.to_parquet(self.filepath, index=False)
+        else:
+            df.to_csv(self.filepath, index=False)
+        self.release()
+
+    def release(self):
+        """
+        Forgets the dataframes read.
+        """
+        self.dict_cache = {}
+
+
+class DatasetRegistry:
+    """
+    Maps the logical names of the datasets to their physical location, format and schema. The root directories are
+    resolved once, when the registry is created, so that the paths are not assembled by hand in every module.
+    """
+
+    def __init__(self, dict_roots: Dict[str, str], excel_cache: Optional[ExcelCache] = None):
+        """
+        :param dict_roots: (dict) absolute path per logical root directory, e.g. {"raw_data": "/.../data/raw_data"}.
+        :param excel_cache: (ExcelCache) cache of the sheets already read, shared by the Excel datasets.
+        """
+        self.dict_roots = {name: os.path.abspath(directory) for name, directory in dict_roots.items()}
+        self.excel_cache = excel_cache
+        self.dict_handles = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.dict_handles
+
+    def __getitem__(self, name: str) -> DatasetHandle:
+        if name not in self.dict_handles:
+            raise KeyError("ERROR : dataset %s is not registered" % name)
+        return self.dict_handles[name]
+
+    def get_names(self) -> List[str]:
+        return list(self.dict_handles)
+
+    def get_directory(self, root: str, relative_path: str = "") -> str:
+        """
+        Returns the absolute path of a directory under one of the roots.
+        """
+        if root not in self.dict_roots:
+            raise KeyError("ERROR : root directory %s is not registered" % root)
+        return os.path.join(self.dict_roots[root], relative_path) if relative_path else self.dict_roots[root]
+
+    def register(self, name: str, root: str, relative_path: str, file_format: Optional[str] = None,
+                 schema: Optional[Dict[str, str]] = None, shared: bool = False, **read_kwargs) -> DatasetHandle:
+        """
+        Registers a dataset.
+        :param name: (str) logical name of the dataset.
+        :param root: (str) logical root directory of the dataset.
+        :param relative_path: (str) path of the file relative to the root directory.
+        :param file_format: (str) "csv", "excel" or "parquet". None to deduce it from the extension of the file.
+        :param schema: (dict) dtype per column, applied when the dataset is read.
+        :param shared: (bool) True to keep the dataframe read, for the datasets read by several stages.
+        :param read_kwargs: arguments of the pandas reader.
+        :return: (DatasetHandle) the handle of the dataset.
+        """
+        if name in self.dict_handles:
+            raise ValueError("ERROR : dataset %s is registered twice" % name)
+        handle = DatasetHandle(name, self.get_directory(root, relative_path), file_format, schema, read_kwargs, shared,
+                               self.excel_cache)
+        self.dict_handles[name] = handle
+        return handle
+
+    def release(self):
+        """
+        Forgets the dataframes read by all the handles.
+        """
+        for handle in self.dict_handles.values():
+            handle.release()
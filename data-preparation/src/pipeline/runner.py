@@ -0,0 +1,392 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pipeline.fingerprint import FingerprintStore
+from pipeline.instrumentation import TRACER, count_rows
+from pipeline.journal import RunJournal
+from pipeline.memory import MemoryTracker
+from pipeline.shared import SharedMemoryStore
+from pipeline.spill import SpillStore
+from pipeline.stage import Stage
+
+
+def run_stage(name: str, func: Callable, outputs: List[str], args: list,
+              list_instrumented_packages: Optional[List[str]] = None, memory_tracker: Optional[MemoryTracker] = None,
+              inputs: Optional[List[str]] = None, files: Optional[List[str]] = None
+              ) -> Tuple[Dict[str, Any], float, List[dict], Optional[dict]]:
+    """
+    Entry point of the worker processes. Only the function of the stage is sent to the worker, not the modules
+    listed in its sources. The inputs published in shared memory are mapped here.
+    :param list_instrumented_packages: (list) packages whose processors are traced, None to only trace the stage.
+    :param memory_tracker: (MemoryTracker) to measure the memory used by the stage, None not to measure it.
+    :param inputs: (list) names of the input datasets, and files: (list) raw files, reported by the memory tracker.
+    :return: (tuple) the outputs of the stage, its duration in seconds, the events traced while it ran and its
+        memory report.
+    """
+    args = [SharedMemoryStore.load(arg) for arg in args]
+    if list_instrumented_packages is not None:
+        TRACER.install(list_instrumented_packages)
+    TRACER.collect_events()
+    if memory_tracker is not None:
+        memory_tracker.start(inputs or [], args, files or [])
+    start = time.perf_counter()
+    TRACER.current_stage = name
+    try:
+        with TRACER.span(name, "stage", rows_in=count_rows(args)) as dict_args:
+            dict_outputs = Stage(name, func, outputs=outputs).run(*args)
+            dict_args["rows_out"] = count_rows(dict_outputs)
+    except BaseException:
+        if memory_tracker is not None:
+            memory_tracker.cancel()
+        raise
+    finally:
+        TRACER.current_stage = None
+    duration = time.perf_counter() - start
+    dict_memory = memory_tracker.stop(name, dict_outputs) if memory_tracker is not None else None
+    return dict_outputs, duration, TRACER.collect_events(), dict_memory
+
+
+class PipelineRunner:
+    """
+    Runs the stages of a pipeline as a DAG: a stage is started as soon as all its inputs are available, so that
+    independent stages run concurrently in a process pool. The total duration is then close to the critical path of
+    the DAG instead of the sum of all the stages.
+    """
+
+    def __init__(self, stages: List[Stage], max_workers: Optional[int] = None,
+                 fingerprint_store: Optional[FingerprintStore] = None, targets: Optional[List[str]] = None,
+                 instrumented_packages: Optional[List[str]] = None, memory_tracker: Optional[MemoryTracker] = None,
+                 spill_store: Optional[SpillStore] = None, journal: Optional[RunJournal] = None,
+                 shared_store: Optional[SharedMemoryStore] = None):
+        """
+        :param stages: (list) the stages of the pipeline.
+        :param max_workers: (int) number of worker processes. None to use the number of CPUs, 1 to run the stages
+            sequentially in the current process.
+        :param fingerprint_store: (FingerprintStore) to skip the stages that did not change since their last
+            successful run. None to run all the stages.
+        :param targets: (list) names of the datasets (exported, produced) or of the stages to build. Only these
+            stages and their upstream stages are run. None to build all the stages which are not optional.
+        :param instrumented_packages: (list) packages whose processor calls and pandas reads and writes are traced,
+            e.g. ["transformation"]. None to only trace the stages.
+        :param memory_tracker: (MemoryTracker) to measure the memory used by each stage. None not to measure it, as
+            tracing the allocations slows the stages down.
+        :param spill_store: (SpillStore) to run in low-memory mode : the datasets are released as soon as the stages
+            consuming them are done, and spilled on disk when they exceed the memory budget of the store.
+        :param journal: (RunJournal) to record the stages completed by the run, so that a failed run can be resumed.
+        :param shared_store: (SharedMemoryStore) to publish the input datasets of the stages run in the process pool
+            once in shared memory, instead of pickling them into the worker for every stage. None to pickle them.
+        """
+        self.stages = stages
+        self.max_workers = max_workers
+        self.fingerprint_store = fingerprint_store
+        self.instrumented_packages = instrumented_packages
+        self.memory_tracker = memory_tracker
+        self.spill_store = spill_store
+        self.journal = journal
+        self.shared_store = shared_store
+        self.targets = targets
+        self.dict_stages = {}
+        self.dict_producers = {}
+        for stage in stages:
+            if stage.name in self.dict_stages:
+                raise ValueError("ERROR : stage %s is declared twice" % stage.name)
+            self.dict_stages[stage.name] = stage
+            for output in stage.outputs:
+                if output in self.dict_producers:
+                    raise ValueError("ERROR : dataset %s is produced by stages %s and %s"
+                                     % (output, self.dict_producers[output], stage.name))
+                self.dict_producers[output] = stage.name
+        for stage in stages:
+            list_inputs_missing = [name for name in stage.inputs if name not in self.dict_producers]
+            if len(list_inputs_missing) > 0:
+                raise ValueError("ERROR : no stage produces the inputs %s of stage %s" % (list_inputs_missing, stage.name))
+        self.list_stages_sorted = self.sort_stages()
+        self.list_stages_selected = self.select_stages(targets)
+        self.dict_fingerprints = {}
+        self.dict_datasets = {}
+        self.dict_outputs_per_stage = {}
+        self.list_events = []
+        self.dict_memory_reports = {}
+        self.dict_consumers = {}
+
+    def get_upstream_stages(self, stage: Stage) -> List[str]:
+        """
+        Returns the names of the stages producing the inputs of the given stage.
+        """
+        return sorted(set(self.dict_producers[name] for name in stage.inputs))
+
+    def sort_stages(self) -> List[Stage]:
+        """
+        Sorts the stages in a topological order. Among the stages that are ready, the declaration order is kept so
+        that the order is deterministic.
+        """
+        list_stages_sorted = []
+        set_done = set()
+        list_pending = list(self.stages)
+        while len(list_pending) > 0:
+            list_ready = [stage for stage in list_pending
+                          if all(name in set_done for name in self.get_upstream_stages(stage))]
+            if len(list_ready) == 0:
+                raise ValueError("ERROR : cycle detected between stages %s" % [stage.name for stage in list_pending])
+            for stage in list_ready:
+                list_stages_sorted.append(stage)
+                set_done.add(stage.name)
+            list_pending = [stage for stage in list_pending if stage.name not in set_done]
+        return list_stages_sorted
+
+    def get_target_stage(self, target: str) -> Stage:
+        """
+        Returns the stage building a target : a dataset it exports, a dataset it produces, or the stage itself.
+        """
+        for stage in self.stages:
+            if target in stage.exports or target in stage.outputs or target == stage.name:
+                return stage
+        list_stages = [stage for stage in self.stages if target.lower() in [name.lower() for name in stage.exports]]
+        if len(list_stages) == 0:
+            raise ValueError("ERROR : no stage builds the target %s" % target)
+        return list_stages[0]
+
+    def select_stages(self, targets: Optional[List[str]]) -> List[Stage]:
+        """
+        Selects the stages building the targets with all their upstream stages, in the topological order.
+        """
+        if targets is None:
+            list_pending = [stage for stage in self.stages if not stage.optional]
+        else:
+            list_pending = [self.get_target_stage(target) for target in targets]
+        set_selected = set()
+        while len(list_pending) > 0:
+            stage = list_pending.pop()
+            if stage.name not in set_selected:
+                set_selected.add(stage.name)
+                list_pending += [self.dict_stages[name] for name in self.get_upstream_stages(stage)]
+        return [stage for stage in self.list_stages_sorted if stage.name in set_selected]
+
+    def compute_fingerprints(self) -> Dict[str, str]:
+        """
+        Computes the fingerprint of every selected stage, following the topological order so that a change in a
+        stage invalidates all the stages downstream.
+        """
+        dict_fingerprints = {}
+        for stage in self.list_stages_selected:
+            list_upstream_fingerprints = [dict_fingerprints[name] for name in self.get_upstream_stages(stage)]
+            dict_fingerprints[stage.name] = self.fingerprint_store.compute_fingerprint(stage, list_upstream_fingerprints)
+        return dict_fingerprints
+
+    def get_stages_to_run(self, force: bool = False, dict_completed: Optional[Dict[str, str]] = None) -> List[Stage]:
+        """
+        Returns the selected stages that have to be run, in the topological order.
+        :param force: (bool) True to run the stages even if they are up to date.
+        :param dict_completed: (dict) fingerprints of the stages completed by the run being resumed. These stages
+            are not run again, even with force, as long as their fingerprint did not change.
+        """
+        if self.fingerprint_store is None:
+            return list(self.list_stages_selected)
+        self.dict_fingerprints = self.compute_fingerprints()
+        dict_completed = dict_completed if dict_completed is not None else {}
+        return [stage for stage in self.list_stages_selected
+                if not self.fingerprint_store.is_up_to_date(stage, self.dict_fingerprints[stage.name])
+                or (force and dict_completed.get(stage.name) != self.dict_fingerprints[stage.name])]
+
+    def get_estimated_durations(self, list_stages_to_run: List[Stage]) -> Dict[str, Optional[float]]:
+        """
+        Estimates the duration of the stages to run from their last recorded run. None when the stage never ran.
+        """
+        if self.fingerprint_store is None:
+            return {stage.name: None for stage in list_stages_to_run}
+        return {stage.name: self.fingerprint_store.get_duration(stage.name) for stage in list_stages_to_run}
+
+    def print_plan(self, list_stages_to_run: List[Stage]):
+        """
+        Prints the execution plan : the selected stages that are run or skipped, with their estimated cost.
+        The critical path is the longest chain of dependent stages to run, i.e. the duration of a parallel run.
+        """
+        dict_durations = self.get_estimated_durations(list_stages_to_run)
+        dict_critical_paths = {}
+        print("\n----- Execution plan : %s stages to run, %s up to date" % (
+            len(list_stages_to_run), len(self.list_stages_selected) - len(list_stages_to_run)))
+        for stage in self.list_stages_selected:
+            if stage.name not in dict_durations:
+                print("  skip  %s (up to date)" % stage.name)
+                continue
+            duration = dict_durations[stage.name]
+            dict_critical_paths[stage.name] = (duration or 0) + max(
+                [dict_critical_paths.get(name, 0) for name in self.get_upstream_stages(stage)], default=0)
+            print("  run   %s (%s)" % (stage.name, "~%.1fs" % duration if duration is not None else "never run"))
+        list_unknown = [name for name, duration in dict_durations.items() if duration is None]
+        print("Estimated cost : %.1fs sequential, %.1fs on the critical path%s" % (
+            sum(duration or 0 for duration in dict_durations.values()), max(dict_critical_paths.values(), default=0),
+            " (without the %s stages never run)" % len(list_unknown) if len(list_unknown) > 0 else ""))
+
+    def get_inputs(self, stage: Stage) -> list:
+        """
+        Returns the input datasets of a stage. The outputs of the skipped stages are loaded from the fingerprint
+        store only when a stage needs them.
+        """
+        for name in stage.inputs:
+            if name not in self.dict_datasets:
+                self.on_stage_done(self.dict_stages[self.dict_producers[name]], None)
+        return [SpillStore.load(self.dict_datasets[name]) for name in stage.inputs]
+
+    def release_datasets(self, list_names: List[str]):
+        """
+        In low-memory mode, releases the datasets whose consumers are all done, then spills the largest datasets
+        left if they exceed the memory budget.
+        """
+        if self.spill_store is None:
+            return
+        for name in list_names:
+            if len(self.dict_consumers.get(name, [])) == 0:
+                self.dict_datasets.pop(name, None)
+        self.spill_store.spill(self.dict_datasets)
+
+    def get_shared_inputs(self, stage: Stage) -> list:
+        """
+        Returns the input datasets of a stage to send to a worker process, published in shared memory if possible.
+        """
+        list_inputs = self.get_inputs(stage)
+        if self.shared_store is None:
+            return list_inputs
+        return [self.shared_store.publish(name, dataset) for name, dataset in zip(stage.inputs, list_inputs)]
+
+    def on_stage_consumed_inputs(self, stage: Stage):
+        for name in stage.inputs:
+            self.dict_consumers[name].discard(stage.name)
+            if self.shared_store is not None and len(self.dict_consumers[name]) == 0:
+                self.shared_store.release(name)
+        self.release_datasets(stage.inputs)
+
+    def on_stage_done(self, stage: Stage, dict_outputs: Optional[Dict[str, Any]], duration: Optional[float] = None,
+                      list_events: Optional[List[dict]] = None, dict_memory: Optional[dict] = None):
+        """
+        Records the outputs of a stage. None for a skipped stage whose outputs are loaded from the fingerprint store.
+        """
+        if list_events is not None:
+            self.list_events += list_events
+        if dict_memory is not None:
+            self.dict_memory_reports[stage.name] = dict_memory
+        if dict_outputs is None:
+            dict_outputs = self.fingerprint_store.load_outputs(stage)
+        else:
+            if self.fingerprint_store is not None:
+                self.fingerprint_store.save(stage, self.dict_fingerprints[stage.name], dict_outputs, duration)
+            if self.journal is not None:
+                self.journal.record_stage_done(stage.name, self.dict_fingerprints.get(stage.name), duration)
+        self.dict_datasets.update(dict_outputs)
+        if self.spill_store is not None:
+            # the outputs are not kept until the end of the run in low-memory mode
+            self.dict_outputs_per_stage[stage.name] = {}
+            self.release_datasets(stage.outputs)
+        else:
+            self.dict_outputs_per_stage[stage.name] = dict_outputs
+
+    def merge_outputs(self) -> Dict[str, Any]:
+        """
+        Merges the outputs of the stages following the topological order, whatever the order in which the stages
+        finished.
+        """
+        dict_datasets = {}
+        for stage in self.list_stages_selected:
+            dict_datasets.update(self.dict_outputs_per_stage.get(stage.name, {}))
+        return dict_datasets
+
+    def on_stage_failed(self, stage: Stage, error: BaseException):
+        print("ERROR : stage %s failed : %r" % (stage.name, error))
+        if self.journal is not None:
+            self.journal.record_stage_failed(stage.name, error)
+
+    def run_sequential(self, list_stages_to_run: List[Stage]):
+        for stage in list_stages_to_run:
+            try:
+                results = run_stage(stage.name, stage.func, stage.outputs, self.get_inputs(stage),
+                                    self.instrumented_packages, self.memory_tracker, stage.inputs, stage.files)
+            except Exception as error:
+                self.on_stage_failed(stage, error)
+                raise
+            self.on_stage_done(stage, *results)
+            self.on_stage_consumed_inputs(stage)
+
+    def run_parallel(self, list_stages_to_run: List[Stage]):
+        set_to_run = set(stage.name for stage in list_stages_to_run)
+        list_pending = list(list_stages_to_run)
+        dict_running = {}
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                while len(list_pending) > 0 or len(dict_running) > 0:
+                    # submit every stage whose upstream stages are all done or skipped
+                    list_ready = [stage for stage in list_pending
+                                  if all(name not in set_to_run or name in self.dict_outputs_per_stage
+                                         for name in self.get_upstream_stages(stage))]
+                    for stage in list_ready:
+                        future = executor.submit(run_stage, stage.name, stage.func, stage.outputs,
+                                                 self.get_shared_inputs(stage), self.instrumented_packages,
+                                                 self.memory_tracker, stage.inputs, stage.files)
+                        dict_running[future] = stage
+                        list_pending.remove(stage)
+
+                    # wait for at least one stage to finish
+                    set_done, _ = wait(dict_running.keys(), return_when=FIRST_COMPLETED)
+                    for future in set_done:
+                        stage = dict_running.pop(future)
+                        try:
+                            results = future.result()
+                        except Exception as error:
+                            self.on_stage_failed(stage, error)
+                            raise
+                        self.on_stage_done(stage, *results)
+                        self.on_stage_consumed_inputs(stage)
+            except BaseException:
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+
+    def run(self, dry_run: bool = False, force: bool = False, resume: bool = False) -> Dict[str, Any]:
+        """
+        Runs the selected stages of the pipeline, after printing the execution plan.
+        :param dry_run: (bool) True to only print the execution plan.
+        :param force: (bool) True to run the stages even if they are up to date. Their fingerprints are recorded.
+        :param resume: (bool) True to resume the last run recorded in the journal, from its first incomplete stage.
+        :return: (dict) the datasets produced by the stages that were run. The outputs of the skipped stages are
+            only loaded from the fingerprint store when a stage that was run needs them. The events traced while the
+            stages ran are kept in list_events, their memory reports in dict_memory_reports. In low-memory mode,
+            the datasets are released once consumed and nothing is returned.
+        """
+        self.dict_datasets = {}
+        self.dict_outputs_per_stage = {}
+        self.list_events = []
+        self.dict_memory_reports = {}
+        dict_completed = None
+        if resume:
+            if self.journal is None or self.fingerprint_store is None:
+                raise ValueError("ERROR : a run can only be resumed with a journal and a fingerprint store")
+            dict_completed = self.journal.get_completed_stages()
+        list_stages_to_run = self.get_stages_to_run(force, dict_completed)
+        self.print_plan(list_stages_to_run)
+        if dry_run:
+            return {}
+        if self.journal is not None:
+            list_stage_names = [stage.name for stage in self.list_stages_selected]
+            if resume:
+                self.journal.resume(list_stage_names)
+            else:
+                self.journal.start(list_stage_names, {"targets": self.targets, "force": force})
+            for stage in self.list_stages_selected:
+                if stage not in list_stages_to_run:
+                    self.journal.record_stage_done(stage.name, self.dict_fingerprints.get(stage.name), None)
+        self.dict_consumers = {}
+        for stage in list_stages_to_run:
+            for name in stage.inputs:
+                self.dict_consumers.setdefault(name, set()).add(stage.name)
+        try:
+            if self.max_workers == 1:
+                self.run_sequential(list_stages_to_run)
+            else:
+                self.run_parallel(list_stages_to_run)
+        finally:
+            if self.spill_store is not None:
+                self.spill_store.cleanup()
+            if self.shared_store is not None:
+                self.shared_store.cleanup()
+        if self.journal is not None:
+            self.journal.finish("done")
+        return self.merge_outputs()
@@ -0,0 +1,153 @@
+import json
+import mmap
+import os
+import shutil
+import tempfile
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from pipeline.memory import MB
+
+try:
+    import pyarrow as pa
+except ImportError:  # the datasets are then pickled into the workers
+    pa = None
+
+SHARED_MEMORY_DIR = "/dev/shm"  # tmpfs on Linux : the files published there stay in memory
+INDEX_METADATA_KEY = b"sdp_index"
+
+
+class SharedDataset:
+    """
+    Placeholder of a dataset published in shared memory by the SharedMemoryStore.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+
+    def __repr__(self):
+        return "SharedDataset(%s)" % self.filepath
+
+
+class SharedMemoryStore:
+    """
+    Publishes the dataframes sent to the worker processes once, as Arrow IPC files in shared memory, instead of
+    pickling them into every worker for every stage consuming them (e.g. df_country, read by most stages).
+    The workers map the files : the numeric columns without missing values are read without any copy, from a
+    copy-on-write mapping so that the stages can still modify them, and the other columns are converted by Arrow.
+    """
+
+    def __init__(self, directory: Optional[str] = None, min_size: int = MB):
+        """
+        :param directory: (str) directory of the published files, removed by cleanup(). None for a new directory in
+            /dev/shm (or in the temporary directory when /dev/shm does not exist), created by the first publication.
+        :param min_size: (int) size in bytes under which a dataframe is pickled into the workers as before.
+        """
+        self.directory = directory
+        self.min_size = min_size
+        self.dict_published = {}
+
+    @staticmethod
+    def is_available() -> bool:
+        return pa is not None
+
+    def publish(self, name: str, dataset: Any) -> Any:
+        """
+        Publishes a dataset in shared memory, once per name.
+        :return: the SharedDataset to send to the workers, or the dataset itself when it is not a dataframe, is too
+            small or cannot be stored by Arrow (columns of mixed types, names which are not strings).
+        """
+        if name in self.dict_published:
+            return self.dict_published[name]
+        if pa is None or not isinstance(dataset, pd.DataFrame) or len(dataset) == 0 \
+                or dataset.memory_usage(index=True).sum() < self.min_size:
+            return dataset
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(
+                prefix="sdp_shared_", dir=SHARED_MEMORY_DIR if os.path.isdir(SHARED_MEMORY_DIR) else None)
+        os.makedirs(self.directory, exist_ok=True)
+        filepath = os.path.join(self.directory, name + ".arrow")
+        try:
+            self.write(filepath, dataset)
+        except (ValueError, TypeError, NotImplementedError, OSError, pa.ArrowException) as error:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            print("-- dataset %s not shared with the workers : %r" % (name, error))
+            return dataset
+        self.dict_published[name] = SharedDataset(filepath)
+        return self.dict_published[name]
+
+    @staticmethod
+    def write(filepath: str, df: pd.DataFrame):
+        """
+        Writes a dataframe as an uncompressed Arrow IPC file. The index is written as columns, or as metadata when
+        it is a range.
+        """
+        if len(set(df.columns)) < len(df.columns) or not all(isinstance(column, str) for column in df.columns):
+            raise ValueError("ERROR : the columns must be unique strings")
+        if isinstance(df.index, pd.RangeIndex):
+            dict_index = {"range": [df.index.start, df.index.stop, df.index.step], "name": df.index.name}
+        else:
+            list_index_columns = ["__index_level_%s__" % level for level in range(df.index.nlevels)]
+            dict_index = {"columns": list_index_columns, "names": list(df.index.names)}
+            df = df.reset_index(names=list_index_columns)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({INDEX_METADATA_KEY: json.dumps(dict_index)})
+        with pa.OSFile(filepath, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    @staticmethod
+    def load(dataset: Any) -> Any:
+        """
+        Returns the dataset, mapped from shared memory if it was published.
+        """
+        if not isinstance(dataset, SharedDataset):
+            return dataset
+        file_descriptor = os.open(dataset.filepath, os.O_RDONLY)
+        try:
+            buffer = mmap.mmap(file_descriptor, 0, access=mmap.ACCESS_COPY)
+        finally:
+            os.close(file_descriptor)
+        table = pa.ipc.open_file(pa.py_buffer(buffer)).read_all()
+        base_address = np.frombuffer(buffer, dtype=np.uint8).ctypes.data
+        dict_columns = {name: SharedMemoryStore.get_column(buffer, base_address, column)
+                        for name, column in zip(table.column_names, table.columns)}
+        df = pd.DataFrame(dict_columns, copy=False)
+
+        dict_index = json.loads(table.schema.metadata[INDEX_METADATA_KEY])
+        if "range" in dict_index:
+            df.index = pd.RangeIndex(*dict_index["range"], name=dict_index["name"])
+        else:
+            df = df.set_index(dict_index["columns"])
+            df.index.names = dict_index["names"]
+        return df
+
+    @staticmethod
+    def get_column(buffer: mmap.mmap, base_address: int, column: "pa.ChunkedArray") -> Any:
+        """
+        Returns a column as a numpy array over the mapped file when Arrow stores it like numpy (integers and floats
+        without missing values), converted by Arrow otherwise.
+        """
+        if column.num_chunks == 1 and len(column) > 0 and column.null_count == 0 \
+                and (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)):
+            chunk = column.chunk(0)
+            dtype = np.dtype(chunk.type.to_pandas_dtype())
+            offset = chunk.buffers()[1].address - base_address + chunk.offset * dtype.itemsize
+            return np.frombuffer(buffer, dtype=dtype, count=len(chunk), offset=offset)
+        return column.to_pandas()
+
+    def release(self, name: str):
+        """
+        Removes a published dataset once the stages consuming it are done. The workers still mapping it keep it.
+        """
+        dataset = self.dict_published.pop(name, None)
+        if dataset is not None and os.path.exists(dataset.filepath):
+            os.remove(dataset.filepath)
+
+    def cleanup(self):
+        self.dict_published = {}
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,61 @@
+import os
+import shutil
+from typing import Any, Dict
+
+from pipeline.cache import ArtifactCache
+from pipeline.memory import MB, get_memory_usage
+
+
+class SpilledDataset:
+    """
+    Placeholder of a dataset written on disk by the SpillStore.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+
+    def __repr__(self):
+        return "SpilledDataset(%s)" % self.filepath
+
+
+class SpillStore:
+    """
+    Keeps the dataframes held between the stages below a memory budget : when their total size exceeds the budget, the
+    largest ones are written on disk and replaced by a SpilledDataset, then read again when a stage needs them.
+    """
+
+    def __init__(self, memory_budget: int, directory: str):
+        """
+        :param memory_budget: (int) maximum size of the dataframes held in memory between the stages, in bytes.
+        :param directory: (str) directory where the dataframes are spilled, removed by cleanup().
+        """
+        self.memory_budget = memory_budget
+        self.directory = directory
+
+    def spill(self, dict_datasets: Dict[str, Any]):
+        """
+        Spills the largest dataframes until the size of the dataframes left in memory is below the budget.
+        :param dict_datasets: (dict) datasets per name, updated in place.
+        """
+        dict_sizes = {name: get_memory_usage(dataset) for name, dataset in dict_datasets.items()}
+        total_size = sum(dict_sizes.values())
+        for name in sorted(dict_sizes, key=dict_sizes.get, reverse=True):
+            if total_size <= self.memory_budget or dict_sizes[name] == 0:
+                break
+            os.makedirs(self.directory, exist_ok=True)
+            filename = ArtifactCache.write_artifact(self.directory, name, dict_datasets[name])
+            dict_datasets[name] = SpilledDataset(os.path.join(self.directory, filename))
+            total_size -= dict_sizes[name]
+            print("-- dataset %s spilled to disk (%.1f MB)" % (name, dict_sizes[name] / MB))
+
+    @staticmethod
+    def load(dataset: Any) -> Any:
+        """
+        Returns the dataset, read from disk if it was spilled.
+        """
+        if isinstance(dataset, SpilledDataset):
+            return ArtifactCache.read_artifact(dataset.filepath)
+        return dataset
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
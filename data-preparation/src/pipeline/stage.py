@@ -0,0 +1,54 @@
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Stage:
+    """
+    A step of the transformation pipeline. A stage declares the datasets it consumes (inputs) and the datasets it
+    produces (outputs) so that the runner can find out which stages are independent from each other.
+    """
+
+    def __init__(self, name: str, func: Callable, inputs: Optional[List[str]] = None,
+                 outputs: Optional[List[str]] = None, files: Optional[List[str]] = None,
+                 sources: Optional[List[Any]] = None, params: Optional[Dict[str, Any]] = None,
+                 exports: Optional[List[str]] = None, optional: bool = False):
+        """
+        :param name: (str) unique name of the stage.
+        :param func: (callable) called with the input datasets as positional arguments, in the order of `inputs`.
+            It returns the single output dataset, or a tuple of datasets in the order of `outputs`.
+        :param inputs: (list) names of the datasets consumed by the stage.
+        :param outputs: (list) names of the datasets produced by the stage.
+        :param files: (list) paths of the raw files read by the stage, or their handles in the dataset registry.
+        :param sources: (list) modules, classes or functions doing the processing, whose source code changes
+            invalidate the stage.
+        :param params: (dict) parameters of the stage which invalidate it when they change.
+        :param exports: (list) names of the datasets written on disk by the stage, which can be requested as targets.
+        :param optional: (bool) True if the stage is only run when it is requested as a target, or needed by one.
+        """
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs) if inputs is not None else []
+        self.outputs = list(outputs) if outputs is not None else []
+        self.files = [getattr(file, "filepath", file) for file in files] if files is not None else []
+        self.sources = list(sources) if sources is not None else []
+        self.params = dict(params) if params is not None else {}
+        self.exports = list(exports) if exports is not None else []
+        self.optional = optional
+
+    def __repr__(self):
+        return "Stage(%s, inputs=%s, outputs=%s)" % (self.name, self.inputs, self.outputs)
+
+    def run(self, *args) -> Dict[str, Any]:
+        """
+        Runs the stage on the input datasets.
+        :param args: the input datasets, in the order of `inputs`.
+        :return: (dict) output datasets per name.
+        """
+        results = self.func(*args)
+        if len(self.outputs) == 0:
+            return {}
+        if len(self.outputs) == 1:
+            return {self.outputs[0]: results}
+        if not isinstance(results, (tuple, list)) or len(results) != len(self.outputs):
+            raise ValueError("ERROR : stage %s should return %s datasets %s" % (self.name, len(self.outputs),
+                                                                                self.outputs))
+        return dict(zip(self.outputs, results))
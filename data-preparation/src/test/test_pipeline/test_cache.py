@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from pipeline import ArtifactCache
+
+
+class TestArtifactCache(unittest.TestCase):
+
+    def test_dataframes_stored_in_parquet(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # given a cleaned dataframe and another object
+            df_clean = pd.DataFrame({"country": ["France", "Spain"], "year": ["2000", "2001"], "value": [1.5, 2.5]})
+
+            # when storing them and reloading them from a new cache instance
+            ArtifactCache(directory).save("fingerprint", {"df_clean": df_clean, "count": 2})
+            cache = ArtifactCache(directory)
+            dict_artifacts = cache.load("fingerprint", ["df_clean", "count"])
+
+            # expect the dataframe stored in Parquet and both reloaded unchanged
+            self.assertTrue(os.path.exists(os.path.join(directory, "fingerprint", "df_clean.parquet")))
+            pd.testing.assert_frame_equal(dict_artifacts["df_clean"], df_clean)
+            self.assertEqual(dict_artifacts["count"], 2)
+            self.assertFalse(cache.contains("fingerprint", ["df_other"]))
+
+    def test_least_recently_used_entries_evicted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # given a cache holding two entries at most
+            df = pd.DataFrame({"value": range(1000)})
+            ArtifactCache(directory).save("a", {"df": df})
+            entry_size = ArtifactCache(directory).dict_entries["a"]["size"]
+            cache = ArtifactCache(directory, max_size=2 * entry_size)
+            cache.save("b", {"df": df})
+
+            # when "a" is used again before a third entry is stored
+            cache.load("a", ["df"])
+            cache.save("c", {"df": df})
+
+            # expect "b" evicted
+            self.assertTrue(cache.contains("a", ["df"]))
+            self.assertFalse(cache.contains("b", ["df"]))
+            self.assertTrue(cache.contains("c", ["df"]))
+            self.assertFalse(os.path.exists(os.path.join(directory, "b")))
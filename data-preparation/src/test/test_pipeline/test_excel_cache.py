@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from pipeline import DatasetRegistry, ExcelCache
+
+
+class TestExcelCache(unittest.TestCase):
+
+    def test_sheets_parsed_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # given a workbook with a clean sheet and a sheet mixing numbers and text
+            filepath = os.path.join(directory, "workbook.xlsx")
+            with pd.ExcelWriter(filepath) as writer:
+                pd.DataFrame({"country": ["France", "Spain"], "value": [1.5, 2.5]}).to_excel(
+                    writer, sheet_name="clean", index=False)
+                pd.DataFrame({"country": ["France", "Spain"], 1990: [1, "na"]}).to_excel(
+                    writer, sheet_name="mixed", index=False)
+            excel_cache = ExcelCache(os.path.join(directory, "cache"))
+
+            # when reading the sheets twice
+            dict_first = excel_cache.read(filepath, sheet_name=["clean", "mixed"])
+            with mock.patch("pandas.read_excel", side_effect=AssertionError("workbook parsed again")):
+                dict_second = excel_cache.read(filepath, sheet_name=["clean", "mixed"])
+
+            # expect the second read served from the cache, unchanged
+            for sheet_name in ["clean", "mixed"]:
+                pd.testing.assert_frame_equal(dict_first[sheet_name], dict_second[sheet_name])
+            self.assertEqual(sorted(os.path.splitext(entry)[1] for entry in excel_cache.get_entries()),
+                             [".parquet", ".pkl"])
+
+            # when the workbook changes, expect it parsed again
+            pd.DataFrame({"country": ["Italy"], "value": [3.0]}).to_excel(filepath, sheet_name="clean", index=False)
+            self.assertEqual(excel_cache.read(filepath, sheet_name="clean")["country"].tolist(), ["Italy"])
+            self.assertEqual(len(excel_cache.get_entries()), 3)
+
+    def test_least_recently_read_sheets_evicted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # given a cache too small for two sheets
+            filepath = os.path.join(directory, "workbook.xlsx")
+            with pd.ExcelWriter(filepath) as writer:
+                for sheet_name in ["first", "second"]:
+                    pd.DataFrame({"value": range(100)}).to_excel(writer, sheet_name=sheet_name, index=False)
+            excel_cache = ExcelCache(os.path.join(directory, "cache"), max_size=1)
+
+            # when reading both sheets, expect only the last one kept
+            excel_cache.read(filepath, sheet_name="first")
+            os.utime(excel_cache.get_entries()[0], (0, 0))
+            excel_cache.read(filepath, sheet_name="second")
+            self.assertEqual([os.path.basename(entry) for entry in excel_cache.get_entries()],
+                             [excel_cache.get_sheet_key("second", {}) + ".parquet"])
+
+    def test_workbook_opened_once_for_several_sheets(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # given an Excel dataset with two sheets
+            filepath = os.path.join(directory, "workbook.xlsx")
+            with pd.ExcelWriter(filepath) as writer:
+                pd.DataFrame({"value": [1]}).to_excel(writer, sheet_name="territorial", index=False)
+                pd.DataFrame({"value": [2]}).to_excel(writer, sheet_name="consumption", index=False)
+            registry = DatasetRegistry({"raw": directory})
+            registry.register("gcb", "raw", "workbook.xlsx")
+
+            # when reading both sheets in one call
+            with mock.patch("pandas.ExcelFile", wraps=pd.ExcelFile) as excel_file:
+                df_territorial, df_consumption = registry["gcb"].read_sheets("territorial", "consumption")
+
+            # expect the workbook opened once, and the sheets in the order requested
+            self.assertEqual(excel_file.call_count, 1)
+            self.assertEqual(df_territorial["value"].tolist(), [1])
+            self.assertEqual(df_consumption["value"].tolist(), [2])
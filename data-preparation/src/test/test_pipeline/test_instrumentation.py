@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import tracemalloc
+import unittest
+from functools import partial
+import pandas as pd
+from pipeline import Stage, PipelineRunner, MemoryTracker, TRACER, write_reports
+from transformation.footprint_vs_territorial import FootprintVsTerrotorialProcessor
+
+
+def read_and_write(filepath_in, filepath_out):
+    df = pd.read_csv(filepath_in)
+    df.to_csv(filepath_out, index=False)
+    return df
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def tearDown(self):
+        TRACER.uninstall()
+
+    def test_reads_writes_and_processors_traced(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # given a stage reading and writing a csv file, with the transformation processors instrumented
+            filepath_in, filepath_out = os.path.join(directory, "in.csv"), os.path.join(directory, "out.csv")
+            pd.DataFrame({"value": [1, 2, 3]}).to_csv(filepath_in, index=False)
+            runner = PipelineRunner([Stage("copy", partial(read_and_write, filepath_in, filepath_out),
+                                           outputs=["df"])], max_workers=1, instrumented_packages=["transformation"])
+
+            # when running it and writing the reports
+            runner.run()
+            filepath_summary, filepath_trace = write_reports(runner.list_events, directory, prefix="run")
+            with open(filepath_summary) as file:
+                dict_summary = json.load(file)
+            with open(filepath_trace) as file:
+                dict_trace = json.load(file)
+
+            # expect the rows and bytes of the stage and of each call, and the processors patched
+            self.assertEqual(dict_summary["stages"]["copy"]["rows_out"], 3)
+            self.assertEqual(dict_summary["stages"]["copy"]["bytes_read"], os.path.getsize(filepath_in))
+            self.assertEqual(dict_summary["stages"]["copy"]["bytes_written"], os.path.getsize(filepath_out))
+            self.assertEqual(dict_summary["calls"]["read_csv in.csv"]["rows_out"], 3)
+            self.assertEqual(dict_summary["calls"]["to_csv out.csv"]["rows_in"], 3)
+            self.assertEqual(len(dict_trace["traceEvents"]), 3)
+            self.assertTrue(hasattr(FootprintVsTerrotorialProcessor.run, "__wrapped__"))
+
+        # when uninstalling the tracer, expect pandas and the processors restored
+        TRACER.uninstall()
+        self.assertFalse(hasattr(pd.read_csv, "__wrapped__"))
+        self.assertNotIn("to_csv", vars(pd.DataFrame))
+        self.assertFalse(hasattr(FootprintVsTerrotorialProcessor.run, "__wrapped__"))
+
+    def test_memory_blowup_flagged(self):
+        # given a stage whose intermediate frame is much larger than its input
+        def explode(df):
+            df_exploded = pd.concat([df] * 100)
+            return df_exploded["value"].sum()
+
+        list_stages = [Stage("load", partial(pd.DataFrame, {"value": list(range(10000))}), outputs=["df"]),
+                       Stage("explode", explode, inputs=["df"], outputs=["total"])]
+        runner = PipelineRunner(list_stages, max_workers=1, memory_tracker=MemoryTracker(blowup_factor=10))
+
+        # when tracking the memory of the stages
+        runner.run()
+
+        # expect the exploding stage flagged, with the size of its input
+        dict_memory = runner.dict_memory_reports["explode"]
+        self.assertTrue(dict_memory["flagged"])
+        self.assertGreater(dict_memory["blowup"], 10)
+        self.assertEqual(dict_memory["inputs_mb"], {"df": round(10000 * 8 / 1024 ** 2, 1)})
+        self.assertGreater(dict_memory["peak_rss_mb"], 0)
+        self.assertGreater(len(dict_memory["top_allocators"]), 0)
+
+    def test_memory_tracing_stopped_when_stage_fails(self):
+        # given a stage which raises while its memory is tracked
+        def fail(df):
+            raise ValueError("failed stage")
+
+        list_stages = [Stage("load", partial(pd.DataFrame, {"value": [1, 2, 3]}), outputs=["df"]),
+                       Stage("fail", fail, inputs=["df"], outputs=["total"])]
+        runner = PipelineRunner(list_stages, max_workers=1, memory_tracker=MemoryTracker())
+
+        # when running the stages
+        with self.assertRaises(ValueError):
+            runner.run()
+
+        # expect the allocations no longer traced
+        self.assertFalse(tracemalloc.is_tracing())
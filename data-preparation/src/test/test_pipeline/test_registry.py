@@ -0,0 +1,42 @@
+import os
+import pickle
+import tempfile
+import unittest
+import pandas as pd
+from pipeline import DatasetRegistry, Stage
+
+
+class TestDatasetRegistry(unittest.TestCase):
+
+    def test_read_write_and_shared_datasets(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # given a registry with a shared tab-separated dataset and a resulting dataset
+            registry = DatasetRegistry({"raw": os.path.join(directory, "raw"), "results": directory})
+            os.makedirs(os.path.join(directory, "raw"))
+            pd.DataFrame({"country": ["France", "Spain"], "value": [1, 2]}).to_csv(
+                os.path.join(directory, "raw", "in.txt"), sep="\t", index=False)
+            handle = registry.register("in", "raw", "in.txt", schema={"value": "float64"}, shared=True, sep="\t")
+            registry.register("out", "results", "sub/out.csv")
+
+            # when reading the dataset twice and writing it
+            df_first = handle.read()
+            df_first["value"] = 0
+            df_second = registry["in"].read()
+            registry["out"].write(df_second)
+
+            # expect the schema applied, each read getting its own copy, and the dataset written without its index
+            self.assertEqual(df_second["value"].tolist(), [1.0, 2.0])
+            self.assertEqual(len(handle.dict_cache), 1)
+            self.assertEqual(pd.read_csv(os.path.join(directory, "sub", "out.csv")).columns.tolist(),
+                             ["country", "value"])
+            self.assertEqual(len(pickle.loads(pickle.dumps(handle)).dict_cache), 0)
+            self.assertEqual(Stage("stage", list, files=[handle]).files, [handle.filepath])
+
+    def test_unknown_and_duplicated_datasets(self):
+        registry = DatasetRegistry({"raw": "/data/raw"})
+        registry.register("in", "raw", "in.xlsx")
+        self.assertEqual(registry["in"].file_format, "excel")
+        with self.assertRaises(KeyError):
+            registry["missing"]
+        with self.assertRaises(ValueError):
+            registry.register("in", "raw", "in.csv")
@@ -0,0 +1,257 @@
+import os
+import tempfile
+import unittest
+from functools import partial
+import pandas as pd
+from pipeline import Stage, PipelineRunner, FingerprintStore, RunJournal, SpillStore, SharedMemoryStore, DatasetRegistry
+
+
+def load_numbers():
+    return [1, 2, 3]
+
+
+def double(numbers):
+    return [2 * number for number in numbers]
+
+
+def square(numbers):
+    return [number ** 2 for number in numbers]
+
+
+def add(numbers_doubled, numbers_squared):
+    return [a + b for a, b in zip(numbers_doubled, numbers_squared)], len(numbers_doubled)
+
+
+def read_number(filepath, list_calls):
+    list_calls.append(filepath)
+    with open(filepath) as file:
+        return int(file.read())
+
+
+def increment(number, list_calls):
+    list_calls.append(number)
+    return number + 1
+
+
+def load_dataframe():
+    return pd.DataFrame({"value": range(1000)})
+
+
+def double_dataframe(df):
+    return df * 2
+
+
+def increment_dataframe(df):
+    df.loc[df.index[:10], "value"] += 1
+    return df
+
+
+def sum_dataframes(df, df_doubled, list_results):
+    list_results.append(int(df["value"].sum() + df_doubled["value"].sum()))
+
+
+class TestPipelineRunner(unittest.TestCase):
+
+    def get_stages(self):
+        return [
+            Stage("sum", add, inputs=["doubled", "squared"], outputs=["total", "count"]),
+            Stage("load", load_numbers, outputs=["numbers"]),
+            Stage("double", double, inputs=["numbers"], outputs=["doubled"]),
+            Stage("square", square, inputs=["numbers"], outputs=["squared"]),
+        ]
+
+    def test_stages_sorted_by_dependencies(self):
+        # given stages declared in any order
+        runner = PipelineRunner(self.get_stages())
+
+        # when sorting the stages
+        list_names = [stage.name for stage in runner.list_stages_sorted]
+
+        # expect the declaration order kept among independent stages
+        self.assertEqual(list_names, ["load", "double", "square", "sum"])
+
+    def test_parallel_run_equals_sequential_run(self):
+        # given the same stages
+        dict_sequential = PipelineRunner(self.get_stages(), max_workers=1).run()
+
+        # when running them in a process pool
+        dict_parallel = PipelineRunner(self.get_stages(), max_workers=2).run()
+
+        # expect the same datasets, merged in the same order
+        self.assertEqual(dict_sequential, dict_parallel)
+        self.assertEqual(list(dict_parallel.keys()), ["numbers", "doubled", "squared", "total", "count"])
+        self.assertEqual(dict_parallel["total"], [3, 8, 15])
+
+    def test_invalid_dags(self):
+        # dataset produced twice
+        with self.assertRaises(ValueError):
+            PipelineRunner([Stage("a", load_numbers, outputs=["numbers"]), Stage("b", load_numbers, outputs=["numbers"])])
+
+        # input produced by no stage
+        with self.assertRaises(ValueError):
+            PipelineRunner([Stage("double", double, inputs=["numbers"], outputs=["doubled"])])
+
+        # cycle between stages
+        with self.assertRaises(ValueError):
+            PipelineRunner([Stage("double", double, inputs=["squared"], outputs=["doubled"]),
+                            Stage("square", square, inputs=["doubled"], outputs=["squared"])])
+
+    def test_incremental_run_skips_unchanged_stages(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # given two raw files and a fingerprint store
+            filepath_a, filepath_b = os.path.join(directory, "a.txt"), os.path.join(directory, "b.txt")
+            for filepath, content in [(filepath_a, "1"), (filepath_b, "10")]:
+                with open(filepath, "w") as file:
+                    file.write(content)
+            list_calls = []
+
+            def get_runner():
+                return PipelineRunner([
+                    Stage("read_a", partial(read_number, filepath_a, list_calls), outputs=["a"], files=[filepath_a]),
+                    Stage("read_b", partial(read_number, filepath_b, list_calls), outputs=["b"], files=[filepath_b]),
+                    Stage("increment_a", partial(increment, list_calls=list_calls), inputs=["a"], outputs=["a_plus_one"]),
+                    Stage("increment_b", partial(increment, list_calls=list_calls), inputs=["b"], outputs=["b_plus_one"]),
+                ], max_workers=1, fingerprint_store=FingerprintStore(os.path.join(directory, "cache")))
+
+            # when running twice without any change
+            get_runner().run()
+            list_calls.clear()
+            dict_datasets = get_runner().run()
+
+            # expect no stage run
+            self.assertEqual(list_calls, [])
+            self.assertEqual(dict_datasets, {})
+
+            # when a single raw file changes
+            with open(filepath_b, "w") as file:
+                file.write("20")
+            dict_datasets = get_runner().run()
+
+            # expect only the stages depending on it to be run again
+            self.assertEqual(list_calls, [filepath_b, 20])
+            self.assertEqual(dict_datasets, {"b": 20, "b_plus_one": 21})
+
+            # when only the downstream stage changes
+            list_calls.clear()
+            runner = get_runner()
+            runner.stages[3].params = {"step": 2}
+            dict_datasets = runner.run()
+
+            # expect its input reused from the fingerprint store
+            self.assertEqual(list_calls, [20])
+            self.assertEqual(dict_datasets, {"b": 20, "b_plus_one": 21})
+
+    def test_export_stage_run_again_when_exported_file_deleted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # given a stage only exporting a dataset of the registry
+            registry = DatasetRegistry({"results": directory})
+            handle = registry.register("NUMBERS_prod", "results", "numbers.csv")
+            list_calls = []
+
+            def export_numbers():
+                list_calls.append("export")
+                handle.write(pd.DataFrame({"number": load_numbers()}))
+
+            def get_runner():
+                return PipelineRunner([Stage("export", export_numbers, exports=["NUMBERS_prod"])], max_workers=1,
+                                      fingerprint_store=FingerprintStore(os.path.join(directory, "cache"),
+                                                                         registry=registry))
+
+            # when running it twice, then once its exported file is deleted
+            get_runner().run()
+            get_runner().run()
+            os.remove(handle.filepath)
+            get_runner().run()
+
+            # expect it run again only to export the deleted file
+            self.assertEqual(list_calls, ["export", "export"])
+            self.assertTrue(handle.exists())
+
+    def test_targets_select_upstream_stages(self):
+        # given stages with exported datasets and an optional stage
+        list_stages = self.get_stages()
+        list_stages[2].exports = ["DOUBLED_prod"]
+        list_stages.append(Stage("triple", double, inputs=["doubled"], outputs=["tripled"], optional=True))
+
+        # when requesting a single exported dataset, then no target
+        runner_target = PipelineRunner(list_stages, max_workers=1, targets=["doubled_prod"])
+        runner_default = PipelineRunner(list_stages, max_workers=1)
+
+        # expect only its upstream stages selected, and the optional stage left out by default
+        self.assertEqual([stage.name for stage in runner_target.list_stages_selected], ["load", "double"])
+        self.assertEqual([stage.name for stage in runner_default.list_stages_selected],
+                         ["load", "double", "square", "sum"])
+        self.assertEqual(runner_target.run(), {"numbers": [1, 2, 3], "doubled": [2, 4, 6]})
+        self.assertEqual(runner_target.run(dry_run=True), {})
+        with self.assertRaises(ValueError):
+            PipelineRunner(list_stages, targets=["UNKNOWN_prod"])
+
+    def test_low_memory_mode_releases_and_spills_datasets(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # given a spill store whose budget holds no dataframe
+            list_results = []
+            runner = PipelineRunner([
+                Stage("load", load_dataframe, outputs=["df"]),
+                Stage("double", double_dataframe, inputs=["df"], outputs=["df_doubled"]),
+                Stage("sum", partial(sum_dataframes, list_results=list_results), inputs=["df", "df_doubled"]),
+            ], max_workers=1, spill_store=SpillStore(0, os.path.join(directory, "spill")))
+
+            # when running the stages
+            dict_datasets = runner.run()
+
+            # expect the spilled dataframes read again by the stages, then released and removed from the disk
+            self.assertEqual(list_results, [3 * sum(range(1000))])
+            self.assertEqual(dict_datasets, {})
+            self.assertEqual(runner.dict_datasets, {})
+            self.assertFalse(os.path.exists(os.path.join(directory, "spill")))
+
+    @unittest.skipUnless(SharedMemoryStore.is_available(), "pyarrow is not installed")
+    def test_parallel_run_with_shared_datasets(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # given a store sharing every dataframe with the workers, and a stage modifying its input
+            shared_store = SharedMemoryStore(os.path.join(directory, "shared"), min_size=0)
+            runner = PipelineRunner([
+                Stage("load", load_dataframe, outputs=["df"]),
+                Stage("double", double_dataframe, inputs=["df"], outputs=["df_doubled"]),
+                Stage("increment", increment_dataframe, inputs=["df"], outputs=["df_incremented"]),
+            ], max_workers=2, shared_store=shared_store)
+
+            # when running the stages in a process pool
+            dict_datasets = runner.run()
+
+            # expect the dataframes mapped by the workers, the shared one unchanged, then removed from the memory
+            pd.testing.assert_frame_equal(dict_datasets["df"], load_dataframe())
+            pd.testing.assert_frame_equal(dict_datasets["df_doubled"], load_dataframe() * 2)
+            self.assertEqual(dict_datasets["df_incremented"]["value"].sum(), sum(range(1000)) + 10)
+            self.assertFalse(os.path.exists(os.path.join(directory, "shared")))
+
+    def test_failed_run_resumed_from_first_incomplete_stage(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # given a forced run whose last stage fails
+            filepath_a = os.path.join(directory, "a.txt")
+            with open(filepath_a, "w") as file:
+                file.write("1")
+            list_calls = []
+
+            def get_runner(func_last_stage):
+                return PipelineRunner([
+                    Stage("read_a", partial(read_number, filepath_a, list_calls), outputs=["a"], files=[filepath_a]),
+                    Stage("increment_a", partial(increment, list_calls=list_calls), inputs=["a"], outputs=["a_plus_one"]),
+                    Stage("last", func_last_stage, inputs=["a_plus_one"], outputs=["a_plus_two"]),
+                ], max_workers=1, fingerprint_store=FingerprintStore(os.path.join(directory, "cache")),
+                    journal=RunJournal(os.path.join(directory, "cache", "journal.json")))
+
+            with self.assertRaises(ZeroDivisionError):
+                get_runner(lambda number: number / 0).run(force=True)
+            journal = RunJournal(os.path.join(directory, "cache", "journal.json"))
+            self.assertTrue(journal.can_resume())
+            self.assertEqual(sorted(journal.get_completed_stages()), ["increment_a", "read_a"])
+
+            # when resuming it once the last stage is fixed
+            list_calls.clear()
+            dict_datasets = get_runner(partial(increment, list_calls=list_calls)).run(force=True, resume=True)
+
+            # expect only the failed stage run again, and the journal done
+            self.assertEqual(list_calls, [2])
+            self.assertEqual(dict_datasets, {"a_plus_one": 2, "a_plus_two": 3})
+            self.assertFalse(RunJournal(os.path.join(directory, "cache", "journal.json")).can_resume())
@@ -0,0 +1,265 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from sdp_data_preparation.countries_and_zones import StatisticsPerCountriesAndZonesProcessor, ZoneIndex, \
+    aggregate_grouping_sets, aggregate_per_zones, check_zone_hierarchy, get_zone_hierarchy, get_zone_index_of
+from sdp_data_preparation.countries_and_zones import zone_index
+from transformation.demographic.countries import StatisticsPerCountriesAndZonesJoiner
+from utils import get_project_root_path
+
+
+class TestStatisticsPerCountriesAndZonesJoiner(unittest.TestCase):
+
+    def test_sparse_aggregation_equals_merge(self):
+        """
+        Test that the zones aggregated with the sparse membership matrix are the zones of the merge and groupby.
+        :return:
+        """
+        # given countries in overlapping zones, and statistics with duplicated rows, missing values and dimensions,
+        # and a country out of the zones, with string or integer years, and Japan missing or not
+        df_country = pd.DataFrame([["zone", "Europe", "France"], ["zone", "Europe", "Germany"],
+                                   ["zone", "Africa", "Chad"], ["zone", "World", "France"], ["zone", "World", "Chad"],
+                                   ["group", "OECD", "France"], ["group", "OECD", "Japan"]],
+                                  columns=["group_type", "group_name", "country"])
+        df_statistics = pd.DataFrame([["France", "2000", "CO2", 1.0], ["France", "2000", "CO2", 2.0],
+                                      ["France", "2001", "CH4", np.nan], ["Germany", "2000", "CO2", 4.0],
+                                      ["Chad", "2001", None, 8.0], ["Chad", "2001", "CO2", 0.0],
+                                      ["Atlantis", "2000", "CO2", 16.0]],
+                                     columns=["country", "year", "gas", "ghg"])
+        df_japan = pd.DataFrame([["Japan", "2000", "CO2", 32.0]], columns=["country", "year", "gas", "ghg"])
+        list_cols_group_by = ["group_type", "group_name", "year", "gas"]
+
+        for year_type in [str, int]:
+            for df_statistics_case in [df_statistics, pd.concat([df_statistics, df_japan], ignore_index=True)]:
+                with self.subTest(year_type=year_type, countries=len(df_statistics_case)):
+                    df_statistics_case = df_statistics_case.astype({"year": year_type})
+
+                    # when aggregating the statistics per zone
+                    df_per_zone_and_country = StatisticsPerCountriesAndZonesJoiner().run(
+                        df_statistics_case, df_country, list_cols_group_by, {"ghg": "sum"})
+
+                    # expect the zones of the merge with the same dtypes (float years when a country is missing),
+                    # then the countries
+                    df_expected = (pd.merge(df_country, df_statistics_case, how="left", on="country")
+                                   .groupby(list_cols_group_by).agg({"ghg": "sum"}).reset_index())
+                    df_per_zone = df_per_zone_and_country[df_per_zone_and_country["group_type"] != "country"]
+                    pd.testing.assert_frame_equal(df_per_zone.reset_index(drop=True), df_expected)
+                    self.assertEqual(df_per_zone[df_per_zone["group_name"] == "World"]["ghg"].tolist(),
+                                     [3.0, 0.0, 0.0])
+                    self.assertEqual(len(df_per_zone_and_country), len(df_expected) + len(df_statistics_case))
+
+    def test_zone_index_saved_and_loaded(self):
+        """
+        Test that a ZoneIndex loaded from its file gives the members and the aggregation of the reference.
+        :return:
+        """
+        # given a ZoneIndex saved to a file
+        df_country = pd.DataFrame([["zone", "Europe", "France"], ["zone", "Europe", "Germany"],
+                                   ["zone", "World", "France"], ["zone", "World", "Chad"]],
+                                  columns=["group_type", "group_name", "country"])
+        df_statistics = pd.DataFrame([["France", 2000, 1], ["Germany", 2000, 2], ["Chad", 2000, 4]],
+                                     columns=["country", "year", "population"])
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "zone_index.pkl")
+            ZoneIndex(df_country).save(filepath)
+
+            # when loading it
+            zone_index = ZoneIndex.load(filepath)
+
+        # expect the members, the missing and unmatched countries and the sums of the reference
+        self.assertEqual(zone_index.get_member_countries("zone", "World"), ["France", "Chad"])
+        self.assertEqual(zone_index.get_missing_members(pd.Series(["France", "Chad"]))["country"].tolist(),
+                         ["Germany"])
+        self.assertEqual(zone_index.get_unmatched_countries(pd.Series(["France", "Atlantis"])), ["Atlantis"])
+        df_per_zone = aggregate_per_zones(df_statistics, zone_index, ["group_type", "group_name", "year"],
+                                          {"population": "sum"})
+        self.assertEqual(df_per_zone["group_name"].tolist(), ["Europe", "World"])
+        self.assertEqual(df_per_zone["population"].tolist(), [3, 5])
+
+    def test_zone_index_read_once_and_previous_versions_removed(self):
+        """
+        Test that the reference is hashed once per process while it is unchanged, and that the ZoneIndex files of the
+        previous versions are removed when the current version is written.
+        :return:
+        """
+        # given a project with the countries and zones reference, and a ZoneIndex file of a previous version
+        with tempfile.TemporaryDirectory() as project_root_path, tempfile.TemporaryDirectory() as cache_path:
+            os.makedirs(os.path.join(project_root_path, "data", "countries"))
+            shutil.copy(os.path.join(get_project_root_path(), zone_index.COUNTRIES_AND_ZONES_RELATIVE_PATH),
+                        os.path.join(project_root_path, zone_index.COUNTRIES_AND_ZONES_RELATIVE_PATH))
+            previous_version_filepath = os.path.join(cache_path, "0123.v2.pkl")
+            open(previous_version_filepath, "wb").close()
+
+            # when getting the ZoneIndex twice
+            with mock.patch.object(zone_index.hashlib, "sha256", wraps=hashlib.sha256) as sha256:
+                first_zone_index = zone_index.get_zone_index(project_root_path, cache_path)
+                second_zone_index = zone_index.get_zone_index(project_root_path, cache_path)
+
+            # expect the reference hashed once, and only the file of the current version kept
+            self.assertIs(first_zone_index, second_zone_index)
+            self.assertEqual(sha256.call_count, 1)
+            self.assertFalse(os.path.exists(previous_version_filepath))
+            self.assertEqual([os.path.splitext(filename)[0].split(".")[-1] for filename in os.listdir(cache_path)],
+                             [f"v{zone_index.ZONE_INDEX_VERSION}"])
+
+    def test_incremental_run_equals_full_run(self):
+        """
+        Test that the revised rows of some countries update the previous output like a run over all the countries.
+        :return:
+        """
+        # given a previous output, and revisions replacing a row, adding a year and a country out of the zones
+        df_country = pd.DataFrame([["zone", "Europe", "France"], ["zone", "Europe", "Germany"],
+                                   ["zone", "World", "France"], ["zone", "World", "Chad"]],
+                                  columns=["group_type", "group_name", "country"])
+        df_statistics = pd.DataFrame([["France", 2000, 1], ["Germany", 2000, 2], ["Chad", 2000, 4], ["France", 2001, 8]],
+                                     columns=["country", "year", "population"])
+        df_revisions = pd.DataFrame([["France", 2000, 10], ["Chad", 2002, 5], ["Atlantis", 2000, 3]],
+                                    columns=["country", "year", "population"])
+        list_cols_group_by = ["group_type", "group_name", "year"]
+        df_previous = StatisticsPerCountriesAndZonesProcessor(df_statistics, df_country, list_cols_group_by,
+                                                              {"population": "sum"}).run()
+
+        # when updating it with the revisions
+        df_updated = StatisticsPerCountriesAndZonesProcessor(df_revisions, df_country, list_cols_group_by,
+                                                             {"population": "sum"}).run_incremental(df_previous)
+
+        # expect the output of a run over the revised statistics
+        df_revised = pd.concat([df_statistics.drop(index=0), df_revisions])
+        df_expected = StatisticsPerCountriesAndZonesProcessor(df_revised, df_country, list_cols_group_by,
+                                                              {"population": "sum"}).run()
+        pd.testing.assert_frame_equal(df_updated.sort_values(list_cols_group_by).reset_index(drop=True),
+                                      df_expected.sort_values(list_cols_group_by).reset_index(drop=True))
+        self.assertEqual(df_updated[df_updated["group_name"] == "World"]["population"].tolist(), [14, 8, 5])
+
+    def test_grouping_sets_equal_separate_aggregations(self):
+        """
+        Test that the statistics of each grouping set are the statistics aggregated for this set alone.
+        :return:
+        """
+        # given statistics by gas and sector, with a missing value and a country out of the zones
+        df_country = pd.DataFrame([["zone", "Europe", "France"], ["zone", "Europe", "Germany"],
+                                   ["zone", "World", "France"], ["zone", "World", "Chad"]],
+                                  columns=["group_type", "group_name", "country"])
+        df_statistics = pd.DataFrame([["France", 2000, "CO2", "Energy", 1.0], ["France", 2000, "CH4", "Energy", 2.0],
+                                      ["Germany", 2000, "CO2", "Waste", 4.0], ["Chad", 2001, "CO2", "Energy", np.nan],
+                                      ["Atlantis", 2000, "CO2", "Energy", 8.0]],
+                                     columns=["country", "year", "gas", "sector", "ghg"])
+
+        # when aggregating them by gas, by sector and in total
+        list_stats = aggregate_grouping_sets(df_statistics, df_country, ["group_type", "group_name", "year"],
+                                             [["gas"], ["sector"], []], {"ghg": "sum"})
+
+        # expect the zones and the countries of separate aggregations
+        for (df_per_zone, df_per_country), list_cols_set in zip(list_stats, [["gas"], ["sector"], []]):
+            df_expected_per_country = (df_statistics.groupby(["country", "year"] + list_cols_set).agg({"ghg": "sum"})
+                                       .reset_index())
+            df_expected_per_zone = aggregate_per_zones(df_expected_per_country, df_country,
+                                                       ["group_type", "group_name", "year"] + list_cols_set,
+                                                       {"ghg": "sum"})
+            pd.testing.assert_frame_equal(df_per_country, df_expected_per_country)
+            pd.testing.assert_frame_equal(df_per_zone, df_expected_per_zone)
+        self.assertEqual(list_stats[2][0]["ghg"].tolist(), [7.0, 3.0, 0.0])
+
+    def test_under_covered_zones_flagged_or_suppressed(self):
+        """
+        Test that the zones missing too many countries, or too much of their weight, in a year are flagged or removed.
+        :return:
+        """
+        # given zones covered differently per year, a missing value which does not cover its country, and the
+        # population of the countries
+        df_country = pd.DataFrame([["zone", "Europe", "France"], ["zone", "Europe", "Germany"],
+                                   ["zone", "World", "France"], ["zone", "World", "Germany"], ["zone", "World", "Chad"]],
+                                  columns=["group_type", "group_name", "country"])
+        df_statistics = pd.DataFrame([["France", 2000, 1.0], ["Germany", 2000, 2.0], ["France", 2001, 4.0],
+                                      ["Germany", 2001, np.nan], ["Chad", 2001, 8.0]],
+                                     columns=["country", "year", "ghg"])
+        df_population = pd.DataFrame([["France", 60], ["Germany", 80], ["Chad", 10]], columns=["country", "population"])
+        list_cols_group_by = ["group_type", "group_name", "year"]
+
+        # when aggregating them with a minimum coverage
+        df_flagged = StatisticsPerCountriesAndZonesJoiner().run(df_statistics, df_country, list_cols_group_by,
+                                                                {"ghg": "sum"}, min_coverage=0.6)
+        df_suppressed = StatisticsPerCountriesAndZonesJoiner().run(df_statistics, df_country, list_cols_group_by,
+                                                                   {"ghg": "sum"}, min_coverage=0.6,
+                                                                   suppress_under_covered=True,
+                                                                   df_weights=df_population, weight_col="population")
+
+        # expect Europe in 2001 (1 country of 2) flagged, and World in 2001 (70 of 150 inhabitants) removed as well
+        df_flagged_zones = df_flagged[df_flagged["group_type"] == "zone"]
+        self.assertEqual(df_flagged_zones["is_under_covered"].tolist(), [False, True, False, False])
+        df_suppressed_zones = df_suppressed[df_suppressed["group_type"] == "zone"]
+        self.assertEqual(df_suppressed_zones[["group_name", "year"]].values.tolist(), [["Europe", 2000], ["World", 2000]])
+
+    def test_time_varying_memberships(self):
+        """
+        Test that the zones are aggregated with the memberships valid in each year.
+        :return:
+        """
+        # given a country member of a zone until 2019, and a country member since 2001
+        df_country = pd.DataFrame([["group", "EU", "France", np.nan, np.nan],
+                                   ["group", "EU", "United Kingdom", 1973, 2019],
+                                   ["group", "EU", "Croatia", 2013, np.nan]],
+                                  columns=["group_type", "group_name", "country", "valid_from", "valid_to"])
+        df_statistics = pd.DataFrame([["France", "2012", 1.0], ["United Kingdom", "2012", 2.0], ["Croatia", "2012", 4.0],
+                                      ["France", "2020", 8.0], ["United Kingdom", "2020", 16.0], ["Croatia", "2020", 32.0]],
+                                     columns=["country", "year", "ghg"])
+        list_cols_group_by = ["group_type", "group_name", "year"]
+
+        # when aggregating the statistics per zone, with the sparse product and with the merge
+        df_per_zone_and_country = StatisticsPerCountriesAndZonesJoiner().run(df_statistics, df_country,
+                                                                             list_cols_group_by, {"ghg": "sum"})
+        df_merged = StatisticsPerCountriesAndZonesJoiner().run(df_statistics, df_country, list_cols_group_by,
+                                                               {"ghg": "mean"})
+
+        # expect the United Kingdom only in 2012, and Croatia only in 2020
+        df_per_zone = df_per_zone_and_country[df_per_zone_and_country["group_type"] == "group"]
+        self.assertEqual(df_per_zone["ghg"].tolist(), [3.0, 40.0])
+        self.assertEqual(df_merged[df_merged["group_type"] == "group"]["ghg"].tolist(), [1.5, 20.0])
+        self.assertEqual(ZoneIndex(df_country).get_member_countries("group", "EU", 2020), ["France", "Croatia"])
+
+    def test_hierarchical_aggregation_equals_direct(self):
+        """
+        Test that the zones summed from the zones they include equal the zones summed from their countries, and that
+        the check of the hierarchy finds a zone which is not the sum of its parts.
+        :return:
+        """
+        # given the World made of two continents and of a country in none of them
+        df_country = pd.DataFrame([["continent", "Europe", "France"], ["continent", "Europe", "Germany"],
+                                   ["continent", "Asia", "China"],
+                                   ["zone", "World", "France"], ["zone", "World", "Germany"],
+                                   ["zone", "World", "China"], ["zone", "World", "Brazil"]],
+                                  columns=["group_type", "group_name", "country"])
+        df_statistics = pd.DataFrame([["France", 2000, 1.0], ["Germany", 2000, 2.0], ["China", 2000, 4.0],
+                                      ["Brazil", 2000, 8.0], ["China", 2001, 16.0], ["Brazil", 2001, 32.0]],
+                                     columns=["country", "year", "ghg"])
+        list_cols_group_by = ["group_type", "group_name", "year"]
+
+        # when aggregating the zones directly and over their hierarchy
+        df_direct = StatisticsPerCountriesAndZonesJoiner().run(df_statistics, df_country, list_cols_group_by,
+                                                               {"ghg": "sum"})
+        df_hierarchical = StatisticsPerCountriesAndZonesJoiner().run(df_statistics, df_country, list_cols_group_by,
+                                                                     {"ghg": "sum"}, use_hierarchy=True)
+
+        # expect the World to be made of the continents, and the same sums
+        df_edges = get_zone_hierarchy(get_zone_index_of(df_country)).get_edges()
+        self.assertEqual(sorted(df_edges["child_group_name"]), ["Asia", "Europe"])
+        pd.testing.assert_frame_equal(df_hierarchical.reset_index(drop=True), df_direct.reset_index(drop=True))
+        self.assertEqual(len(check_zone_hierarchy(df_direct, df_country, list_cols_group_by, ["ghg"])), 0)
+
+        # expect the check to find the World when it is not the sum of its parts
+        df_tampered = df_direct.copy()
+        df_tampered.loc[(df_tampered["group_name"] == "World") & (df_tampered["year"] == 2001), "ghg"] = 0.0
+        df_inconsistencies = check_zone_hierarchy(df_tampered, df_country, list_cols_group_by, ["ghg"])
+        self.assertEqual(df_inconsistencies[["group_name", "year", "value", "expected"]].values.tolist(),
+                         [["World", 2001, 0.0, 48.0]])
+
+        # expect the hierarchy to reject a country listed twice in a zone, counted twice by the direct sums
+        df_duplicated = pd.concat([df_country, df_country.tail(1)], ignore_index=True)
+        with self.assertRaises(ValueError):
+            StatisticsPerCountriesAndZonesJoiner().run(df_statistics, df_duplicated, list_cols_group_by,
+                                                       {"ghg": "sum"}, use_hierarchy=True)
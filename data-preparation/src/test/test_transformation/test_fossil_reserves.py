@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from transformation.fossil_reserves import FossilProvenReservesProdGenerator
+from utils.sql import SqlEngine, duckdb
+
+
+class TestFossilProvenReservesProdGenerator(unittest.TestCase):
+
+    @staticmethod
+    def get_proven_reserves(list_values, unit):
+        return pd.DataFrame({"country": ["France", "Algérie", "Norway\xa0", "Atlantis"], "proven_reserves": list_values,
+                             "unit": unit})
+
+    @unittest.skipIf(duckdb is None, "duckdb is not installed")
+    def test_duckdb_engine(self):
+        """
+        Test that the SQL recipe run with DuckDB gives the same dataset as pandas.
+        :return:
+        """
+        # given the proven reserves of gas, oil and coal, and zones sharing countries
+        df_country = pd.DataFrame({"group_type": ["group", "group", "group", "continent", "continent"],
+                                   "group_name": ["EU27", "EU27", "OPEC", "Europe", "Africa"],
+                                   "country": ["France", "Germany", "Algeria", "Norway", "Algeria"]})
+
+        # when computing the reserves per zone and country with both engines
+        dict_results = {}
+        for engine in ["pandas", "duckdb"]:
+            dict_results[engine] = FossilProvenReservesProdGenerator(engine).run(
+                self.get_proven_reserves([1.0, 2.5, np.nan, 4.0], "Gm3"),
+                self.get_proven_reserves([3.0, np.nan, 1.0, 2.0], "Gb"),
+                self.get_proven_reserves([0.5, 1.5, 2.5, 3.5], "Mt"), df_country.copy())
+
+        # expect the same dataset, without the untranslated country
+        pd.testing.assert_frame_equal(dict_results["pandas"], dict_results["duckdb"])
+        self.assertNotIn("Atlantis", dict_results["duckdb"]["group_name"].tolist())
+
+    @unittest.skipIf(duckdb is None, "duckdb is not installed")
+    def test_parquet_path_quoted(self):
+        # given a Parquet file in a directory whose name contains a quote
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "producers' reserves.parquet")
+            pd.DataFrame({"proven_reserves": [1.0, 2.0]}).to_parquet(filepath)
+
+            # when querying it, expect it read
+            df = SqlEngine().query("SELECT SUM(proven_reserves) AS total FROM reserves", reserves=filepath)
+            self.assertEqual(df["total"].tolist(), [3.0])
@@ -0,0 +1,47 @@
+import itertools
+import unittest
+import numpy as np
+import pandas as pd
+from transformation.ghg.ghg import GhgPikEdgarCombinator
+from utils.sql import duckdb
+
+
+class TestGhgPikEdgarCombinator(unittest.TestCase):
+
+    @staticmethod
+    def get_clean_dataset(source, seed):
+        random = np.random.default_rng(seed)
+        list_sectors = ["Energy", "Agriculture", "Other Agriculture", "Waste", "Other Sectors", "Industry and Construction",
+                        "Transport", "Electricity & Heat", "Other Energy"]
+        df = pd.DataFrame(itertools.product(["France", "Chad"], list_sectors, ["CO2", "CH4"],
+                                            [str(year) for year in range(2006, 2015)]),
+                          columns=["country", "sector", "gas", "year"])
+        df["ghg"] = random.normal(5, 5, len(df))
+        df.loc[::7, "ghg"] = np.nan
+        df["ghg_unit"] = "MtCO2eq"
+        df["source"] = source
+        return df
+
+    @unittest.skipIf(duckdb is None, "duckdb is not installed")
+    def test_duckdb_engine(self):
+        """
+        Test that the SQL recipes run with DuckDB give the same datasets as pandas.
+        :return:
+        """
+        # given the cleaned PIK and EDGAR datasets
+        df_pik_clean = self.get_clean_dataset("PIK", 0)
+        df_edgar_clean = self.get_clean_dataset("edgar", 1)
+
+        for method in ["compute_pik_edgar_averaged_ratio", "compute_pik_edgar_filter_sector",
+                       "compute_pik_edgar_extrapolated_glued"]:
+            # when combining them with both engines
+            df_pandas = getattr(GhgPikEdgarCombinator(), method)(df_pik_clean.copy(), df_edgar_clean.copy())
+            df_duckdb = getattr(GhgPikEdgarCombinator("duckdb"), method)(df_pik_clean.copy(), df_edgar_clean.copy())
+
+            # expect the same dataset
+            pd.testing.assert_frame_equal(df_pandas.reset_index(drop=True), df_duckdb.reset_index(drop=True))
+
+    def test_unknown_engine(self):
+        # expect an error on an unknown engine
+        with self.assertRaises(ValueError):
+            GhgPikEdgarCombinator("spark")
@@ -0,0 +1,39 @@
+import io
+import itertools
+import unittest
+import pandas as pd
+from transformation.ghg.pik import PikCleaner
+
+
+class TestPikCleaner(unittest.TestCase):
+
+    @staticmethod
+    def get_raw_csv():
+        list_rows = []
+        for scenario, area, entity, category in itertools.product(
+                ["HISTTP", "HISTCR"], ["FRA", "DEU", "EARTH"], ["CO2", "CH4", "KYOTOGHG (AR6GWP100)"],
+                ["1", "2", "M.AG", "4", "5", "1.A"]):
+            unit = "CO2 * gigagram / a" if entity != "CH4" else "CH4 * gigagram / a"
+            list_rows.append(["PRIMAP-hist", scenario, "derived", area, entity, unit, category, 1.5, 2.5])
+        return pd.DataFrame(list_rows, columns=["source", "scenario (PRIMAP-hist)", "provenance", "area (ISO3)",
+                                                "entity", "unit", "category (IPCC2006_PRIMAP)", "2000",
+                                                "2001"]).to_csv(index=False)
+
+    def test_streamed_by_chunks(self):
+        """
+        Test that the dataset streamed by chunks, some of them without any row kept, is cleaned like the whole dataset.
+        :return:
+        """
+        # given the raw PIK dataset
+        raw_csv = self.get_raw_csv()
+
+        # when cleaning it whole, and streamed by small chunks
+        df_pik = PikCleaner().run(pd.read_csv(io.StringIO(raw_csv)))
+        df_pik_chunks = PikCleaner().run_chunks(pd.read_csv(io.StringIO(raw_csv), chunksize=5,
+                                                            **PikCleaner.DICT_READ_KWARGS))
+
+        # expect the same dataset, with the third-party scenario, the gases and the sectors kept only
+        pd.testing.assert_frame_equal(df_pik.reset_index(drop=True), df_pik_chunks.reset_index(drop=True))
+        self.assertEqual(sorted(df_pik["gas"].unique()), ["CH4", "CO2"])
+        self.assertEqual(len(df_pik), 2 * 2 * 5 * 2)  # countries, gases, sectors, years
+        self.assertEqual(df_pik.loc[df_pik["gas"] == "CH4", "ghg"].unique().tolist(), [1.5 * 28 / 1000, 2.5 * 28 / 1000])
@@ -1,5 +1,13 @@
+import contextlib
+import io
+import os
+import tempfile
 import pandas as pd
 import unittest
+from sdp_data_preparation.countries_and_zones import CountryNameTranslator
+from sdp_data_preparation.opec import stage_proven_reserves_gas, stage_proven_reserves_oil
+from sdp_data_preparation.utils import AliasCache, NameResolver
+from utils import get_project_root_path
 from utils.translation import CountryTranslatorFrenchToEnglish
 import numpy as np
 
@@ -38,3 +46,91 @@ class TestCountryTranslatorFrenchToEnglish(unittest.TestCase):
 
         self.assertTrue(serie_out.equals(serie_exp))
 
+
+    def test_translation_of_spacing_case_and_encoding_variants(self):
+        """
+        Test that the variants of the keys of the dictionary are translated, per distinct country.
+        :return:
+        """
+        # given variants of spacing, case and encoding, repeated, as a categorical serie too
+        serie_in = pd.Series(["  bosnia\xa0and  Herzegovina", "OUZBÃ\x89KISTAN", "Holy SeeÂ\xa0(Vatican City State)",
+                              "AZERTYUI"] * 3, index=range(12, 0, -1))
+
+        # when translating the names
+        serie_out = CountryTranslatorFrenchToEnglish().run(serie_in, raise_errors=False)
+        serie_out_categorical = CountryTranslatorFrenchToEnglish().run(serie_in.astype("category"), raise_errors=False)
+
+        # expect the variants translated, on the same index
+        serie_exp = pd.Series(["Bosnia and Herzegovina", "Uzbekistan", "Vatican", np.nan] * 3, index=range(12, 0, -1))
+        self.assertTrue(serie_out.equals(serie_exp))
+        self.assertEqual(serie_out_categorical.astype(object).tolist(), serie_exp.tolist())
+
+    def test_unknown_countries_suggested_then_accepted(self):
+        """
+        Test that the unknown countries are only suggested on demand, among close enough countries, and translated once
+        accepted in the alias cache.
+        :return:
+        """
+        # given a misspelled country, a sentinel, an aggregate and an empty alias cache
+        serie_in = pd.Series(["Bosnia Herzegovnia", "Deleted", "European Union (27)", np.nan])
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "country_aliases.json")
+            resolver = CountryTranslatorFrenchToEnglish.get_resolver(AliasCache(filepath))
+            resolver_suggesting = CountryTranslatorFrenchToEnglish.get_resolver(AliasCache(filepath), suggest=True)
+
+            # when translating the names with and without suggestions, then translating them again once the misspelled
+            # country is accepted
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                serie_out = CountryTranslatorFrenchToEnglish(resolver).run(serie_in, raise_errors=False)
+            with contextlib.redirect_stdout(io.StringIO()) as output_suggesting:
+                CountryTranslatorFrenchToEnglish(resolver_suggesting).run(serie_in, raise_errors=False)
+            dict_candidates = resolver.get_candidates(list(serie_in.dropna()), limit=5)
+            AliasCache(filepath).accept("Bosnia Herzegovnia", dict_candidates["Bosnia Herzegovnia"][0][0])
+            serie_out_accepted = CountryTranslatorFrenchToEnglish(
+                CountryTranslatorFrenchToEnglish.get_resolver(AliasCache(filepath))).run(serie_in, raise_errors=False)
+
+        # expect no country translated before being accepted, the misspelled country only suggested on demand, and
+        # neither sentinels nor aggregates suggested
+        self.assertTrue(serie_out.isnull().all())
+        self.assertNotIn("SUGGESTION", output.getvalue())
+        self.assertEqual(output_suggesting.getvalue().count("SUGGESTION"), 1)
+        self.assertEqual(dict_candidates["Bosnia Herzegovnia"][0][0], "Bosnia and Herzegovina")
+        self.assertEqual(dict_candidates["Deleted"], [])
+        self.assertEqual(dict_candidates["European Union (27)"], [])
+        self.assertTrue(serie_out_accepted.equals(pd.Series(["Bosnia and Herzegovina", np.nan, np.nan, np.nan])))
+
+
+class TestCountryNameTranslator(unittest.TestCase):
+
+    def test_labels_close_to_deleted_ones_untranslated(self):
+        """
+        Test that the labels only differing by their spacing or case from a label translated as "Delete" are left
+        untranslated, as with the exact mapping, while the other variants are translated.
+        :return:
+        """
+        # given the OPEC regions with a trailing space, and a country with one
+        serie_in = pd.Series(["Middle East ", "africa", "Africa", "Venezuela "])
+
+        # when translating the names
+        serie_out = CountryNameTranslator(NameResolver({})).run(serie_in, raise_errors=False)
+
+        # expect only the exact region and the country translated
+        self.assertEqual(serie_out.tolist()[:2], [np.nan, np.nan])
+        self.assertEqual(serie_out.tolist()[2:], ["Delete", "Venezuela"])
+
+    def test_opec_staging_unchanged(self):
+        """
+        Test that the staging of the OPEC proven reserves gives the staged datasets versioned in data/opec.
+        :return:
+        """
+        opec_data_path = os.path.join(get_project_root_path(), "data", "opec")
+        for fossil_fuel, stage_proven_reserves in [("oil", stage_proven_reserves_oil),
+                                                   ("gas", stage_proven_reserves_gas)]:
+            # when staging the raw workbook
+            df_staged = stage_proven_reserves(opec_data_path).reset_index(drop=True)
+
+            # expect the versioned staged dataset, without any row to delete
+            df_exp = pd.read_csv(os.path.join(opec_data_path, "stg_proven_reserves_%s.csv" % fossil_fuel))
+            self.assertNotIn("Delete", df_staged["country"].tolist())
+            pd.testing.assert_frame_equal(df_staged.astype({"year": str}), df_exp.astype({"year": str}),
+                                          check_dtype=False)
@@ -1,4 +1,6 @@
 import pandas as pd
+from sdp_data_preparation.countries_and_zones import aggregate_per_zones, apply_zone_coverage, can_aggregate_per_zones, \
+    compute_zone_coverage, filter_valid_memberships, get_zone_index_of
 
 
 class StatisticsPerCountriesAndZonesJoiner:
@@ -6,16 +8,14 @@ class StatisticsPerCountriesAndZonesJoiner:
     @staticmethod
     def check_missing_countries_for_zone_aggregation(df_statistics, df_country):
         """
-        Check if there are missing countries in the statistics dataset.
+        Check if there are missing countries in the statistics dataset. The coverage of each zone per year is given by
+        compute_zone_coverage.
         """
         # check countries that are missing
-        list_countries_statistics = df_statistics["country"].unique()
-        df_countries_missing = df_country[~df_country["country"].isin(list_countries_statistics)]
-        dict_countries_missing_per_zones = df_countries_missing.groupby("group_name")["country"].apply(list).to_dict()
-        for group_name, list_countries_in_zone in sorted(dict_countries_missing_per_zones.items()):
-            if len(list_countries_in_zone) > 0:
-                print(f"\nWARNING: {len(list_countries_in_zone)} countries are missing in the statistics dataset for zone : {group_name}")
-                print(list_countries_in_zone)
+        df_countries_missing = get_zone_index_of(df_country).get_missing_members(df_statistics["country"])
+        if len(df_countries_missing) > 0:
+            print("\nWARNING: %s countries are missing in the statistics dataset for %s zones"
+                  % (df_countries_missing["country"].nunique(), df_countries_missing["group_name"].nunique()))
 
     @staticmethod
     def check_countries_not_matching(df_statistics, df_country):
@@ -23,27 +23,45 @@ class StatisticsPerCountriesAndZonesJoiner:
         Check countries that are in the statistics dataset but not in the coutrnies referential.
         """
         # check countries that are missing
-        set_countries_not_matching = set(df_statistics["country"].unique()).difference(set(df_country["country"].unique()))
+        set_countries_not_matching = set(get_zone_index_of(df_country).get_unmatched_countries(df_statistics["country"]))
         if len(set_countries_not_matching) > 0:
             print("\nWARNING: %s countries are in the statistics dataset but not in the countries referential" % len(set_countries_not_matching))
             print("Please check the following list:")
             print(set_countries_not_matching)
-        
 
-    def run(self, df_statistics, df_country, list_cols_group_by, dict_aggregation):
+    def run(self, df_statistics, df_country, list_cols_group_by, dict_aggregation, min_coverage=None,
+            suppress_under_covered=False, df_weights=None, weight_col=None, use_hierarchy=False):
         """
         Joins df_statistics with df_country on country column.
+        :param min_coverage: (float) the zones with a lower coverage (fraction of their countries in the statistics, or
+            of their weight with df_weights) in a year are flagged in the "is_under_covered" column. None to keep them.
+        :param suppress_under_covered: (bool) removes the zones under min_coverage instead of flagging them.
+        :param df_weights: (dataframe) weight of the countries for the coverage, e.g. their population per year.
+        :param weight_col: (str) column of the weight in df_weights.
+        :param use_hierarchy: (bool) sums the zones from the sums of the zones they include (e.g. the World from the
+            continents) instead of from all their countries.
         """
         # check countries that are missing
         self.check_missing_countries_for_zone_aggregation(df_statistics, df_country)
         self.check_countries_not_matching(df_statistics, df_country)
 
-        # compute stastics per zone
-        df_stats_per_zone = (pd.merge(df_country, df_statistics, how='left', left_on='country', right_on='country')
-                                    .groupby(list_cols_group_by)
-                                    .agg(dict_aggregation)
-                                    .reset_index()
-                             )
+        # compute stastics per zone, with a sparse product of the membership of the countries and the statistics
+        if can_aggregate_per_zones(df_statistics, list_cols_group_by, dict_aggregation):
+            df_stats_per_zone = aggregate_per_zones(df_statistics, df_country, list_cols_group_by, dict_aggregation,
+                                                    use_hierarchy=use_hierarchy)
+        else:
+            df_stats_per_zone = (filter_valid_memberships(pd.merge(df_country, df_statistics, how='left',
+                                                                   left_on='country', right_on='country'))
+                                        .groupby(list_cols_group_by)
+                                        .agg(dict_aggregation)
+                                        .reset_index()
+                                 )
+        if min_coverage is not None:
+            df_coverage = compute_zone_coverage(df_statistics, df_country, list_cols_group_by, df_weights, weight_col,
+                                                list(dict_aggregation))
+            df_stats_per_zone = apply_zone_coverage(df_stats_per_zone, df_coverage, list_cols_group_by, min_coverage,
+                                                    suppress=suppress_under_covered,
+                                                    coverage_colname="coverage" if df_weights is None else "weighted_coverage")
 
         # add stastics for each countries
         df_stats_per_countries = df_statistics.copy()
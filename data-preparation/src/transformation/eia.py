@@ -2,6 +2,7 @@ from utils.iso3166 import countries
 from utils.translation import CountryTranslatorFrenchToEnglish
 from transformation.demographic.countries import StatisticsPerCountriesAndZonesJoiner
 from utils.format import StatisticsDataframeFormatter
+from data_registry import REGISTRY
 import requests
 import json
 import pandas as pd
@@ -167,7 +168,7 @@ class EiaDataProcessor:
         try:  # TODO - à corriger une fois que l'on aura retrouvé les accès à EIA
             df_iea_data = EiaScrapper().collect_eai_dataset(self.end_url)
         except:
-            df_iea_data = pd.read_excel(os.path.join(os.path.dirname(__file__), "../../../data/thibaud/eia_api/" + self.file_name))
+            df_iea_data = REGISTRY[os.path.splitext(self.file_name)[0]].read()
 
         # clean EAI dataset
         df_iea_data = df_iea_data.rename({"flow": "sector", "product": "energy_family"}, axis=1)
@@ -3,6 +3,7 @@ import numpy as np
 import sys
 sys.path.insert(0, r'C:\Users\HP\Desktop\shiftdataportal_data')
 from utils.translation import CountryTranslatorFrenchToEnglish
+from utils.sql import ENGINE_DUCKDB, ENGINE_PANDAS, SqlEngine, check_engine
 
 
 class CoalReservesConsolidatedProdGenerator:
@@ -257,9 +258,29 @@ class BpFossilWithZonesProdGeneratorNEW:
 
 class FossilProvenReservesProdGenerator:
 
-    def __init__(self):
-        # Initialize any necessary variables or state here
-        pass
+    # the original Dataiku recipe, run by the duckdb engine
+    SQL_PROVEN_RESERVES_PER_ZONES_AND_COUNTRIES = """
+        SELECT group_type, group_name, energy_source, unit, proven_reserves
+        FROM (
+            SELECT 0 AS part, 0 AS row_id, df_country.group_type, df_country.group_name, reserves.energy_source,
+                   reserves.unit, COALESCE(SUM(reserves.proven_reserves), 0) AS proven_reserves
+            FROM df_country
+            LEFT JOIN reserves ON df_country.country = reserves.country
+            WHERE reserves.energy_source IS NOT NULL AND reserves.unit IS NOT NULL
+            GROUP BY df_country.group_type, df_country.group_name, reserves.energy_source, reserves.unit
+            UNION ALL
+            SELECT 1 AS part, row_id, 'country' AS group_type, country AS group_name, energy_source, unit,
+                   proven_reserves
+            FROM reserves
+        )
+        ORDER BY part, row_id, group_type, group_name, energy_source, unit
+    """
+
+    def __init__(self, engine=ENGINE_PANDAS):
+        """
+        :param engine: (str) "pandas", or "duckdb" to run the joins and the aggregations as the SQL recipe.
+        """
+        self.engine = check_engine(engine)
 
     def run(self, df_gas_proven_reserves: pd.DataFrame, df_oil_proven_reserves: pd.DataFrame,
                                             df_coal_proven_reserves: pd.DataFrame, df_country: pd.DataFrame) -> pd.DataFrame:
@@ -282,6 +303,9 @@ class FossilProvenReservesProdGenerator:
         # Remove rows with NaN in 'country'
         df_fossil_proven_reserves_stacked.dropna(subset='country', inplace=True)
 
+        if self.engine == ENGINE_DUCKDB:
+            return self.run_sql(df_fossil_proven_reserves_stacked, df_country)
+
         # Perform a left join between the two DataFrames on the 'country' column
         merged_df = pd.merge(df_country, df_fossil_proven_reserves_stacked, on='country', how='left')
 
@@ -302,5 +326,11 @@ class FossilProvenReservesProdGenerator:
         # resut are not equal exactly because in the dataiku we keep nan value, we don't translate South koreaa, and there is missing value in the result like afghanistan in gas
         return final_df
 
-
-
+    def run_sql(self, df_fossil_proven_reserves_stacked: pd.DataFrame, df_country: pd.DataFrame) -> pd.DataFrame:
+        """
+        Same as the end of run(), with the join, the aggregation per zone and the union with the countries in DuckDB.
+        """
+        df_reserves = df_fossil_proven_reserves_stacked[["country", "energy_source", "proven_reserves", "unit"]]
+        df_reserves = df_reserves.assign(row_id=np.arange(len(df_reserves)))
+        return SqlEngine().query(self.SQL_PROVEN_RESERVES_PER_ZONES_AND_COUNTRIES,
+                                 df_country=df_country[["group_type", "group_name", "country"]], reserves=df_reserves)
@@ -2,10 +2,60 @@ import pandas as pd
 from transformation.demographic.countries import StatisticsPerCountriesAndZonesJoiner
 import numpy as np
 from utils.format import StatisticsDataframeFormatter
+from utils.sql import ENGINE_DUCKDB, ENGINE_PANDAS, SqlEngine, check_engine
 
 
 class GhgPikEdgarCombinator:
 
+    # the original Dataiku recipes, run by the duckdb engine
+    SQL_DIFFERENCE_PIK_EDGAR_ON_SECTOR_INDUSTRY = """
+        SELECT edgar.country, 'Energy from Industry' AS sector, edgar.gas, edgar.year, edgar.ghg - pik.ghg AS ghg,
+               pik.ghg_unit
+        FROM edgar
+        JOIN pik ON edgar.country = pik.country AND edgar.year = pik.year AND edgar.gas = pik.gas
+            AND edgar.sector = pik.sector
+        WHERE edgar.sector = 'Industry and Construction'
+    """
+    SQL_PIK_EDGAR_AVERAGED_RATIO = """
+        WITH edgar_energy AS (
+            SELECT edgar.country, edgar.year, edgar.gas, 'Energy from Industry' AS sector, edgar.ghg - pik.ghg AS ghg
+            FROM edgar
+            JOIN pik ON edgar.country = pik.country AND edgar.year = pik.year AND edgar.gas = pik.gas
+            WHERE edgar.sector = 'Industry and Construction' AND pik.sector = 'Industry and Construction'
+            UNION ALL
+            SELECT country, year, gas, sector, ghg
+            FROM edgar
+            WHERE sector IN ('Transport', 'Electricity & Heat', 'Other Energy')
+        ),
+        pik_edgar_ratio AS (
+            SELECT pik.country, pik.year, pik.gas, pik.sector AS sector_pik, edgar.sector AS sector_edgar,
+                   edgar.ghg / pik.ghg AS ratio
+            FROM pik
+            JOIN edgar_energy AS edgar ON pik.country = edgar.country AND pik.year = edgar.year AND pik.gas = edgar.gas
+            WHERE pik.sector = 'Energy' AND pik.ghg > 0
+            UNION ALL
+            SELECT pik.country, pik.year, pik.gas, pik.sector AS sector_pik, edgar.sector AS sector_edgar,
+                   edgar.ghg / pik.ghg AS ratio
+            FROM pik
+            JOIN edgar ON pik.country = edgar.country AND pik.year = edgar.year AND pik.gas = edgar.gas
+            WHERE pik.ghg > 0 AND (
+                (pik.sector = 'Agriculture' AND edgar.sector IN ('Agriculture', 'Other Agriculture'))
+                OR (pik.sector IN ('Waste', 'Other Sectors') AND edgar.sector IN ('Waste', 'Other Sectors'))
+                OR (pik.sector = 'Industry and Construction' AND edgar.sector = 'Industry and Construction'))
+        )
+        SELECT country, gas, sector_edgar, sector_pik, AVG(ratio) AS averaged_ratio
+        FROM pik_edgar_ratio
+        WHERE year >= '2008' AND year <= '2012'
+        GROUP BY country, gas, sector_edgar, sector_pik
+        ORDER BY country, gas, sector_edgar, sector_pik
+    """
+
+    def __init__(self, engine=ENGINE_PANDAS):
+        """
+        :param engine: (str) "pandas", or "duckdb" to run the joins and the aggregations as the SQL recipes.
+        """
+        self.engine = check_engine(engine)
+
     @staticmethod
     def compute_pik_edgar_stacked(df_pik_clean, df_edgar_clean):
         df_edgar_clean["source"] = "edgar"
@@ -20,6 +70,10 @@ class GhgPikEdgarCombinator:
         :return:
         """
         # TODO -  transformation peu claire. Manque de confiance sur cette partie. A re-vérifier
+        if self.engine == ENGINE_DUCKDB:
+            return SqlEngine().query(self.SQL_DIFFERENCE_PIK_EDGAR_ON_SECTOR_INDUSTRY,
+                                     pik=df_pik_clean[["country", "sector", "gas", "year", "ghg", "ghg_unit"]],
+                                     edgar=df_edgar_clean[["country", "sector", "gas", "year", "ghg"]])
         df_edgar_industry = df_edgar_clean[df_edgar_clean["sector"] == "Industry and Construction"]
         df_pik_industry = df_pik_clean[df_pik_clean["sector"] == "Industry and Construction"]
         df_diff_industry = pd.merge(
@@ -106,16 +160,29 @@ class GhgPikEdgarCombinator:
 
         return df_pik_edgar_ratio
 
-    def compute_pik_edgar_extrapolated_glued(self, df_pik_clean,
-                                             df_edgar_clean):  # TODO - revoir complètement cette méthode. Dette technique monstrueuse...
-        # compute the energy ratio between PIK and Edgar
-        print("\n----- Combine PIK and EDGAR extrapolated")
+    def compute_pik_edgar_averaged_ratio(self, df_pik_clean, df_edgar_clean):
+        """
+        Averages the ratio between EDGAR and PIK from 2008 to 2012, per country, gas and pair of sectors.
+        :param df_pik_clean: (dataframe) the cleaned PIK dataset.
+        :param df_edgar_clean: (dataframe) the cleaned EDGAR dataset.
+        :return: (dataframe) the averaged ratio per country, gas, sector_edgar and sector_pik.
+        """
+        if self.engine == ENGINE_DUCKDB:
+            return SqlEngine().query(self.SQL_PIK_EDGAR_AVERAGED_RATIO,
+                                     pik=df_pik_clean[["country", "sector", "gas", "year", "ghg"]],
+                                     edgar=df_edgar_clean[["country", "sector", "gas", "year", "ghg"]])
         df_pik_edgar_energy_ratio = self.compute_pik_edgar_energy_ratio(df_pik_clean, df_edgar_clean)
         df_pik_edgar_energy_ratio = df_pik_edgar_energy_ratio[
             (df_pik_edgar_energy_ratio["year"] >= "2008") & (df_pik_edgar_energy_ratio["year"] <= "2012")]
-        df_pik_edgar_energy_ratio = df_pik_edgar_energy_ratio.groupby(
+        return df_pik_edgar_energy_ratio.groupby(
             ["country", "gas", "sector_edgar", "sector_pik"]).agg(averaged_ratio=("ratio", "mean")).reset_index()
 
+    def compute_pik_edgar_extrapolated_glued(self, df_pik_clean,
+                                             df_edgar_clean):  # TODO - revoir complètement cette méthode. Dette technique monstrueuse...
+        # compute the energy ratio between PIK and Edgar
+        print("\n----- Combine PIK and EDGAR extrapolated")
+        df_pik_edgar_energy_ratio = self.compute_pik_edgar_averaged_ratio(df_pik_clean, df_edgar_clean)
+
         # concatenate with the rest of PIK
         df_pik_clean = df_pik_clean.rename(columns={"sector": "sector_pik"})
         df_pik_edgar_energy_extrapolated = df_pik_edgar_energy_ratio.merge(df_pik_clean,
@@ -6,6 +6,12 @@ from utils.format import StatisticsDataframeFormatter
 
 class PikCleaner:
 
+    # arguments of pd.read_csv for the raw PIK dataset : the codes are read as text whatever the rows of the chunk, and
+    # the columns which are not used (source, provenance) are not loaded
+    DICT_READ_KWARGS = {"dtype": {"scenario (PRIMAP-hist)": str, "area (ISO3)": str, "entity": str, "unit": str,
+                                  "category (IPCC2006_PRIMAP)": str},
+                        "usecols": lambda column: column not in ["source", "provenance"]}
+
     def __init__(self):
         self.list_countries_to_remove = ["World", "Non-Annex-I Parties to the Convention",
                                          "Annex-I Parties to the Convention",
@@ -22,20 +28,9 @@ class PikCleaner:
                                     "SF6": "SF6", "NF3": "NF3"
                                     }
 
-    @staticmethod
-    def convert_ghg_with_gas(ghg, ghg_unit):
-        if ghg_unit == "CO2 * gigagram / a":
-            return ghg
-        elif ghg_unit == "N2O * gigagram / a":
-            return ghg * 273
-        elif ghg_unit == "CH4 * gigagram / a":
-            return ghg * 28
-        elif ghg_unit == "SF6 * gigagram / a":
-            return ghg * 25200
-        elif ghg_unit == "NF3 * gigagram / a":
-            return ghg * 17400
-        else:
-            raise ValueError("ERR : unknown ghg_unit : %s" % ghg_unit)
+        # global warming potential of each unit
+        self.dict_gwp_per_unit = {"CO2 * gigagram / a": 1, "N2O * gigagram / a": 273, "CH4 * gigagram / a": 28,
+                                  "SF6 * gigagram / a": 25200, "NF3 * gigagram / a": 17400}
 
     def convert_ghg_unit(self, df_pik: pd.DataFrame):
         """
@@ -43,7 +38,10 @@ class PikCleaner:
         :param df_pik:
         :return:
         """
-        df_pik["ghg"] = df_pik.apply(lambda x: self.convert_ghg_with_gas(x["ghg"], x["ghg_unit"]), axis=1)
+        serie_gwp = df_pik["ghg_unit"].map(self.dict_gwp_per_unit)
+        if serie_gwp.isna().any():
+            raise ValueError("ERR : unknown ghg_unit : %s" % df_pik.loc[serie_gwp.isna(), "ghg_unit"].iloc[0])
+        df_pik["ghg"] = df_pik["ghg"] * serie_gwp
         df_pik["ghg"] /= 1000
         df_pik["ghg_unit"] = "MtCO2eq"
         return df_pik
@@ -53,41 +51,80 @@ class PikCleaner:
         return pd.melt(df_pik, id_vars=["country", "source", "sector", "gas", "ghg_unit"], var_name='year',
                        value_name='ghg')
 
-    def run(self, df_pik: pd.DataFrame):
+    def filter_rows(self, df_pik: pd.DataFrame):
         """
-        Cleans the PIK dataset.
-        :param df_pik:
-        :return:
+        Keeps the rows of the raw PIK dataset used : third-party scenario (HISTTP), gases and sectors kept. Only the
+        codes are compared, so that the rows are filtered before any translation.
+        :param df_pik: (dataframe) raw PIK dataset, or a chunk of it.
         """
-        # cleaning data
-        print("\n----- Clean PIK dataset")
+        return df_pik[(df_pik["scenario (PRIMAP-hist)"] == "HISTTP")
+                      & df_pik["entity"].isin(self.dict_gas_to_replace.keys())
+                      & df_pik["category (IPCC2006_PRIMAP)"].isin(self.dict_sectors_to_replace.keys())]
+
+    def filter_and_melt(self, df_pik: pd.DataFrame):
+        """
+        Filters the rows of the PIK dataset, melts the years and converts the units. Each row is processed
+        independently, so that the dataset can be processed by chunks.
+        :param df_pik: (dataframe) raw PIK dataset, or a chunk of it.
+        :return: (dataframe) the emissions per country, sector, gas and year.
+        """
+        df_pik = self.filter_rows(df_pik)
         df_pik = df_pik.rename({"area (ISO3)": "country", "category (IPCC2006_PRIMAP)": "sector",
                                 "scenario (PRIMAP-hist)": "scenario",
                                 "entity": "gas", "unit": "ghg_unit"}, axis=1)
 
         # clean and filter data
         df_pik["country"] = CountryIsoCodeTranslator().run(df_pik["country"], raise_errors=True)
-        df_pik = df_pik[df_pik["scenario"] == "HISTTP"]
-        df_pik = df_pik[df_pik["gas"].isin(self.dict_gas_to_replace.keys())]
         df_pik["gas"] = df_pik["gas"].replace(self.dict_gas_to_replace)
-        df_pik = df_pik[df_pik["sector"].isin(self.dict_sectors_to_replace.keys())]
         df_pik["sector"] = df_pik["sector"].replace(self.dict_sectors_to_replace)
         df_pik["source"] = "PIK"
         df_pik = df_pik[~df_pik["country"].isin(self.list_countries_to_remove)]
-        df_pik = df_pik.drop(columns=["provenance", "scenario"])
+        df_pik = df_pik.drop(columns=["provenance", "scenario"], errors="ignore")
 
         # melt years and converts units
         df_pik = self.melt_years(df_pik)
         df_pik = self.convert_ghg_unit(df_pik)
+        return df_pik
 
-        # compute sum per sector and gaz
-        df_pik = df_pik.groupby(["country", "sector", "gas", "year", "ghg_unit", "source"]).agg(
+    @staticmethod
+    def sum_per_sector_and_gas(df_pik: pd.DataFrame):
+        return df_pik.groupby(["country", "sector", "gas", "year", "ghg_unit", "source"]).agg(
             {"ghg": "sum"}).reset_index()
 
+    @staticmethod
+    def translate_and_format(df_pik: pd.DataFrame):
         # translate countries
         df_pik["country"] = CountryTranslatorFrenchToEnglish().run(df_pik["country"], raise_errors=False)
         df_pik = df_pik.dropna(subset=["country"])
         df_pik = df_pik[df_pik["country"] != "Delete"]
-        df_pik = StatisticsDataframeFormatter.select_and_sort_values(df_pik, "ghg", round_statistics=5)
+        return StatisticsDataframeFormatter.select_and_sort_values(df_pik, "ghg", round_statistics=5)
 
-        return df_pik
+    def run(self, df_pik: pd.DataFrame):
+        """
+        Cleans the PIK dataset.
+        :param df_pik:
+        :return:
+        """
+        # cleaning data
+        print("\n----- Clean PIK dataset")
+        df_pik = self.filter_and_melt(df_pik)
+
+        # compute sum per sector and gaz
+        df_pik = self.sum_per_sector_and_gas(df_pik)
+
+        return self.translate_and_format(df_pik)
+
+    def run_chunks(self, iterator_df_pik):
+        """
+        Cleans the PIK dataset read by chunks, e.g. with pd.read_csv(..., chunksize=..., **DICT_READ_KWARGS), so that
+        the raw dataset is never fully loaded in memory : the rows which are not used are dropped from each chunk
+        before it is translated and melted, then each chunk is summed per sector and gas before the chunks are summed
+        together. The memory used scales with the rows kept, not with the size of the raw file.
+        :param iterator_df_pik: (iterator) chunks of the raw PIK dataset.
+        :return: (dataframe) the same dataset as run().
+        """
+        print("\n----- Clean PIK dataset by chunks")
+        list_df_pik = [self.sum_per_sector_and_gas(self.filter_and_melt(df_pik_chunk))
+                       for df_pik_chunk in iterator_df_pik]
+        df_pik = self.sum_per_sector_and_gas(pd.concat(list_df_pik, ignore_index=True))
+        return self.translate_and_format(df_pik)
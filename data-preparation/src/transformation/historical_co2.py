@@ -1,4 +1,5 @@
 import pandas as pd
+from sdp_data_preparation.countries_and_zones import ZoneIndex
 from utils.translation import CountryTranslatorFrenchToEnglish
 from demographic.countries import StatisticsPerCountriesAndZonesJoiner
 
@@ -10,13 +11,20 @@ class HistoricalCo2PerZoneAndCountryProcessor:
                                     "Estonia", "Georgia", "Kazakhstan", "Kyrgyztan",
                                     "Uzbekistan", "Moldova", "Turkmenistan", "Kyrgyzstan",
                                     "Tajikistan", "Estonia", "Latvia", "Lithuania"]
+        # the soviet states were members of the USSR from 1922 to 1991 (included)
+        df_urss_membership = pd.DataFrame({"group_type": "country", "group_name": "Russian Federation & USSR",
+                                           "country": pd.unique(pd.Series(self.list_urss_countries)),
+                                           "valid_from": 1922, "valid_to": 1991})
+        self.urss_zone_index = ZoneIndex(df_urss_membership)
 
     def retrieve_urss_countries(self, df_pik_cleaned):
         """
-        We have to aggregate all soviet state into the USSR
+        We have to aggregate all soviet state into the USSR, for the years of their membership
         """
-        condition_urss = (df_pik_cleaned['country'].isin(self.list_urss_countries) & (df_pik_cleaned['year'] >= 1922) & (df_pik_cleaned['year'] < 1992))
-        df_pik_cleaned.loc[condition_urss, 'country'] = 'Russian Federation & USSR'
+        list_positions, list_zone_codes = self.urss_zone_index.join_memberships(df_pik_cleaned['country'],
+                                                                                df_pik_cleaned['year'])
+        df_pik_cleaned.iloc[list_positions, df_pik_cleaned.columns.get_loc('country')] = \
+            self.urss_zone_index.zones['group_name'].to_numpy()[list_zone_codes]
         return df_pik_cleaned
     
     @staticmethod
@@ -0,0 +1,76 @@
+import os
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # the SQL engine is optional
+    duckdb = None
+
+ENGINE_PANDAS = "pandas"
+ENGINE_DUCKDB = "duckdb"
+LIST_ENGINES = [ENGINE_PANDAS, ENGINE_DUCKDB]
+
+
+def quote_literal(value: str) -> str:
+    """
+    Returns a value as a SQL string literal, its quotes escaped, e.g. for the paths of the Parquet files.
+    """
+    return "'%s'" % str(value).replace("'", "''")
+
+
+def check_engine(engine: str) -> str:
+    """
+    Checks that the engine of a processor is known and can be used.
+    :param engine: (str) "pandas" or "duckdb".
+    :return: (str) the engine.
+    """
+    if engine not in LIST_ENGINES:
+        raise ValueError("ERROR : unknown engine %s, expected one of %s" % (engine, LIST_ENGINES))
+    if engine == ENGINE_DUCKDB and duckdb is None:
+        raise ImportError("ERROR : the duckdb engine requires the duckdb package (pip install duckdb)")
+    return engine
+
+
+class SqlEngine:
+    """
+    Runs the SQL recipes of the original Dataiku flow in process with DuckDB, over dataframes or Parquet files.
+    The joins and aggregations are multi-threaded, and spilled on disk when they exceed the memory limit.
+    """
+
+    def __init__(self, threads=None, memory_limit=None, temp_directory=None):
+        """
+        :param threads: (int) number of threads used by a query. None to use all the CPUs.
+        :param memory_limit: (str) maximum memory used by a query, e.g. "2GB". None for the DuckDB default.
+        :param temp_directory: (str) directory where the queries exceeding the memory limit spill their data.
+        """
+        check_engine(ENGINE_DUCKDB)
+        self.threads = threads
+        self.memory_limit = memory_limit
+        self.temp_directory = temp_directory
+
+    def connect(self):
+        connection = duckdb.connect()
+        if self.threads is not None:
+            connection.execute("SET threads = %d" % self.threads)
+        if self.memory_limit is not None:
+            connection.execute("SET memory_limit = %s" % quote_literal(self.memory_limit))
+        if self.temp_directory is not None:
+            os.makedirs(self.temp_directory, exist_ok=True)
+            connection.execute("SET temp_directory = %s" % quote_literal(self.temp_directory))
+        return connection
+
+    def query(self, query: str, **dict_tables) -> pd.DataFrame:
+        """
+        Runs a query over the tables given by name.
+        :param query: (str) the SQL query, which refers to the tables by their name.
+        :param dict_tables: the tables, as dataframes or paths to Parquet files (or globs of Parquet files).
+        :return: (dataframe) the result of the query.
+        """
+        with self.connect() as connection:
+            for table_name, table in dict_tables.items():
+                if isinstance(table, pd.DataFrame):
+                    connection.register(table_name, table)
+                else:
+                    connection.execute("CREATE VIEW %s AS SELECT * FROM read_parquet(%s)"
+                                       % (table_name, quote_literal(table)))
+            return connection.execute(query).df()
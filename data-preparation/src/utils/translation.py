@@ -1,5 +1,7 @@
 import pandas as pd
 from utils.iso3166 import countries_by_alpha3
+from sdp_data_preparation.utils.name_resolver import AliasCache, NameResolver, get_country_aliases
+from sdp_data_preparation.utils.translation_index import TranslationIndex
 # TODO - country_translations à refactoer plus proprement à l'aide d'un fichier JSON
 
 
@@ -393,6 +395,7 @@ translations_dictionnary = {"ALM": "ALM SRES",
                         "Zimbabwe": "Zimbabwe",
                         "Holy See": "Vatican",
                         r'Holy SeeÂ\xa0(Vatican City State)': "Vatican",
+                        "Holy See (Vatican City State)": "Vatican",
                         "Palestinian Territories":"Palestinian Territories"
                     }
 
@@ -503,21 +506,52 @@ sector_translations_edgar = {
 
 
 class CountryTranslatorFrenchToEnglish:
+    translation_index = None  # index of translations_dictionnary, compiled by the first translator
+    default_resolver = None  # built when a first country is not found
 
-    def __init__(self):
+    def __init__(self, resolver=None):
+        """
+        :param resolver: (NameResolver) resolves the countries which are not in the dict. None for a resolver
+            reading the countries already accepted in the default AliasCache, see get_resolver(suggest=True) to print
+            the closest known countries.
+        """
         self.dict_country_translations = translations_dictionnary
+        if CountryTranslatorFrenchToEnglish.translation_index is None:
+            CountryTranslatorFrenchToEnglish.translation_index = TranslationIndex(translations_dictionnary)
+        self.resolver = resolver
+
+    @classmethod
+    def get_resolver(cls, alias_cache=None, suggest=False):
+        """
+        Returns a NameResolver of the countries of the dict and of the ISO 3166 countries.
+        :param alias_cache: (AliasCache) countries already accepted. None for the default AliasCache.
+        :param suggest: (bool) True to print the closest known countries of the countries which are not found.
+        """
+        if cls.translation_index is None:
+            cls.translation_index = TranslationIndex(translations_dictionnary)
+        return NameResolver(get_country_aliases(cls.translation_index, countries_by_alpha3.values()),
+                            alias_cache if alias_cache is not None else AliasCache(), suggest)
+
+    def resolve(self, list_countries):
+        if self.resolver is None:
+            if CountryTranslatorFrenchToEnglish.default_resolver is None:
+                CountryTranslatorFrenchToEnglish.default_resolver = self.get_resolver()
+            self.resolver = CountryTranslatorFrenchToEnglish.default_resolver
+        return self.resolver.resolve(list_countries)
 
     def run(self, serie_country_to_translate: pd.Series, raise_errors: bool) -> pd.Series:
         """
-        Translates the countris from French to English using country_translations. If no correspondance is found in the
-        dict, the country is replace by a NaN value.
+        Translates the countris from French to English using country_translations, also matching the spacing, case
+        and accent encoding variants of its keys, and then the countries resolved by the resolver (alias cache or
+        closest known country). Only the distinct countries are translated. If no correspondance is found, the country
+        is replace by a NaN value.
         :param serie_country_to_translate: (pandas Series) to translate.
         :param raise_errors: (bool) True to raise error if no translation. Else False to ignore.
         :return:
         """
-        serie_country_translate = serie_country_to_translate.map(self.dict_country_translations)
-        countries_no_translating = list(set(serie_country_to_translate[serie_country_translate.isnull()].values.tolist()))
-        if serie_country_translate.isnull().sum() > 0:
+        serie_country_translate, countries_no_translating = self.translation_index.translate(
+            serie_country_to_translate, resolve=self.resolve)
+        if len(countries_no_translating) > 0:
             print("WARNING : no translating found for %s countries" % len(countries_no_translating))
             print("Please, check the following list :")
             print(countries_no_translating)
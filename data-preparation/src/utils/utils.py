@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 
 from utils.translation import CountryTranslatorFrenchToEnglish
 import pandas as pd
@@ -120,15 +121,18 @@ def check_columns_diff(res_old, res_new, country_col):
     return country_old, country_new
 
 
+@lru_cache(maxsize=None)
 def get_project_root_path() -> str:
-    """Returns the path of the project root"""
+    """Returns the path of the project root, computed once per process"""
     dir_path = os.path.dirname(os.path.realpath(__file__))
-    dir_name = os.path.basename(dir_path)
 
-    # We go up in the directory level until
-    # we are at the root of the project
-    while dir_name != "shiftdataportal":
-        dir_path = os.path.dirname(dir_path)
-        dir_name = os.path.basename(dir_path)
+    # We go up in the directory level until we are at the root of the project : the directory named shiftdataportal
+    # or, if the repository was cloned under another name, the directory containing data-preparation
+    while os.path.basename(dir_path) != "shiftdataportal" \
+            and not os.path.isdir(os.path.join(dir_path, "data-preparation")):
+        parent_dir_path = os.path.dirname(dir_path)
+        if parent_dir_path == dir_path:
+            raise FileNotFoundError("ERROR : project root not found above %s" % os.path.realpath(__file__))
+        dir_path = parent_dir_path
 
     return dir_path